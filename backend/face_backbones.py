@@ -0,0 +1,120 @@
+# backend/face_backbones.py
+"""
+Face model architectures and the metadata that ties a trained model to one.
+
+    model = build("mobilenet_v3_small", num_classes=7)
+    meta = read_meta(model_dir)      # {"backbone", "input_size", "mean", "std"}
+    write_meta(model_dir, meta)
+
+Backbones (name -> default input size):
+    resnet18            224   torchvision ResNet18 (the original model)
+    mobilenet_v3_small  112   torchvision MobileNetV3-Small
+    compact_cnn          48   three conv blocks sized for 48x48 expression crops
+
+All take a normalized 3-channel (N, 3, S, S) batch; grayscale crops are
+replicated to RGB by the preprocessing, so serving, export and the
+datasets stay the same for every backbone.
+
+training/train_face.py writes face_model.json next to face_model.pt and
+class_names.txt; face_model_loader rebuilds the model and its input
+transform from it. A results folder without the file is a ResNet18 at 224.
+"""
+
+import json
+import os
+from pathlib import Path
+
+import torch.nn as nn
+from torchvision import models
+
+
+META_FILE = "face_model.json"
+
+IMAGENET_MEAN = [0.485, 0.456, 0.406]
+IMAGENET_STD = [0.229, 0.224, 0.225]
+
+
+class CompactCNN(nn.Module):
+    """Three conv-conv-pool blocks (32, 64, 128 channels), global pooling, linear head."""
+
+    def __init__(self, num_classes: int, widths=(32, 64, 128), dropout: float = 0.3):
+        super().__init__()
+        layers = []
+        in_ch = 3
+        for width in widths:
+            layers += [
+                nn.Conv2d(in_ch, width, 3, padding=1, bias=False), nn.BatchNorm2d(width), nn.ReLU(inplace=True),
+                nn.Conv2d(width, width, 3, padding=1, bias=False), nn.BatchNorm2d(width), nn.ReLU(inplace=True),
+                nn.MaxPool2d(2),
+            ]
+            in_ch = width
+        self.features = nn.Sequential(*layers)
+        self.pool = nn.AdaptiveAvgPool2d(1)
+        self.classifier = nn.Sequential(nn.Flatten(), nn.Dropout(dropout), nn.Linear(in_ch, num_classes))
+
+    def forward(self, x):
+        return self.classifier(self.pool(self.features(x)))
+
+
+def _resnet18(num_classes: int, pretrained: bool):
+    model = models.resnet18(weights=models.ResNet18_Weights.DEFAULT if pretrained else None)
+    model.fc = nn.Linear(model.fc.in_features, num_classes)
+    return model
+
+
+def _mobilenet_v3_small(num_classes: int, pretrained: bool):
+    model = models.mobilenet_v3_small(weights=models.MobileNet_V3_Small_Weights.DEFAULT if pretrained else None)
+    model.classifier[-1] = nn.Linear(model.classifier[-1].in_features, num_classes)
+    return model
+
+
+def _compact_cnn(num_classes: int, pretrained: bool):
+    if pretrained:
+        print("[face_backbones] compact_cnn has no pretrained weights; starting from scratch")
+    return CompactCNN(num_classes)
+
+
+# name -> (constructor(num_classes, pretrained), default input size)
+BACKBONES = {
+    "resnet18": (_resnet18, 224),
+    "mobilenet_v3_small": (_mobilenet_v3_small, 112),
+    "compact_cnn": (_compact_cnn, 48),
+}
+
+DEFAULT_BACKBONE = "resnet18"
+
+
+def build(name: str, num_classes: int, pretrained: bool = False) -> nn.Module:
+    if name not in BACKBONES:
+        raise ValueError(f"Unknown face backbone {name!r} (expected one of {sorted(BACKBONES)})")
+    return BACKBONES[name][0](num_classes, pretrained)
+
+
+def default_meta(backbone: str = DEFAULT_BACKBONE, input_size: int = None) -> dict:
+    if backbone not in BACKBONES:
+        raise ValueError(f"Unknown face backbone {backbone!r} (expected one of {sorted(BACKBONES)})")
+    return {
+        "backbone": backbone,
+        "input_size": int(input_size or BACKBONES[backbone][1]),
+        "mean": list(IMAGENET_MEAN),
+        "std": list(IMAGENET_STD),
+    }
+
+
+def read_meta(model_dir) -> dict:
+    """The metadata of the model in `model_dir`; ResNet18 at 224 when there is no file."""
+    path = Path(model_dir) / META_FILE
+    if not path.exists():
+        return default_meta()
+    with path.open(encoding="utf-8") as f:
+        meta = json.load(f)
+    return {**default_meta(meta.get("backbone", DEFAULT_BACKBONE), meta.get("input_size")), **meta}
+
+
+def write_meta(model_dir, meta: dict) -> Path:
+    """Writes face_model.json atomically (temp file + rename)."""
+    path = Path(model_dir) / META_FILE
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_text(json.dumps(meta, indent=2) + "\n", encoding="utf-8")
+    os.replace(tmp, path)
+    return path
@@ -0,0 +1,156 @@
+# backend/face_batcher.py
+"""
+Request-coalescing micro-batcher for model inference.
+
+Concurrent callers hand single items to `MicroBatcher.submit()`. A background
+worker thread gathers items until either `max_batch_size` items are waiting or
+the oldest item has waited `max_wait_ms`, runs one call of `batch_fn(items)`
+and hands each caller back its own result.
+
+Usage:
+    batcher = MicroBatcher(predict_face_emotion_batch, max_batch_size=16, max_wait_ms=5)
+    result = batcher.submit(face_crop)   # blocks until the batch has run
+    results = batcher.submit_many(crops) # several items that always share one call
+    batcher.stats()                      # batch size / queue wait numbers for tuning
+
+`batch_fn` must return one result per input item, in the same order.
+"""
+
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+
+class MicroBatcher:
+    def __init__(self, batch_fn, max_batch_size: int = 16, max_wait_ms: float = 5.0, name: str = "batcher"):
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be >= 1")
+        self.batch_fn = batch_fn
+        self.max_batch_size = int(max_batch_size)
+        self.max_wait = max(float(max_wait_ms), 0.0) / 1000.0
+        self.name = name
+
+        self._queue = queue.Queue()
+        self._carry = None     # group that did not fit into the previous batch
+        self._thread = None
+        self._start_lock = threading.Lock()
+
+        self._stats_lock = threading.Lock()
+        self._batches = 0
+        self._items = 0
+        self._max_seen_batch = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+        self._batch_hist = {}
+
+    # ---------- public API ----------
+
+    def submit(self, item, timeout: float = None):
+        """Queue one item and block until its result is ready."""
+        return self.submit_async(item).result(timeout=timeout)
+
+    def submit_async(self, item) -> Future:
+        return self.submit_many_async([item])[0]
+
+    def submit_many(self, items, timeout: float = None) -> list:
+        """Queue several items as one group and block until all results are ready."""
+        return [fut.result(timeout=timeout) for fut in self.submit_many_async(items)]
+
+    def submit_many_async(self, items) -> list:
+        """
+        Queue `items` as a group: they are never split across calls of
+        `batch_fn` (a group larger than max_batch_size runs as its own call).
+        Returns one Future per item.
+        """
+        self._ensure_worker()
+        items = list(items)
+        futures = [Future() for _ in items]
+        if items:
+            self._queue.put((items, futures, time.perf_counter()))
+        return futures
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            batches = self._batches
+            return {
+                "name": self.name,
+                "max_batch_size": self.max_batch_size,
+                "max_wait_ms": self.max_wait * 1000.0,
+                "queue_depth": self._queue.qsize(),
+                "batches": batches,
+                "items": self._items,
+                "avg_batch_size": (self._items / batches) if batches else 0.0,
+                "max_batch_seen": self._max_seen_batch,
+                "avg_queue_wait_ms": (self._wait_total / self._items * 1000.0) if self._items else 0.0,
+                "max_queue_wait_ms": self._wait_max * 1000.0,
+                "batch_size_histogram": dict(sorted(self._batch_hist.items())),
+            }
+
+    # ---------- worker ----------
+
+    def _ensure_worker(self):
+        # the thread is started lazily (and restarted after a fork, where
+        # threads from the parent are not carried over)
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._run, name=f"{self.name}-worker", daemon=True
+                )
+                self._thread.start()
+
+    def _collect(self):
+        first, self._carry = self._carry or self._queue.get(), None
+        groups = [first]
+        size = len(first[0])
+        deadline = first[2] + self.max_wait
+        while size < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                if remaining <= 0:
+                    group = self._queue.get_nowait()
+                else:
+                    group = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if size + len(group[0]) > self.max_batch_size:
+                # keep groups whole: this one opens the next batch
+                self._carry = group
+                break
+            groups.append(group)
+            size += len(group[0])
+        return groups
+
+    def _run(self):
+        while True:
+            groups = self._collect()
+            started = time.perf_counter()
+            items = [item for g in groups for item in g[0]]
+            futures = [fut for g in groups for fut in g[1]]
+
+            self._record(len(items), [started - g[2] for g in groups for _ in g[0]])
+
+            try:
+                results = self.batch_fn(items)
+                if len(results) != len(items):
+                    raise RuntimeError(
+                        f"{self.name}: batch_fn returned {len(results)} results for {len(items)} items"
+                    )
+            except Exception as e:
+                for fut in futures:
+                    fut.set_exception(e)
+                continue
+
+            for fut, res in zip(futures, results):
+                fut.set_result(res)
+
+    def _record(self, size: int, waits):
+        with self._stats_lock:
+            self._batches += 1
+            self._items += size
+            self._max_seen_batch = max(self._max_seen_batch, size)
+            self._wait_total += sum(waits)
+            self._wait_max = max(self._wait_max, max(waits))
+            self._batch_hist[size] = self._batch_hist.get(size, 0) + 1
@@ -0,0 +1,147 @@
+# backend/face_detector.py
+"""
+Face detection stage used by /predict_face.
+
+- Detectors are built once per worker thread (`get_detector()`); OpenCV's
+  cascade / DNN objects are not safe to share between concurrently running
+  threads, and building them per request was a large part of request latency.
+- Frames are downscaled so the longest side is at most FACE_DETECT_MAX_SIDE
+  before detection; boxes are mapped back to full-resolution coordinates.
+- Backends:
+    haar -> OpenCV Haar cascade (default, ships with opencv-python)
+    dnn  -> OpenCV DNN face detector loaded from a local model file, e.g. the
+            res10 SSD (FACE_DNN_MODEL=res10_300x300_ssd_iter_140000.caffemodel,
+            FACE_DNN_CONFIG=deploy.prototxt)
+
+Boxes are (x, y, w, h) tuples of ints in full-resolution pixel coordinates.
+`detect(img_bgr, small_gray=None)` accepts a precomputed downscale_gray() of the
+frame so callers that also need it (frame hashing) don't build it twice.
+"""
+
+import os
+import threading
+
+import cv2
+
+
+FACE_DETECTOR = os.environ.get("FACE_DETECTOR", "haar").lower()
+FACE_DETECT_MAX_SIDE = int(os.environ.get("FACE_DETECT_MAX_SIDE", "480"))
+
+HAAR_CASCADE_PATH = os.environ.get(
+    "FACE_HAAR_CASCADE",
+    cv2.data.haarcascades + "haarcascade_frontalface_default.xml",
+)
+
+FACE_DNN_MODEL = os.environ.get("FACE_DNN_MODEL", "")
+FACE_DNN_CONFIG = os.environ.get("FACE_DNN_CONFIG", "")
+FACE_DNN_CONFIDENCE = float(os.environ.get("FACE_DNN_CONFIDENCE", "0.5"))
+FACE_DNN_INPUT_SIZE = int(os.environ.get("FACE_DNN_INPUT_SIZE", "300"))
+
+
+def downscale(img, max_side: int):
+    """
+    Shrink `img` so its longest side is at most `max_side`.
+    Returns (small_img, scale) where scale = small / original (<= 1.0).
+    """
+    h, w = img.shape[:2]
+    longest = max(h, w)
+    if max_side <= 0 or longest <= max_side:
+        return img, 1.0
+    scale = max_side / float(longest)
+    small = cv2.resize(img, (max(1, round(w * scale)), max(1, round(h * scale))), interpolation=cv2.INTER_AREA)
+    return small, scale
+
+
+def downscale_gray(img_bgr, max_side: int = FACE_DETECT_MAX_SIDE):
+    """Downscaled grayscale copy of a BGR frame, as used for Haar detection and frame hashing."""
+    small, _ = downscale(img_bgr, max_side)
+    return small if small.ndim == 2 else cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+
+
+def _to_full_res(boxes, scale: float, width: int, height: int):
+    out = []
+    for x, y, w, h in boxes:
+        x0 = max(0, min(width - 1, int(round(x / scale))))
+        y0 = max(0, min(height - 1, int(round(y / scale))))
+        x1 = max(x0 + 1, min(width, int(round((x + w) / scale))))
+        y1 = max(y0 + 1, min(height, int(round((y + h) / scale))))
+        out.append((x0, y0, x1 - x0, y1 - y0))
+    return out
+
+
+class HaarFaceDetector:
+    def __init__(self, max_side: int = FACE_DETECT_MAX_SIDE, cascade_path: str = HAAR_CASCADE_PATH,
+                 scale_factor: float = 1.1, min_neighbors: int = 5):
+        self.max_side = max_side
+        self.scale_factor = scale_factor
+        self.min_neighbors = min_neighbors
+        self._cascade = cv2.CascadeClassifier(cascade_path)
+        if self._cascade.empty():
+            raise RuntimeError(f"Could not load Haar cascade: {cascade_path}")
+
+    def detect(self, img_bgr, small_gray=None):
+        """`small_gray` may be a downscale_gray(img_bgr, self.max_side) the caller already has."""
+        height, width = img_bgr.shape[:2]
+        gray = small_gray if small_gray is not None else downscale_gray(img_bgr, self.max_side)
+        scale = gray.shape[1] / float(width)
+        faces = self._cascade.detectMultiScale(gray, self.scale_factor, self.min_neighbors)
+        if len(faces) == 0:
+            return []
+        return _to_full_res([tuple(int(v) for v in f) for f in faces], scale, width, height)
+
+
+class DnnFaceDetector:
+    def __init__(self, max_side: int = FACE_DETECT_MAX_SIDE, model_path: str = FACE_DNN_MODEL,
+                 config_path: str = FACE_DNN_CONFIG, confidence: float = FACE_DNN_CONFIDENCE,
+                 input_size: int = FACE_DNN_INPUT_SIZE):
+        if not model_path or not os.path.exists(model_path):
+            raise RuntimeError(f"DNN face model not found: {model_path!r} (set FACE_DNN_MODEL)")
+        self.max_side = max_side
+        self.confidence = confidence
+        self.input_size = input_size
+        self._net = cv2.dnn.readNet(model_path, config_path) if config_path else cv2.dnn.readNet(model_path)
+
+    def detect(self, img_bgr, small_gray=None):
+        height, width = img_bgr.shape[:2]
+        if img_bgr.ndim == 2:
+            img_bgr = cv2.cvtColor(img_bgr, cv2.COLOR_GRAY2BGR)
+        small, _ = downscale(img_bgr, self.max_side)
+        blob = cv2.dnn.blobFromImage(
+            small, 1.0, (self.input_size, self.input_size), (104.0, 177.0, 123.0), swapRB=False, crop=False
+        )
+        self._net.setInput(blob)
+        detections = self._net.forward()  # (1, 1, N, 7): [_, _, conf, x0, y0, x1, y1] normalised
+
+        boxes = []
+        for det in detections[0, 0]:
+            if float(det[2]) < self.confidence:
+                continue
+            x0 = max(0, min(width - 1, int(det[3] * width)))
+            y0 = max(0, min(height - 1, int(det[4] * height)))
+            x1 = max(x0 + 1, min(width, int(det[5] * width)))
+            y1 = max(y0 + 1, min(height, int(det[6] * height)))
+            boxes.append((x0, y0, x1 - x0, y1 - y0))
+        return boxes
+
+
+DETECTOR_BACKENDS = {
+    "haar": HaarFaceDetector,
+    "dnn": DnnFaceDetector,
+}
+
+
+_local = threading.local()
+
+
+def get_detector(backend: str = None):
+    """Return this thread's detector for `backend` (defaults to FACE_DETECTOR), building it once."""
+    backend = (backend or FACE_DETECTOR).lower()
+    cache = getattr(_local, "detectors", None)
+    if cache is None:
+        cache = _local.detectors = {}
+    det = cache.get(backend)
+    if det is None:
+        if backend not in DETECTOR_BACKENDS:
+            raise ValueError(f"Unknown face detector backend: {backend!r} (expected one of {sorted(DETECTOR_BACKENDS)})")
+        det = cache[backend] = DETECTOR_BACKENDS[backend]()
+    return det
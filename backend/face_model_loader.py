@@ -1,72 +1,294 @@
+# backend/face_model_loader.py
+"""
+Face emotion model (ResNet18 by default, fine-tuned on class-folder face crops).
+
+The architecture and input size come from face_model.json next to
+face_model.pt (see face_backbones.py); without it the model is a ResNet18
+at 224x224. INPUT_SIZE, the preprocessing and _transform follow it.
+
+The model is built on first use (or by an explicit `load_model()` call, e.g.
+from a warm-up thread), not at import. It is constructed without pretrained
+ImageNet weights since those would be overwritten by face_model.pt anyway,
+so loading never touches the network.
+
+Runtimes (FACE_RUNTIME):
+    eager       -> PyTorch eager fp32 from face_model.pt (default)
+    torchscript -> frozen TorchScript artifact from training/export_face_model.py
+    onnx        -> ONNX artifact served by onnxruntime
+FACE_RUNTIME_INT8=1 picks the INT8-quantized artifact of that runtime.
+Unless FACE_RUNTIME_CHECK=0, an exported runtime is compared against the eager
+model at load time and the loader falls back to eager if they disagree by more
+than FACE_RUNTIME_TOLERANCE (max abs difference in class probabilities).
+"""
+
+import os
+import threading
+import time
 from pathlib import Path
 
+import cv2
 import numpy as np
 import torch
-import torch.nn as nn
-from torchvision import models, transforms
+from torchvision import transforms
 from PIL import Image
 
+import face_backbones
+import metrics
+
 
 ROOT_DIR = Path(__file__).resolve().parent.parent / "training"
-MODEL_PATH = ROOT_DIR / "results-face" / "face_model.pt"
-CLASS_FILE = ROOT_DIR / "results-face" / "class_names.txt"
+# FACE_MODEL_DIR points the loader at another results folder (e.g. the
+# stand-in models of benchmarks/)
+MODEL_DIR = Path(os.environ.get("FACE_MODEL_DIR") or ROOT_DIR / "results-face")
+MODEL_PATH = MODEL_DIR / "face_model.pt"
+CLASS_FILE = MODEL_DIR / "class_names.txt"
+
+FACE_RUNTIME = os.environ.get("FACE_RUNTIME", "eager").lower()
+FACE_RUNTIME_INT8 = os.environ.get("FACE_RUNTIME_INT8", "0") == "1"
+FACE_RUNTIME_CHECK = os.environ.get("FACE_RUNTIME_CHECK", "1") == "1"
+FACE_RUNTIME_TOLERANCE = float(
+    os.environ.get("FACE_RUNTIME_TOLERANCE", "0.2" if FACE_RUNTIME_INT8 else "0.02")
+)
+
+# read at import: the preprocessing below is sized from it; a broken file is
+# reported when the model is loaded
+try:
+    META = face_backbones.read_meta(MODEL_DIR)
+    _meta_error = None
+except Exception as e:
+    META = face_backbones.default_meta()
+    _meta_error = f"Invalid {MODEL_DIR / face_backbones.META_FILE}: {e}"
+
+BACKBONE = META["backbone"]
+INPUT_SIZE = int(META["input_size"])
+
+# FACE_CHANNELS_LAST=1 lays the input batch out NHWC in memory and converts
+# the eager model to match (often faster convolutions on CPU)
+FACE_CHANNELS_LAST = os.environ.get("FACE_CHANNELS_LAST", "0") == "1"
+
+RUNTIME_SUFFIXES = {"torchscript": ".ts.pt", "onnx": ".onnx"}
+
+CLASS_NAMES = []
+NUM_CLASSES = 0
+
+_model = None
+_load_lock = threading.Lock()
+_load_state = "not_loaded"   # not_loaded | loading | ready | failed
+_load_error = None
+_load_seconds = None
+_runtime = None
+
+
+def artifact_path(runtime: str, int8: bool = False) -> Path:
+    """Where training/export_face_model.py writes the artifact for `runtime`."""
+    if runtime not in RUNTIME_SUFFIXES:
+        raise ValueError(f"Unknown face runtime: {runtime!r} (expected eager or one of {sorted(RUNTIME_SUFFIXES)})")
+    name = "face_model" + (".int8" if int8 else "") + RUNTIME_SUFFIXES[runtime]
+    return MODEL_PATH.with_name(name)
+
+
+class _OnnxRunner:
+    """Callable with the same contract as the torch model: (N, 3, H, W) float tensor -> logits tensor."""
+
+    def __init__(self, path: Path):
+        import onnxruntime as ort
+
+        opts = ort.SessionOptions()
+        opts.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        opts.intra_op_num_threads = torch.get_num_threads()
+        self.session = ort.InferenceSession(str(path), opts, providers=["CPUExecutionProvider"])
+        self.input_name = self.session.get_inputs()[0].name
+
+    def __call__(self, batch: torch.Tensor) -> torch.Tensor:
+        out = self.session.run(None, {self.input_name: batch.contiguous().numpy()})[0]
+        return torch.from_numpy(out)
 
-if not MODEL_PATH.exists():
-    raise RuntimeError(f"Face model not found: {MODEL_PATH}")
 
-if not CLASS_FILE.exists():
-    raise RuntimeError(f"Class names file not found: {CLASS_FILE}")
+def _load_runtime(runtime: str, int8: bool):
+    path = artifact_path(runtime, int8)
+    if not path.exists():
+        raise RuntimeError(f"Face {runtime} artifact not found: {path} (run training/export_face_model.py)")
+    if runtime == "torchscript":
+        model = torch.jit.load(str(path), map_location="cpu")
+        model.eval()
+        return model
+    return _OnnxRunner(path)
 
 
-with open(CLASS_FILE, "r", encoding="utf-8") as f:
-    CLASS_NAMES = [line.strip() for line in f if line.strip()]
+def check_equivalence(candidate, reference, num_samples: int = 4, seed: int = 0) -> float:
+    """Max abs difference in softmax probabilities between two runners on a fixed random batch."""
+    gen = torch.Generator().manual_seed(seed)
+    batch = torch.randn(num_samples, 3, INPUT_SIZE, INPUT_SIZE, generator=gen)
+    with torch.no_grad():
+        p_ref = torch.softmax(reference(batch), dim=1)
+        p_new = torch.softmax(candidate(batch), dim=1)
+    return float((p_ref - p_new).abs().max())
+
+
+def _build_model():
+    if _meta_error:
+        raise RuntimeError(_meta_error)
+
+    if not MODEL_PATH.exists():
+        raise RuntimeError(f"Face model not found: {MODEL_PATH}")
+
+    if not CLASS_FILE.exists():
+        raise RuntimeError(f"Class names file not found: {CLASS_FILE}")
+
+    with open(CLASS_FILE, "r", encoding="utf-8") as f:
+        class_names = [line.strip() for line in f if line.strip()]
+
+    # no pretrained weights: the state dict below replaces all of them
+    model = face_backbones.build(BACKBONE, len(class_names))
+
+    state = torch.load(MODEL_PATH, map_location="cpu")
+    model.load_state_dict(state)
+    model.eval()
+    return model, class_names
+
+
+def _select_runtime(eager_model):
+    """Returns (runner, runtime_name) for FACE_RUNTIME, falling back to eager on any problem."""
+    if FACE_RUNTIME == "eager":
+        return eager_model, "eager"
 
-NUM_CLASSES = len(CLASS_NAMES)
+    name = FACE_RUNTIME + (".int8" if FACE_RUNTIME_INT8 else "")
+    try:
+        runner = _load_runtime(FACE_RUNTIME, FACE_RUNTIME_INT8)
+        if FACE_RUNTIME_CHECK:
+            diff = check_equivalence(runner, eager_model)
+            if diff > FACE_RUNTIME_TOLERANCE:
+                raise RuntimeError(
+                    f"{name} differs from eager model by {diff:.4f} (tolerance {FACE_RUNTIME_TOLERANCE})"
+                )
+            print(f"[face_model_loader] {name} matches eager model (max prob diff {diff:.4f})")
+        return runner, name
+    except Exception as e:
+        print(f"[face_model_loader] Could not use {name} runtime, falling back to eager: {e}")
+        return eager_model, "eager"
 
 
-weights = models.ResNet18_Weights.DEFAULT
-_model = models.resnet18(weights=weights)
+def load_model():
+    """Build the model once (thread-safe) and return it. Raises if it cannot be loaded."""
+    global _model, CLASS_NAMES, NUM_CLASSES, _load_state, _load_error, _load_seconds, _runtime
 
-num_features = _model.fc.in_features
-_model.fc = nn.Linear(num_features, NUM_CLASSES)
+    if _model is not None:
+        return _model
+
+    with _load_lock:
+        if _model is not None:
+            return _model
+
+        _load_state = "loading"
+        t0 = time.perf_counter()
+        try:
+            model, class_names = _build_model()
+            model, runtime = _select_runtime(model)
+            if FACE_CHANNELS_LAST and runtime == "eager":
+                model = model.to(memory_format=torch.channels_last)
+        except Exception as e:
+            _load_state = "failed"
+            _load_error = str(e)
+            raise
+
+        CLASS_NAMES = class_names
+        NUM_CLASSES = len(class_names)
+        _model = model
+        _runtime = runtime
+        _load_seconds = time.perf_counter() - t0
+        _load_state = "ready"
+        _load_error = None
+        print(
+            f"[face_model_loader] Loaded face model ({BACKBONE} @ {INPUT_SIZE}px, {runtime}) "
+            f"from {MODEL_PATH} in {_load_seconds:.2f}s"
+        )
+        return _model
+
+
+def load_status() -> dict:
+    return {
+        "ready": _model is not None,
+        "state": _load_state,
+        "load_seconds": _load_seconds,
+        "runtime": _runtime,
+        "backbone": BACKBONE,
+        "input_size": INPUT_SIZE,
+        "error": _load_error,
+    }
 
-state = torch.load(MODEL_PATH, map_location="cpu")
-_model.load_state_dict(state)
-_model.eval()
 
 _transform = transforms.Compose(
     [
-        transforms.Resize((224, 224)),
+        transforms.Resize((INPUT_SIZE, INPUT_SIZE)),
         transforms.ToTensor(),
         transforms.Normalize(
-            mean=[0.485, 0.456, 0.406],
-            std=[0.229, 0.224, 0.225],
+            mean=META["mean"],
+            std=META["std"],
         ),
     ]
 )
 
+# ToTensor + Normalize folded into one multiply-add per channel:
+# (x / 255 - mean) / std == x * _SCALE + _BIAS
+_SCALE = (1.0 / (255.0 * np.array(META["std"]))).astype(np.float32)
+_BIAS = (-np.array(META["mean"]) / np.array(META["std"])).astype(np.float32)
+
+# per-thread input batch, reused across calls and grown when a larger batch comes
+_buffers = threading.local()
+
 
-def predict_face_emotion(image: Image.Image) -> dict:
+def _resize(img: np.ndarray) -> np.ndarray:
+    """RGB uint8 (H, W, 3) or grayscale (H, W) -> RGB uint8 (INPUT_SIZE, INPUT_SIZE, 3)."""
+    if img.ndim == 2:
+        img = cv2.cvtColor(img, cv2.COLOR_GRAY2RGB)
+    h, w = img.shape[:2]
+    # INTER_AREA when shrinking approximates PIL's antialiased bilinear resize
+    interp = cv2.INTER_AREA if (h > INPUT_SIZE or w > INPUT_SIZE) else cv2.INTER_LINEAR
+    return cv2.resize(img, (INPUT_SIZE, INPUT_SIZE), interpolation=interp)
+
+
+def _batch_buffer(n: int) -> torch.Tensor:
+    buf = getattr(_buffers, "batch", None)
+    if buf is None or buf.shape[0] < n:
+        capacity = max(n, 2 * buf.shape[0]) if buf is not None else n
+        shape = (capacity, INPUT_SIZE, INPUT_SIZE, 3) if FACE_CHANNELS_LAST else (capacity, 3, INPUT_SIZE, INPUT_SIZE)
+        buf = _buffers.batch = torch.empty(shape, dtype=torch.float32)
+    return buf
+
+
+def preprocess_batch(images) -> torch.Tensor:
     """
-    Run inference on one face crop.
+    Face crops (RGB uint8 ndarrays or PIL images) -> normalized
+    (N, 3, INPUT_SIZE, INPUT_SIZE) float batch, equivalent to _transform up to
+    resize interpolation: within 0.04 mean / 0.75 max abs difference
+    (normalized units), enforced for upscaled and downscaled crops in both
+    layouts by `benchmarks/bench_micro.py --only preprocess`.
 
-    Returns:
-        {
-          "label": "<top_label>",
-          "score": <top_prob in 0–1>,
-          "all_predictions": [
-              {"label": "angry", "score": 0.x},
-              {"label": "disgust", "score": 0.y},
-              ...
-          ]
-        }
+    Each crop is resized once with cv2 and normalized straight into this
+    thread's reusable batch buffer, so nothing else is allocated per call.
+    The result is a view of that buffer: it is overwritten by the next call
+    from the same thread.
     """
-    img_t = _transform(image).unsqueeze(0)  # shape (1, 3, 224, 224)
+    n = len(images)
+    buf = _batch_buffer(n)
+    out = buf.numpy()
+    for i, img in enumerate(images):
+        if not isinstance(img, np.ndarray):
+            img = np.asarray(img.convert("RGB"))
+        resized = _resize(img)
+        if FACE_CHANNELS_LAST:
+            dst, scale, bias = out[i], _SCALE, _BIAS                       # (H, W, 3)
+        else:
+            dst, scale, bias = out[i], _SCALE[:, None, None], _BIAS[:, None, None]   # (3, H, W)
+            resized = resized.transpose(2, 0, 1)
+        np.multiply(resized, scale, out=dst)
+        np.add(dst, bias, out=dst)
 
-    with torch.no_grad():
-        logits = _model(img_t)
-        probs = torch.softmax(logits, dim=1)[0].cpu().numpy()  # numpy array, sums to 1
+    batch = buf[:n]
+    return batch.permute(0, 3, 1, 2) if FACE_CHANNELS_LAST else batch
 
+
+def _format_prediction(probs) -> dict:
     # build per-class list (0–1 probabilities)
     predictions = []
     for label, p in zip(CLASS_NAMES, probs):
@@ -87,3 +309,41 @@ def predict_face_emotion(image: Image.Image) -> dict:
         "score": float(top["score"]),   # 0–1
         "all_predictions": predictions, # list of all emotions
     }
+
+
+def predict_face_emotion(image) -> dict:
+    """
+    Run inference on one face crop (PIL image or RGB uint8 ndarray).
+
+    Returns:
+        {
+          "label": "<top_label>",
+          "score": <top_prob in 0–1>,
+          "all_predictions": [
+              {"label": "angry", "score": 0.x},
+              {"label": "disgust", "score": 0.y},
+              ...
+          ]
+        }
+    """
+    return predict_face_emotion_batch([image])[0]
+
+
+def predict_face_emotion_batch(images) -> list:
+    """
+    Run one batched forward pass over several face crops (PIL images or RGB uint8 ndarrays).
+
+    Returns one dict per image (same format as predict_face_emotion), in input order.
+    """
+    if not images:
+        return []
+
+    model = load_model()
+    with metrics.stage("face_batch", "preprocess"):
+        batch = preprocess_batch(images)  # shape (N, 3, INPUT_SIZE, INPUT_SIZE), reused buffer
+
+    with metrics.stage("face_batch", "forward"), torch.no_grad():
+        logits = model(batch)
+        probs = torch.softmax(logits, dim=1).cpu().numpy()  # (N, C), rows sum to 1
+
+    return [_format_prediction(row) for row in probs]
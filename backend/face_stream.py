@@ -0,0 +1,52 @@
+# backend/face_stream.py
+"""
+Single-slot "latest frame" mailbox for streaming face inference.
+
+The WebSocket reader puts every incoming frame into the slot; the inference
+worker always takes the newest one. A frame that is still waiting when a newer
+one arrives is dropped, so when inference falls behind the client sees fresh
+results at a lower rate instead of an ever-growing backlog.
+"""
+
+import threading
+
+
+class LatestFrameSlot:
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._item = None
+        self._closed = False
+        self.received = 0
+        self.dropped = 0
+
+    def put(self, item) -> bool:
+        """Store `item`, replacing any frame not yet taken. Returns True if one was dropped."""
+        with self._cond:
+            if self._closed:
+                return False
+            replaced = self._item is not None
+            self._item = item
+            self.received += 1
+            if replaced:
+                self.dropped += 1
+            self._cond.notify()
+            return replaced
+
+    def take(self, timeout: float = None):
+        """Block until a frame is available and return it; None once the slot is closed."""
+        with self._cond:
+            while self._item is None and not self._closed:
+                if not self._cond.wait(timeout):
+                    return None
+            item, self._item = self._item, None
+            return item
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._item = None
+            self._cond.notify_all()
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
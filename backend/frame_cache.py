@@ -0,0 +1,134 @@
+# backend/frame_cache.py
+"""
+Per-session near-duplicate frame cache for face predictions.
+
+Consecutive webcam frames are usually almost identical. The key is a
+256-bit difference hash (dHash, 16x17 gradient grid) of the grayscale face
+crop that is about to be classified, not of the whole frame: a face often
+covers a small part of a webcam frame, and a change of expression barely
+moves a whole-frame hash. If a recent crop of the same session hashes within
+`threshold` bits (Hamming distance), its prediction is reused instead of
+running the classifier again.
+
+Threshold choice: 8 of 256 bits (~3%) by default. That tolerates sensor noise
+and small head motion between frames but is tighter than the 5 of 64 bits
+(~8%) a whole-frame hash needed. The 1 s TTL bounds how long a result can be
+reused at all. The nearest distance of every lookup is kept as a histogram in
+stats() for tuning.
+
+    cache = FrameCache(threshold=8, ttl_seconds=1.0)
+    h = dhash(gray_face_crop)
+    hit = cache.lookup(session_id, h)     # None on a miss
+    cache.store(session_id, h, result)
+
+Sessions are kept in LRU order and bounded by `max_sessions`; each session keeps
+its last `per_session` frames, and entries older than `ttl_seconds` never hit.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+import cv2
+import numpy as np
+
+
+def dhash(gray: np.ndarray, hash_size: int = 16) -> int:
+    """hash_size**2-bit (256 by default) difference hash of a grayscale image."""
+    small = cv2.resize(gray, (hash_size + 1, hash_size), interpolation=cv2.INTER_AREA)
+    bits = (small[:, 1:] > small[:, :-1]).ravel()
+    value = 0
+    for byte in np.packbits(bits):
+        value = (value << 8) | int(byte)
+    return value
+
+
+def hamming(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+class FrameCache:
+    def __init__(self, threshold: int = 8, ttl_seconds: float = 1.0, max_sessions: int = 1024, per_session: int = 4):
+        self.threshold = int(threshold)
+        self.ttl = float(ttl_seconds)
+        self.max_sessions = int(max_sessions)
+        self.per_session = int(per_session)
+
+        self._sessions = OrderedDict()   # session -> [(hash, result, stored_at), ...] newest last
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.session_evictions = 0
+        # nearest distance seen on each lookup (capped), to help pick `threshold`
+        self._distance_hist = {}
+
+    @property
+    def enabled(self) -> bool:
+        return self.threshold >= 0 and self.max_sessions > 0 and self.per_session > 0
+
+    def lookup(self, session, frame_hash: int):
+        now = time.monotonic()
+        with self._lock:
+            entries = self._sessions.get(session)
+            if not entries:
+                self.misses += 1
+                return None
+
+            live = [e for e in entries if now - e[2] <= self.ttl]
+            if len(live) != len(entries):
+                self.expired += len(entries) - len(live)
+                self._sessions[session] = live
+            if not live:
+                self.misses += 1
+                return None
+
+            best = None
+            best_dist = float("inf")
+            for h, result, _ in live:
+                d = hamming(h, frame_hash)
+                if d < best_dist:
+                    best, best_dist = result, d
+
+            bucket = min(best_dist, 32)
+            self._distance_hist[bucket] = self._distance_hist.get(bucket, 0) + 1
+
+            if best is not None and best_dist <= self.threshold:
+                self._sessions.move_to_end(session)
+                self.hits += 1
+                return best
+            self.misses += 1
+            return None
+
+    def store(self, session, frame_hash: int, result):
+        with self._lock:
+            entries = self._sessions.get(session)
+            if entries is None:
+                entries = self._sessions[session] = []
+            entries.append((frame_hash, result, time.monotonic()))
+            del entries[:-self.per_session]
+            self._sessions.move_to_end(session)
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+                self.session_evictions += 1
+
+    def drop_session(self, session):
+        with self._lock:
+            self._sessions.pop(session, None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "threshold": self.threshold,
+                "ttl_seconds": self.ttl,
+                "sessions": len(self._sessions),
+                "max_sessions": self.max_sessions,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": (self.hits / lookups) if lookups else 0.0,
+                "expired": self.expired,
+                "session_evictions": self.session_evictions,
+                "nearest_distance_histogram": dict(sorted(self._distance_hist.items())),
+            }
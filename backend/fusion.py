@@ -0,0 +1,89 @@
+# backend/fusion.py
+"""
+Late fusion of face and text emotion predictions into one distribution.
+
+Both predictions are first mapped onto the text label set (the one the chat
+replies in main.py are keyed by), then mixed linearly:
+
+    p(label) = face_weight * p_face(label) + (1 - face_weight) * p_text(label)
+
+    fuse(face_pred, text_pred, face_weight=0.5)
+    # {"label": "joy", "score": 0.71, "all_predictions": [...], "weights": {"face": 0.5, "text": 0.5}}
+
+A prediction is the dict returned by the models ({"label", "score"} plus
+optional "all_predictions"). When only a top label and score are known, the
+top label keeps at least twice any other label's share and the remaining
+probability mass is spread evenly over the other labels. If one
+side is missing the other is returned on its own.
+"""
+
+LABELS = ["joy", "sadness", "anger", "fear", "surprise", "neutral"]
+
+# face model classes (training/data/test folder names) -> text labels
+FACE_TO_TEXT = {
+    "angry": "anger",
+    "disgust": "anger",
+    "fear": "fear",
+    "happy": "joy",
+    "neutral": "neutral",
+    "sad": "sadness",
+    "surprise": "surprise",
+}
+
+
+def to_distribution(prediction: dict, mapping: dict = None) -> dict:
+    """Label -> probability over LABELS (sums to 1) for one model prediction."""
+    mapping = mapping or {}
+    dist = dict.fromkeys(LABELS, 0.0)
+
+    entries = prediction.get("all_predictions") or [
+        {"label": prediction["label"], "score": prediction.get("score", 0.0)}
+    ]
+    for entry in entries:
+        label = mapping.get(entry["label"], entry["label"])
+        if label in dist:
+            dist[label] += max(0.0, float(entry["score"]))
+
+    if "all_predictions" not in prediction:
+        # only the top label is known: it keeps at least twice the share of
+        # any other label (so a 0.0 score cannot turn into a uniform tie),
+        # the leftover mass goes to the others evenly
+        top = mapping.get(prediction["label"], prediction["label"])
+        if top in dist:
+            dist[top] = max(dist[top], 2.0 / (len(LABELS) + 1))
+        rest = max(0.0, 1.0 - sum(dist.values()))
+        others = [label for label in LABELS if label != top and dist[label] == 0.0]
+        for label in others:
+            dist[label] = rest / len(others)
+
+    total = sum(dist.values())
+
+    if total <= 0:
+        return {label: 1.0 / len(LABELS) for label in LABELS}
+    return {label: p / total for label, p in dist.items()}
+
+
+def fuse(face_pred: dict = None, text_pred: dict = None, face_weight: float = 0.5) -> dict:
+    if face_pred is None and text_pred is None:
+        raise ValueError("Nothing to fuse: need a face or a text prediction")
+
+    w = min(1.0, max(0.0, float(face_weight)))
+    if face_pred is None:
+        w = 0.0
+    elif text_pred is None:
+        w = 1.0
+
+    face = to_distribution(face_pred, FACE_TO_TEXT) if face_pred is not None else None
+    text = to_distribution(text_pred) if text_pred is not None else None
+
+    fused = {
+        label: (w * face[label] if face else 0.0) + ((1.0 - w) * text[label] if text else 0.0)
+        for label in LABELS
+    }
+    ranked = sorted(({"label": l, "score": p} for l, p in fused.items()), key=lambda x: x["score"], reverse=True)
+    return {
+        "label": ranked[0]["label"],
+        "score": ranked[0]["score"],
+        "all_predictions": ranked,
+        "weights": {"face": w, "text": 1.0 - w},
+    }
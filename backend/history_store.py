@@ -0,0 +1,241 @@
+# backend/history_store.py
+"""
+Persistent emotion history backed by SQLite (WAL mode).
+
+Prediction endpoints call `record()`, which only puts a row on an in-process
+queue; a background writer thread drains the queue and commits rows in
+batches, so writes never run on the request path. If the queue is full the
+row is dropped and counted rather than blocking the request. The writer is
+a daemon thread, so `close()` commits whatever is still queued; it runs at
+interpreter exit (atexit) and from gunicorn's worker_exit hook.
+
+    store = HistoryStore("data/emotion.db")
+    store.record("a@b.c", "text", "joy", 0.93, note="I am happy")
+    items, next_cursor = store.query("a@b.c", limit=50, emotion="joy")
+    store.summary("a@b.c", since=time.time() - 86400)
+
+Pagination is keyset-based: `next_cursor` encodes the (ts, id) of the last
+row returned and is passed back as `cursor` to fetch the following page.
+Timestamps are Unix seconds.
+"""
+
+import atexit
+import os
+import queue
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS predictions (
+    id      INTEGER PRIMARY KEY AUTOINCREMENT,
+    user    TEXT    NOT NULL,
+    ts      REAL    NOT NULL,
+    source  TEXT    NOT NULL,
+    label   TEXT    NOT NULL,
+    score   REAL,
+    note    TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_predictions_user_ts ON predictions (user, ts, id);
+CREATE INDEX IF NOT EXISTS idx_predictions_user_label_ts ON predictions (user, label, ts);
+"""
+
+NOTE_MAX_CHARS = 500
+
+
+def encode_cursor(ts: float, row_id: int) -> str:
+    return f"{ts!r}_{row_id}"
+
+
+def decode_cursor(cursor: str):
+    ts, row_id = cursor.rsplit("_", 1)
+    return float(ts), int(row_id)
+
+
+class HistoryStore:
+    def __init__(self, path, batch_size: int = 256, flush_interval: float = 0.5, max_queue: int = 10000):
+        self.path = str(path)
+        self.batch_size = int(batch_size)
+        self.flush_interval = float(flush_interval)
+
+        Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        conn = self._connect()
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+        finally:
+            conn.close()
+
+        self._queue = queue.Queue(maxsize=int(max_queue))
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._local = threading.local()
+
+        self._stats_lock = threading.Lock()
+        self.written = 0
+        self.dropped = 0
+        self.batches = 0
+        self.write_errors = 0
+
+        atexit.register(self.close)
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def _reader(self):
+        # one read connection per thread and process (sqlite3 connections are
+        # not shared across threads, nor reused after a fork)
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = self._local.conn = self._connect()
+            conn.row_factory = sqlite3.Row
+            self._local.pid = os.getpid()
+        return conn
+
+    # ---------- writes ----------
+
+    def record(self, user: str, source: str, label: str, score: float = None, note: str = None, ts: float = None):
+        """Queue one prediction for writing. Never blocks; returns False if the row was dropped."""
+        if not user or not label:
+            return False
+        self._ensure_writer()
+        if note is not None:
+            note = str(note)[:NOTE_MAX_CHARS]
+        row = (user, ts if ts is not None else time.time(), source, str(label),
+               None if score is None else float(score), note)
+        try:
+            self._queue.put_nowait(row)
+            return True
+        except queue.Full:
+            with self._stats_lock:
+                self.dropped += 1
+            return False
+
+    def flush(self, timeout: float = 5.0):
+        """Wait until everything queued so far has been committed (used by tests / shutdown)."""
+        self._ensure_writer()
+        done = threading.Event()
+        self._queue.put(done)
+        return done.wait(timeout)
+
+    def close(self, timeout: float = 5.0):
+        """Commit the rows still queued before the process exits. Safe to call more than once."""
+        writer_alive = self._thread is not None and self._thread.is_alive()
+        if not writer_alive and self._queue.empty():
+            return True
+        return self.flush(timeout)
+
+    def _ensure_writer(self):
+        # started lazily and restarted after a fork (threads don't survive it)
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="history-writer", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        conn = self._connect()
+        while True:
+            batch, events = [], []
+            item = self._queue.get()
+            deadline = time.monotonic() + self.flush_interval
+            while True:
+                if isinstance(item, threading.Event):
+                    events.append(item)
+                else:
+                    batch.append(item)
+                if len(batch) >= self.batch_size or events:
+                    break
+                remaining = deadline - time.monotonic()
+                try:
+                    item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+
+            if batch:
+                try:
+                    with conn:
+                        conn.executemany(
+                            "INSERT INTO predictions (user, ts, source, label, score, note) VALUES (?, ?, ?, ?, ?, ?)",
+                            batch,
+                        )
+                    with self._stats_lock:
+                        self.written += len(batch)
+                        self.batches += 1
+                except sqlite3.Error:
+                    with self._stats_lock:
+                        self.write_errors += 1
+            for ev in events:
+                ev.set()
+
+    # ---------- reads ----------
+
+    def query(self, user: str, cursor: str = None, limit: int = 50, since: float = None,
+              until: float = None, emotion: str = None, source: str = None):
+        """Newest first. Returns (items, next_cursor); next_cursor is None on the last page."""
+        where = ["user = ?"]
+        args = [user]
+        if emotion:
+            where.append("label = ?")
+            args.append(emotion)
+        if source:
+            where.append("source = ?")
+            args.append(source)
+        if since is not None:
+            where.append("ts >= ?")
+            args.append(float(since))
+        if until is not None:
+            where.append("ts < ?")
+            args.append(float(until))
+        if cursor:
+            c_ts, c_id = decode_cursor(cursor)
+            where.append("(ts < ? OR (ts = ? AND id < ?))")
+            args.extend([c_ts, c_ts, c_id])
+
+        limit = max(1, min(int(limit), 500))
+        rows = self._reader().execute(
+            f"SELECT id, ts, source, label, score, note FROM predictions WHERE {' AND '.join(where)} "
+            "ORDER BY ts DESC, id DESC LIMIT ?",
+            args + [limit + 1],
+        ).fetchall()
+
+        items = [dict(r) for r in rows[:limit]]
+        next_cursor = encode_cursor(rows[limit - 1]["ts"], rows[limit - 1]["id"]) if len(rows) > limit else None
+        return items, next_cursor
+
+    def summary(self, user: str, since: float = None, until: float = None, source: str = None):
+        """Per-emotion counts, average score and last-seen time for one user."""
+        where = ["user = ?"]
+        args = [user]
+        if source:
+            where.append("source = ?")
+            args.append(source)
+        if since is not None:
+            where.append("ts >= ?")
+            args.append(float(since))
+        if until is not None:
+            where.append("ts < ?")
+            args.append(float(until))
+
+        rows = self._reader().execute(
+            f"SELECT label, COUNT(*) AS count, AVG(score) AS avg_score, MAX(ts) AS last_ts "
+            f"FROM predictions WHERE {' AND '.join(where)} GROUP BY label ORDER BY count DESC",
+            args,
+        ).fetchall()
+        return [dict(r) for r in rows]
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            return {
+                "path": self.path,
+                "queue_depth": self._queue.qsize(),
+                "written": self.written,
+                "batches": self.batches,
+                "dropped": self.dropped,
+                "write_errors": self.write_errors,
+            }
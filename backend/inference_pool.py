@@ -0,0 +1,242 @@
+# backend/inference_pool.py
+"""
+Bounded inference executors with admission control.
+
+Each model gets an `InferencePool`: a fixed number of worker threads fed from
+a bounded queue, so a burst of requests can never start more concurrent torch
+calls than the pool has workers. Endpoints reach a pool through an
+`EndpointLimit`, which adds a per-endpoint cap on in-flight requests and a
+deadline for *starting* the work:
+
+    face_pool = InferencePool("face", workers=4, queue_size=32)
+    limit = EndpointLimit("predict_face", face_pool, max_in_flight=32, deadline_ms=2000)
+    result = limit.run(fn, arg)   # raises Overloaded instead of piling up
+
+Overloaded carries the HTTP status (429 when the endpoint or queue is full
+and the request is refused up front, 503 when it was queued but could not
+start before its deadline) and a Retry-After estimate in seconds.
+"""
+
+import math
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+
+class Overloaded(Exception):
+    def __init__(self, message: str, status: int = 503, retry_after: int = 1):
+        super().__init__(message)
+        self.status = status
+        self.retry_after = max(1, int(retry_after))
+
+
+class _Task:
+    __slots__ = ("fn", "args", "kwargs", "future", "enqueued_at", "lock", "state")
+
+    def __init__(self, fn, args, kwargs):
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.future = Future()
+        self.enqueued_at = time.perf_counter()
+        self.lock = threading.Lock()
+        self.state = "queued"   # queued | running | cancelled
+
+
+class InferencePool:
+    def __init__(self, name: str, workers: int = 2, queue_size: int = 32):
+        self.name = name
+        self.workers = max(1, int(workers))
+        self._queue = queue.Queue(maxsize=max(1, int(queue_size)))
+        self._threads = []
+        self._start_lock = threading.Lock()
+        # signalled by workers when a task moves from queued to running
+        self._started = threading.Condition()
+
+        self._stats_lock = threading.Lock()
+        self.completed = 0
+        self.rejected_full = 0
+        self.rejected_deadline = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.service_total = 0.0
+
+    def submit(self, fn, *args, **kwargs) -> _Task:
+        """Queue `fn` without blocking; raises Overloaded(429) if the queue is full."""
+        self._ensure_workers()
+        task = _Task(fn, args, kwargs)
+        try:
+            self._queue.put_nowait(task)
+        except queue.Full:
+            with self._stats_lock:
+                self.rejected_full += 1
+            raise Overloaded(f"{self.name} queue is full", status=429, retry_after=self.retry_after())
+        return task
+
+    def run(self, fn, *args, deadline_s: float = None, **kwargs):
+        """
+        Run `fn(*args, **kwargs)` on the pool and return its result. If it has
+        not started within `deadline_s` seconds it is cancelled and
+        Overloaded(503) is raised.
+        """
+        return self.wait(self.submit(fn, *args, **kwargs), deadline_s)
+
+    def wait(self, task: _Task, deadline_s: float = None):
+        """Result of a submitted task, with the same start deadline as run()."""
+        if deadline_s is not None:
+            give_up_at = task.enqueued_at + deadline_s
+            with self._started:
+                while task.state == "queued":
+                    remaining = give_up_at - time.perf_counter()
+                    if remaining <= 0:
+                        break
+                    self._started.wait(remaining)
+            with task.lock:
+                if task.state == "queued":
+                    task.state = "cancelled"
+            if task.state == "cancelled":
+                with self._stats_lock:
+                    self.rejected_deadline += 1
+                raise Overloaded(
+                    f"{self.name} could not start within {deadline_s * 1000:.0f} ms",
+                    status=503,
+                    retry_after=self.retry_after(),
+                )
+        return task.future.result()
+
+    def retry_after(self) -> int:
+        """Rough seconds until the current queue drains."""
+        with self._stats_lock:
+            avg = (self.service_total / self.completed) if self.completed else 0.1
+        return math.ceil(self._queue.qsize() * avg / self.workers) or 1
+
+    def _ensure_workers(self):
+        # started lazily and restarted after a fork (threads don't survive it)
+        if len(self._threads) == self.workers and all(t.is_alive() for t in self._threads):
+            return
+        with self._start_lock:
+            self._threads = [t for t in self._threads if t.is_alive()]
+            while len(self._threads) < self.workers:
+                t = threading.Thread(
+                    target=self._run, name=f"{self.name}-pool-{len(self._threads)}", daemon=True
+                )
+                t.start()
+                self._threads.append(t)
+
+    def _run(self):
+        while True:
+            task = self._queue.get()
+            with task.lock:
+                if task.state == "cancelled":
+                    continue
+                task.state = "running"
+            with self._started:
+                self._started.notify_all()
+
+            started = time.perf_counter()
+            wait = started - task.enqueued_at
+            try:
+                task.future.set_result(task.fn(*task.args, **task.kwargs))
+            except BaseException as e:
+                task.future.set_exception(e)
+            service = time.perf_counter() - started
+
+            with self._stats_lock:
+                self.completed += 1
+                self.wait_total += wait
+                self.wait_max = max(self.wait_max, wait)
+                self.service_total += service
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            done = self.completed
+            return {
+                "name": self.name,
+                "workers": self.workers,
+                "queue_size": self._queue.maxsize,
+                "queue_depth": self._queue.qsize(),
+                "completed": done,
+                "rejected_queue_full": self.rejected_full,
+                "rejected_deadline": self.rejected_deadline,
+                "avg_wait_ms": (self.wait_total / done * 1000.0) if done else 0.0,
+                "max_wait_ms": self.wait_max * 1000.0,
+                "avg_service_ms": (self.service_total / done * 1000.0) if done else 0.0,
+            }
+
+
+class EndpointLimit:
+    def __init__(self, name: str, pool: InferencePool, max_in_flight: int = 32, deadline_ms: float = 2000):
+        self.name = name
+        self.pool = pool
+        self.max_in_flight = max(1, int(max_in_flight))
+        self.deadline_s = float(deadline_ms) / 1000.0 if deadline_ms and deadline_ms > 0 else None
+        self._slots = threading.BoundedSemaphore(self.max_in_flight)
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.rejected = 0
+
+    def submit(self, fn, *args, **kwargs) -> "Pending":
+        """
+        Admit and queue `fn` without waiting for it, so several models can work
+        on one request at once. The returned Pending must be resolved with
+        result() or cancel() to free its in-flight slot.
+        """
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.rejected += 1
+            raise Overloaded(
+                f"{self.name}: too many requests in flight", status=429, retry_after=self.pool.retry_after()
+            )
+        with self._lock:
+            self.in_flight += 1
+        try:
+            return Pending(self, self.pool.submit(fn, *args, **kwargs))
+        except BaseException:
+            self._release()
+            raise
+
+    def run(self, fn, *args, **kwargs):
+        return self.submit(fn, *args, **kwargs).result()
+
+    def _release(self):
+        with self._lock:
+            self.in_flight -= 1
+        self._slots.release()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "pool": self.pool.name,
+                "max_in_flight": self.max_in_flight,
+                "deadline_ms": self.deadline_s * 1000.0 if self.deadline_s else None,
+                "in_flight": self.in_flight,
+                "rejected_in_flight": self.rejected,
+            }
+
+
+class Pending:
+    """A task admitted through an EndpointLimit; holds its in-flight slot until resolved."""
+
+    def __init__(self, limit: EndpointLimit, task: _Task):
+        self._limit = limit
+        self._task = task
+        self._released = False
+
+    def _release(self):
+        if not self._released:
+            self._released = True
+            self._limit._release()
+
+    def result(self):
+        try:
+            return self._limit.pool.wait(self._task, self._limit.deadline_s)
+        finally:
+            self._release()
+
+    def cancel(self):
+        """Drop the task if it has not started yet (a running one finishes unobserved)."""
+        with self._task.lock:
+            if self._task.state == "queued":
+                self._task.state = "cancelled"
+        self._release()
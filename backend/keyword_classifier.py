@@ -0,0 +1,217 @@
+# backend/keyword_classifier.py
+"""
+Keyword-based emotion classifier shared by main.py and predict_text.py.
+
+The lexicon (keyword -> label, optional weight) is compiled once into an
+Aho-Corasick automaton, so scoring is a single linear pass over the text no
+matter how many keywords there are. Matches only count on word boundaries
+("mad" matches "so mad!" but not "made"), and keywords may be phrases
+("on cloud nine").
+
+    engine = KeywordClassifier.from_file("lexicon.tsv")
+    engine.classify("I am so happy, not sad")
+    # {"label": "joy", "score": 0.7, "counts": {"joy": 1, "sadness": 1}, "scores": {...}}
+
+Lexicon files have one entry per line, comma or tab separated:
+    keyword,label[,weight]
+Blank lines and lines starting with "#" are ignored. Set KEYWORD_LEXICON to
+a file path to replace the built-in lexicon for the whole backend.
+"""
+
+import csv
+import os
+from collections import deque
+
+
+DEFAULT_LEXICON = {
+    "happy": "joy",
+    "joy": "joy",
+    "glad": "joy",
+    "love": "joy",
+    "excited": "joy",
+    "sad": "sadness",
+    "unhappy": "sadness",
+    "depressed": "sadness",
+    "angry": "anger",
+    "mad": "anger",
+    "furious": "anger",
+    "scared": "fear",
+    "afraid": "fear",
+    "nervous": "fear",
+    "surprised": "surprise",
+    "wow": "surprise",
+    "neutral": "neutral",
+    "okay": "neutral",
+    "fine": "neutral",
+}
+
+
+def _is_word_char(ch: str) -> bool:
+    return ch.isalnum() or ch == "_"
+
+
+class KeywordClassifier:
+    def __init__(self, lexicon):
+        """
+        lexicon: dict keyword -> label, or an iterable of (keyword, label) /
+        (keyword, label, weight) tuples. Keywords are matched case-insensitively.
+        """
+        items = lexicon.items() if isinstance(lexicon, dict) else lexicon
+
+        self._keywords = []   # index -> (length, label, weight)
+        self.labels = []
+
+        # trie as parallel lists: transitions, failure links, output keyword indices
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [[]]
+
+        for entry in items:
+            keyword, label = entry[0], entry[1]
+            weight = float(entry[2]) if len(entry) > 2 and entry[2] not in (None, "") else 1.0
+            keyword = " ".join(str(keyword).lower().split())
+            if not keyword:
+                continue
+            if label not in self.labels:
+                self.labels.append(label)
+            self._add(keyword, len(self._keywords))
+            self._keywords.append((len(keyword), label, weight))
+
+        self._build_failure_links()
+
+    @classmethod
+    def from_file(cls, path: str):
+        entries = []
+        with open(path, "r", encoding="utf-8", newline="") as f:
+            sample = f.read(4096)
+            f.seek(0)
+            delimiter = "\t" if "\t" in sample else ","
+            for row in csv.reader(f, delimiter=delimiter):
+                if not row or not row[0].strip() or row[0].lstrip().startswith("#"):
+                    continue
+                if len(row) < 2:
+                    raise ValueError(f"{path}: expected 'keyword,label[,weight]', got {row!r}")
+                entries.append(tuple(c.strip() for c in row[:3]))
+        return cls(entries)
+
+    def __len__(self):
+        return len(self._keywords)
+
+    # ---------- automaton ----------
+
+    def _add(self, keyword: str, index: int):
+        node = 0
+        for ch in keyword:
+            nxt = self._goto[node].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[node][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            node = nxt
+        self._out[node].append(index)
+
+    def _build_failure_links(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, nxt in self._goto[node].items():
+                queue.append(nxt)
+                f = self._fail[node]
+                while f and ch not in self._goto[f]:
+                    f = self._fail[f]
+                self._fail[nxt] = self._goto[f].get(ch, 0)
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+
+    def matches(self, text: str):
+        """
+        Yield (start, end, keyword_index) for the whole-word keyword matches,
+        left to right. Overlaps resolve leftmost-longest: a keyword inside or
+        overlapping an earlier, longer match ("cloud" in "on cloud nine") is
+        not reported, so phrases aren't outvoted by their own words.
+        """
+        t = " ".join((text or "").lower().split())
+        goto, fail, out, keywords = self._goto, self._fail, self._out, self._keywords
+        n = len(t)
+        longest = {}   # start -> (end, keyword_index) of the longest match starting there
+        node = 0
+        for i, ch in enumerate(t):
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            if not out[node]:
+                continue
+            after_ok = i + 1 >= n or not _is_word_char(t[i + 1])
+            if not after_ok:
+                continue
+            for k in out[node]:
+                start = i + 1 - keywords[k][0]
+                if start == 0 or not _is_word_char(t[start - 1]):
+                    if start not in longest or i + 1 > longest[start][0]:
+                        longest[start] = (i + 1, k)
+
+        if not longest:
+            return
+        last_end = 0
+        for start in range(n):
+            hit = longest.get(start)
+            if hit is not None and start >= last_end:
+                last_end = hit[0]
+                yield start, hit[0], hit[1]
+
+    # ---------- scoring ----------
+
+    def counts(self, text: str) -> dict:
+        """Weighted hit count per label (labels without hits are omitted)."""
+        counts = {}
+        for _, _, k in self.matches(text):
+            _, label, weight = self._keywords[k]
+            counts[label] = counts.get(label, 0.0) + weight
+        return counts
+
+    def classify(self, text: str):
+        """
+        Top label by weighted hits (ties go to the label hit first). The score
+        is 0.9 when every hit agrees and drops towards 0.5 as hits are split.
+        Returns None if nothing matched.
+        """
+        counts = {}
+        first = {}
+        for start, _, k in self.matches(text):
+            _, label, weight = self._keywords[k]
+            counts[label] = counts.get(label, 0.0) + weight
+            first.setdefault(label, start)
+
+        total = sum(counts.values())
+        if not counts or total <= 0:
+            return None
+
+        label = max(counts, key=lambda l: (counts[l], -first[l]))
+        scores = {l: c / total for l, c in counts.items()}
+        return {
+            "label": label,
+            "score": round(0.5 + 0.4 * scores[label], 4),
+            "counts": counts,
+            "scores": scores,
+        }
+
+
+KEYWORD_LEXICON = os.environ.get("KEYWORD_LEXICON", "")
+
+default_classifier = (
+    KeywordClassifier.from_file(KEYWORD_LEXICON) if KEYWORD_LEXICON else KeywordClassifier(DEFAULT_LEXICON)
+)
+
+
+def simple_classify(text: str):
+    """Keyword fallback used when the text model is unavailable. Returns {"label", "score"}."""
+    text = text or ""
+    res = default_classifier.classify(text)
+    if res is not None:
+        return {"label": res["label"], "score": res["score"]}
+    if "!" in text:
+        return {"label": "joy", "score": 0.6}
+    if "?" in text:
+        return {"label": "neutral", "score": 0.55}
+    return {"label": "neutral", "score": 0.5}
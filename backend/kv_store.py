@@ -0,0 +1,82 @@
+# backend/kv_store.py
+"""
+Dict-like string key/value table in SQLite, shared by every worker process.
+
+main.py keeps USERS and SESSIONS in these instead of plain dicts so that a
+signup or login handled by one gunicorn worker is visible to all the others
+(and survives restarts):
+
+    SESSIONS = SqliteDict("data/emotion.db", "sessions")
+    SESSIONS[token] = email
+    token in SESSIONS
+
+Connections are opened lazily, per thread and per process, on first use.
+The constructor only creates the table through a short-lived connection
+that it closes again, so constructing these at import in the gunicorn
+master (preload_app) leaves no open SQLite handle for the workers to
+inherit across fork().
+"""
+
+import os
+import sqlite3
+import threading
+from collections.abc import MutableMapping
+from contextlib import closing
+from pathlib import Path
+
+
+class SqliteDict(MutableMapping):
+    def __init__(self, path, table: str):
+        if not table.isidentifier():
+            raise ValueError(f"Invalid table name: {table!r}")
+        self.path = str(path)
+        self.table = table
+        self._local = threading.local()
+
+        Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        with closing(self._connect()) as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(f"CREATE TABLE IF NOT EXISTS {table} (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=30, isolation_level=None)
+
+    def _conn(self):
+        pid = os.getpid()
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != pid:
+            conn = self._connect()
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = pid
+        return conn
+
+    def __getitem__(self, key):
+        row = self._conn().execute(f"SELECT value FROM {self.table} WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            raise KeyError(key)
+        return row[0]
+
+    def __setitem__(self, key, value):
+        self._conn().execute(
+            f"INSERT OR REPLACE INTO {self.table} (key, value) VALUES (?, ?)", (key, value)
+        )
+
+    def __delitem__(self, key):
+        cur = self._conn().execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+        if cur.rowcount == 0:
+            raise KeyError(key)
+
+    def __contains__(self, key):
+        if not isinstance(key, str):
+            return False
+        return self._conn().execute(
+            f"SELECT 1 FROM {self.table} WHERE key = ?", (key,)
+        ).fetchone() is not None
+
+    def __iter__(self):
+        rows = self._conn().execute(f"SELECT key FROM {self.table}").fetchall()
+        return iter([r[0] for r in rows])
+
+    def __len__(self):
+        return self._conn().execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
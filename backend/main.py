@@ -1,29 +1,97 @@
+import time
 
+# measured from here so cold start time can be compared between load modes
+_IMPORT_STARTED = time.perf_counter()
 
-from flask import Flask, request, jsonify, make_response
+from flask import Flask, request, jsonify, make_response, g, stream_with_context
 from flask_cors import CORS
 import logging
 import base64
-import io
+import json
+import os
 import secrets
 import random
+import sys
+import threading
+from datetime import datetime
 from functools import wraps
 
 import numpy as np
 import cv2
-from PIL import Image
 from werkzeug.security import generate_password_hash, check_password_hash
 
 
 
-from face_model_loader import predict_face_emotion
+from face_batcher import MicroBatcher
+from keyword_classifier import simple_classify
+from face_detector import get_detector, downscale_gray
+from frame_cache import FrameCache, dhash
+from history_store import HistoryStore
+from kv_store import SqliteDict
+from face_stream import LatestFrameSlot
+from inference_pool import InferencePool, EndpointLimit, Overloaded
+import metrics
+from fusion import fuse
+import voice_pipeline
 
 try:
-    from predict_text import classify_text as model_classify_text
-    HAVE_TEXT_MODEL = True
+    from flask_sock import Sock, ConnectionClosed
+    HAVE_WEBSOCKETS = True
 except Exception:
-    model_classify_text = None
-    HAVE_TEXT_MODEL = False
+    Sock = None
+    ConnectionClosed = Exception
+    HAVE_WEBSOCKETS = False
+
+
+# Model loading modes:
+#   EMOTION_LAZY_LOAD=0 -> load both models at import (old behaviour)
+#   EMOTION_LAZY_LOAD=1 -> torch / transformers / models load on first use, and
+#                          with EMOTION_WARMUP=1 (default) in a background thread
+#                          started at import, so the server is up immediately
+LAZY_LOAD = os.environ.get("EMOTION_LAZY_LOAD", "1") == "1"
+WARMUP = os.environ.get("EMOTION_WARMUP", "1") == "1"
+
+_MODEL_MODULES = {"face": "face_model_loader", "text": "predict_text"}
+
+
+def _face_model():
+    import face_model_loader
+    face_model_loader.load_model()
+    return face_model_loader
+
+
+def _text_model():
+    import predict_text
+    predict_text.load_model()
+    return predict_text
+
+
+def _face_predict_batch(images):
+    return _face_model().predict_face_emotion_batch(images)
+
+
+def _model_status(name):
+    mod = sys.modules.get(_MODEL_MODULES[name])
+    if mod is None:
+        return {"ready": False, "state": "not_loaded", "load_seconds": None}
+    return mod.load_status()
+
+
+def warm_up(blocking: bool = False):
+    """Load the face and text models now, in a background thread unless `blocking`."""
+    def run():
+        t0 = time.perf_counter()
+        for name, loader in (("face", _face_model), ("text", _text_model)):
+            try:
+                loader()
+            except Exception:
+                log.exception("Failed to load %s model", name)
+        log.info("Models warmed up in %.2fs", time.perf_counter() - t0)
+
+    if blocking:
+        run()
+    else:
+        threading.Thread(target=run, name="model-warmup", daemon=True).start()
 
 
 logging.basicConfig(level=logging.INFO)
@@ -31,11 +99,115 @@ log = logging.getLogger("emotion.ai.backend")
 
 app = Flask(__name__)
 CORS(app, resources={r"/*": {"origins": "*"}})
+sock = Sock(app) if HAVE_WEBSOCKETS else None
+
+
+@app.before_request
+def _start_timer():
+    g.request_started = time.perf_counter()
+
+
+@app.after_request
+def _record_request(response):
+    started = g.pop("request_started", None)
+    if started is not None:
+        metrics.observe_request(request.endpoint or "unknown", response.status_code, time.perf_counter() - started)
+    return response
+
+
+@app.teardown_request
+def _record_failed_request(exc):
+    # after_request is skipped when a view raises
+    started = g.pop("request_started", None)
+    if exc is not None and started is not None:
+        metrics.observe_request(request.endpoint or "unknown", 500, time.perf_counter() - started)
+
+
+
+# users, sessions and prediction history live in one SQLite file so every
+# worker process of the production server (serve.py) sees the same state
+EMOTION_DB = os.environ.get(
+    "EMOTION_DB", os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "emotion.db")
+)
+
+USERS = SqliteDict(EMOTION_DB, "users")
+SESSIONS = SqliteDict(EMOTION_DB, "sessions")
+
+
+# concurrent /predict_face requests are coalesced into one forward pass
+FACE_BATCH_MAX_SIZE = int(os.environ.get("FACE_BATCH_MAX_SIZE", "16"))
+FACE_BATCH_MAX_WAIT_MS = float(os.environ.get("FACE_BATCH_MAX_WAIT_MS", "5"))
+
+face_batcher = MicroBatcher(
+    _face_predict_batch,
+    max_batch_size=FACE_BATCH_MAX_SIZE,
+    max_wait_ms=FACE_BATCH_MAX_WAIT_MS,
+    name="face",
+)
+
+
+# cap on faces classified per frame in all-faces mode (?all_faces=1); all
+# crops of a frame go through the batcher as one group, i.e. one forward pass
+FACE_MAX_FACES = int(os.environ.get("FACE_MAX_FACES", "8"))
+
+
+# a near-identical face crop in consecutive frames of a session reuses the
+# previous prediction (threshold in bits of a 256-bit hash, see frame_cache.py);
+# FACE_FRAME_CACHE_THRESHOLD=-1 disables the cache
+face_frame_cache = FrameCache(
+    threshold=int(os.environ.get("FACE_FRAME_CACHE_THRESHOLD", "8")),
+    ttl_seconds=float(os.environ.get("FACE_FRAME_CACHE_TTL", "1.0")),
+    max_sessions=int(os.environ.get("FACE_FRAME_CACHE_SESSIONS", "1024")),
+)
+
+
+# admission control: each model runs on a fixed-size pool with a bounded
+# queue, and each endpoint caps its in-flight requests and how long a request
+# may wait for a worker. Past either limit the request is shed with 429/503
+# and a Retry-After header instead of queueing up behind the model.
+face_pool = InferencePool(
+    "face",
+    workers=int(os.environ.get("FACE_POOL_WORKERS", str(FACE_BATCH_MAX_SIZE))),
+    queue_size=int(os.environ.get("FACE_POOL_QUEUE", "64")),
+)
+text_pool = InferencePool(
+    "text",
+    workers=int(os.environ.get("TEXT_POOL_WORKERS", "2")),
+    queue_size=int(os.environ.get("TEXT_POOL_QUEUE", "64")),
+)
+
+
+def _endpoint_limit(name, pool, max_in_flight, deadline_ms):
+    # e.g. LIMIT_PREDICT_FACE_INFLIGHT=32, LIMIT_PREDICT_FACE_DEADLINE_MS=2000
+    key = name.upper()
+    return EndpointLimit(
+        name,
+        pool,
+        max_in_flight=int(os.environ.get(f"LIMIT_{key}_INFLIGHT", str(max_in_flight))),
+        deadline_ms=float(os.environ.get(f"LIMIT_{key}_DEADLINE_MS", str(deadline_ms))),
+    )
+
+
+ENDPOINT_LIMITS = {
+    "predict_face": _endpoint_limit("predict_face", face_pool, 64, 2000),
+    "predict_face_stream": _endpoint_limit("predict_face_stream", face_pool, 64, 500),
+    "predict_text": _endpoint_limit("predict_text", text_pool, 64, 2000),
+    "predict_text_batch": _endpoint_limit("predict_text_batch", text_pool, 8, 5000),
+    "predict_multimodal_face": _endpoint_limit("predict_multimodal_face", face_pool, 64, 2000),
+    "predict_multimodal_text": _endpoint_limit("predict_multimodal_text", text_pool, 64, 2000),
+}
+
 
+# every prediction is logged per user; writes are batched off the request path
+history = HistoryStore(EMOTION_DB)
 
 
-USERS = {}
-SESSIONS = {}
+@app.errorhandler(Overloaded)
+def overloaded(e):
+    resp = jsonify({"error": str(e), "retry_after": e.retry_after})
+    resp.status_code = e.status
+    resp.headers["Retry-After"] = str(e.retry_after)
+    return resp
 
 
 def require_auth(f):
@@ -49,23 +221,6 @@ def require_auth(f):
     return wrapper
 
 
-KEYWORDS = {
-    "happy": "joy", "joy": "joy", "love": "joy", "excited": "joy",
-    "sad": "sadness", "depressed": "sadness", "unhappy": "sadness",
-    "angry": "anger", "mad": "anger", "furious": "anger",
-    "scared": "fear", "afraid": "fear", "nervous": "fear",
-    "surprised": "surprise", "wow": "surprise",
-}
-
-def simple_classify(text):
-    t = (text or "").lower()
-    for k, v in KEYWORDS.items():
-        if k in t:
-            return {"label": v, "score": 0.9}
-    return {"label": "neutral", "score": 0.5}
-
-
-
 EMOTION_RESPONSES = {
     "joy": [
         "I can feel your positive energy 😊 What’s been going well?",
@@ -101,17 +256,50 @@ EMOTION_RESPONSES = {
 
 
 
+def _chat_reply(emotion):
+    return random.choice(EMOTION_RESPONSES.get(emotion, EMOTION_RESPONSES["neutral"]))
+
+
+
 @app.route("/health", methods=["GET"])
 def health():
     return jsonify({
         "status": "ok",
-        "text_model": HAVE_TEXT_MODEL,
-        "face_model": True,
+        "text_model": _model_status("text").get("using_model", False),
+        "face_model": _model_status("face")["ready"],
+        "voice_model": voice_pipeline.load_status()["ready"],
+        "models": {name: _model_status(name) for name in _MODEL_MODULES},
+        "startup_seconds": STARTUP_SECONDS,
+        "face_stream": HAVE_WEBSOCKETS,
         "bot": True
     })
 
 
 
+@app.route("/stats", methods=["GET"])
+def stats():
+    text_mod = sys.modules.get(_MODEL_MODULES["text"])
+    return jsonify({
+        "face_batcher": face_batcher.stats(),
+        "text_cache": text_mod.cache_stats() if text_mod else None,
+        "text_cascade": text_mod.cascade_stats() if text_mod else None,
+        "face_frame_cache": face_frame_cache.stats(),
+        "history": history.stats(),
+        "pools": {p.name: p.stats() for p in (face_pool, text_pool)},
+        "endpoints": {name: lim.stats() for name, lim in ENDPOINT_LIMITS.items()},
+    })
+
+
+
+@app.route("/metrics", methods=["GET"])
+def prometheus_metrics():
+    if not metrics.HAVE_PROMETHEUS:
+        return jsonify({"error": "prometheus_client is not installed"}), 501
+    body, content_type = metrics.render()
+    return app.response_class(body, content_type=content_type)
+
+
+
 @app.route("/auth", methods=["POST", "OPTIONS"])
 def auth():
     if request.method == "OPTIONS":
@@ -159,14 +347,17 @@ def predict_text():
     text = data["text"]
 
     try:
-        if HAVE_TEXT_MODEL:
-            res = model_classify_text(text)
-            primary = res if isinstance(res, dict) else simple_classify(text)
-        else:
-            primary = simple_classify(text)
+        res = ENDPOINT_LIMITS["predict_text"].run(lambda: _text_model().classify_text(text))
+        primary = res if isinstance(res, dict) else simple_classify(text)
+    except Overloaded:
+        raise
     except Exception:
+        log.exception("Text model error")
+        metrics.count_fallback("text", "error")
         primary = simple_classify(text)
 
+    history.record(request.user, "text", primary["label"], primary["score"], note=text)
+
     return jsonify({
         "text": text,
         "predictions": [
@@ -176,56 +367,558 @@ def predict_text():
     })
 
 
-@app.route("/predict_face", methods=["POST", "OPTIONS"])
+TEXT_BATCH_MAX_ITEMS = int(os.environ.get("TEXT_BATCH_MAX_ITEMS", "512"))
+
+
+@app.route("/predict_text_batch", methods=["POST", "OPTIONS"])
 @require_auth
-def predict_face():
+def predict_text_batch():
     if request.method == "OPTIONS":
         return make_response("", 200)
 
+    data = request.get_json(silent=True)
+    if not data or not isinstance(data.get("texts"), list):
+        return jsonify({"error": "Texts required"}), 400
+
+    texts = data["texts"]
+    if not all(isinstance(t, str) for t in texts):
+        return jsonify({"error": "Texts must be strings"}), 400
+    if len(texts) > TEXT_BATCH_MAX_ITEMS:
+        return jsonify({"error": f"At most {TEXT_BATCH_MAX_ITEMS} texts per request"}), 400
+
     try:
-        data = request.get_json(silent=True)
-        if not data or "image" not in data:
-            return jsonify({"error": "Image required"}), 400
+        res = ENDPOINT_LIMITS["predict_text_batch"].run(lambda: _text_model().classify_text_batch(texts))
+        primaries = [r if isinstance(r, dict) else simple_classify(t) for r, t in zip(res, texts)]
+    except Overloaded:
+        raise
+    except Exception:
+        log.exception("Text model error")
+        metrics.count_fallback("text", "error", len(texts))
+        primaries = [simple_classify(t) for t in texts]
 
-        img_b64 = data["image"]
-        if "," in img_b64:
-            img_b64 = img_b64.split(",", 1)[1]
+    for text, primary in zip(texts, primaries):
+        history.record(request.user, "text_batch", primary["label"], primary["score"], note=text)
 
-        img_bytes = base64.b64decode(img_b64)
-        pil_img = Image.open(io.BytesIO(img_bytes)).convert("RGB")
+    return jsonify({
+        "results": [
+            {
+                "text": text,
+                "predictions": [
+                    primary,
+                    {"label": "neutral", "score": round(1 - primary["score"], 2)}
+                ]
+            }
+            for text, primary in zip(texts, primaries)
+        ]
+    })
 
-        img_np = np.array(pil_img)
-        img_bgr = cv2.cvtColor(img_np, cv2.COLOR_RGB2BGR)
-        gray = cv2.cvtColor(img_bgr, cv2.COLOR_BGR2GRAY)
 
-        face_cascade = cv2.CascadeClassifier(
-            cv2.data.haarcascades + "haarcascade_frontalface_default.xml"
-        )
+def _read_image_bytes():
+    """
+    Encoded image bytes (JPEG/PNG) from the current request, or None.
 
-        faces = face_cascade.detectMultiScale(gray, 1.1, 5)
+    Accepts a raw body (Content-Type image/* or application/octet-stream),
+    a multipart upload in the "image" field, or the original JSON
+    {"image": "<data URL or base64>"}.
+    """
+    mimetype = request.mimetype or ""
 
-        if len(faces) > 0:
-            x, y, w, h = max(faces, key=lambda f: f[2] * f[3])
-            face = img_bgr[y:y+h, x:x+w]
-            pil_face = Image.fromarray(cv2.cvtColor(face, cv2.COLOR_BGR2RGB))
+    if mimetype.startswith("image/") or mimetype == "application/octet-stream":
+        body = request.get_data(cache=False)
+        return body or None
+
+    if mimetype == "multipart/form-data":
+        upload = request.files.get("image")
+        return upload.read() if upload else None
+
+    data = request.get_json(silent=True)
+    if not data or "image" not in data:
+        return None
+
+    img_b64 = data["image"]
+    if "," in img_b64:
+        img_b64 = img_b64.split(",", 1)[1]
+    return base64.b64decode(img_b64)
+
+
+def _predict_face_bgr(img_bgr, session=None):
+    """
+    Detect the largest face in a BGR frame and classify it.
+    Returns (prediction, timings_ms, cached); with a `session`, a face crop
+    that is a near-duplicate of one of its recent crops returns the earlier
+    prediction instead of running the classifier.
+    """
+    detector = get_detector()
+    t0 = time.perf_counter()
+    small_gray = downscale_gray(img_bgr, getattr(detector, "max_side", 0))
+    faces = detector.detect(img_bgr, small_gray=small_gray)
+    t1 = time.perf_counter()
+
+    if len(faces) > 0:
+        x, y, w, h = max(faces, key=lambda f: f[2] * f[3])
+        face_rgb = cv2.cvtColor(img_bgr[y:y+h, x:x+w], cv2.COLOR_BGR2RGB)
+    else:
+        face_rgb = cv2.cvtColor(img_bgr, cv2.COLOR_BGR2RGB)
+    t2 = time.perf_counter()
+    timings = {
+        "detect": round((t1 - t0) * 1000, 2),
+        "crop": round((t2 - t1) * 1000, 2),
+    }
+
+    # keyed on the crop, so a change of expression changes the hash even
+    # when the face is a small part of the frame
+    use_cache = session is not None and face_frame_cache.enabled
+    if use_cache:
+        crop_gray = cv2.cvtColor(face_rgb, cv2.COLOR_RGB2GRAY) if len(faces) > 0 else small_gray
+        crop_hash = dhash(crop_gray)
+        cached = face_frame_cache.lookup(session, crop_hash)
+        t_hash = time.perf_counter()
+        timings["hash"] = round((t_hash - t2) * 1000, 2)
+        if cached is not None:
+            return cached, timings, True
+        t2 = t_hash
+
+    primary = face_batcher.submit(face_rgb)
+    timings["classify"] = round((time.perf_counter() - t2) * 1000, 2)
+
+    if use_cache:
+        face_frame_cache.store(session, crop_hash, primary)
+
+    return primary, timings, False
+
+
+def _predict_faces_bgr(img_bgr, max_faces=FACE_MAX_FACES):
+    """
+    Detect every face in a BGR frame and classify up to `max_faces` of them,
+    largest first, in a single batched forward pass.
+    Returns (faces, timings_ms, detected): faces is a list of predictions with
+    a "box" [x, y, w, h] in frame pixels, detected the number of faces found
+    before the cap. Without a face the whole frame is classified, box None.
+    """
+    detector = get_detector()
+    t0 = time.perf_counter()
+    small_gray = downscale_gray(img_bgr, getattr(detector, "max_side", 0))
+    faces = detector.detect(img_bgr, small_gray=small_gray)
+    t1 = time.perf_counter()
+
+    boxes = sorted((tuple(int(v) for v in f) for f in faces), key=lambda f: f[2] * f[3], reverse=True)
+    boxes = boxes[:max(1, max_faces)]
+    if boxes:
+        crops = [cv2.cvtColor(img_bgr[y:y+h, x:x+w], cv2.COLOR_BGR2RGB) for x, y, w, h in boxes]
+    else:
+        crops = [cv2.cvtColor(img_bgr, cv2.COLOR_BGR2RGB)]
+    t2 = time.perf_counter()
+
+    predictions = face_batcher.submit_many(crops)
+    t3 = time.perf_counter()
+
+    results = [
+        {"box": list(box) if box else None, **pred}
+        for box, pred in zip(boxes or [None], predictions)
+    ]
+    return results, {
+        "detect": round((t1 - t0) * 1000, 2),
+        "crop": round((t2 - t1) * 1000, 2),
+        "classify": round((t3 - t2) * 1000, 2),
+    }, len(faces)
+
+
+def _face_options():
+    """all_faces / max_faces from the query string, form fields or JSON body."""
+    data = request.get_json(silent=True) if request.is_json else None
+    data = data if isinstance(data, dict) else {}
+
+    def value(name):
+        return request.args.get(name, request.form.get(name, data.get(name)))
+
+    all_faces = str(value("all_faces") or "").lower() in ("1", "true", "yes", "on")
+    try:
+        max_faces = int(value("max_faces") or FACE_MAX_FACES)
+    except (TypeError, ValueError):
+        max_faces = FACE_MAX_FACES
+    return all_faces, min(max(1, max_faces), FACE_MAX_FACES)
+
+
+@app.route("/predict_face", methods=["POST", "OPTIONS"])
+@require_auth
+def predict_face():
+    if request.method == "OPTIONS":
+        return make_response("", 200)
+
+    try:
+        t_start = time.perf_counter()
+        img_bytes = _read_image_bytes()
+        if img_bytes is None:
+            return jsonify({"error": "Image required"}), 400
+        t_read = time.perf_counter()
+
+        img_bgr = cv2.imdecode(np.frombuffer(img_bytes, dtype=np.uint8), cv2.IMREAD_COLOR)
+        if img_bgr is None:
+            return jsonify({"error": "Invalid image"}), 400
+
+        t0 = time.perf_counter()
+        all_faces, max_faces = _face_options()
+        if all_faces:
+            faces, timings, detected = ENDPOINT_LIMITS["predict_face"].run(
+                _predict_faces_bgr, img_bgr, max_faces=max_faces
+            )
+            primary = {k: v for k, v in faces[0].items() if k != "box"}
+            cached = False
         else:
-            pil_face = pil_img
+            primary, timings, cached = ENDPOINT_LIMITS["predict_face"].run(
+                _predict_face_bgr, img_bgr, session=request.headers.get("Authorization")
+            )
+        metrics.observe_stage("predict_face", "read", t_read - t_start)
+        metrics.observe_stage("predict_face", "decode", t0 - t_read)
+        metrics.observe_stages_ms("predict_face", timings)
+        timings["decode"] = round((t0 - t_start) * 1000, 2)
 
-        primary = predict_face_emotion(pil_face)
+        history.record(request.user, "face", primary["label"], primary["score"])
 
-        return jsonify({
+        body = {
             "predictions": [
                 primary,
                 {"label": "neutral", "score": round(1 - primary.get("score", 0), 2)}
-            ]
-        })
-
+            ],
+            "cached": cached,
+            "timings_ms": timings
+        }
+        if all_faces:
+            body["faces"] = faces
+            body["faces_detected"] = detected
+
+        with metrics.stage("predict_face", "serialize"):
+            return jsonify(body)
+
+    except Overloaded:
+        raise
     except Exception as e:
         log.exception("Face error")
         return jsonify({"error": str(e)}), 500
 
 
 
+def _face_stream_worker(ws, slot, session):
+    while True:
+        item = slot.take()
+        if item is None:
+            return
+
+        seq, frame, received_at = item
+        try:
+            if isinstance(frame, str):
+                if "," in frame:
+                    frame = frame.split(",", 1)[1]
+                frame = base64.b64decode(frame)
+            img_bgr = cv2.imdecode(np.frombuffer(frame, dtype=np.uint8), cv2.IMREAD_COLOR)
+            if img_bgr is None:
+                msg = {"seq": seq, "error": "Invalid image"}
+            else:
+                primary, timings, cached = ENDPOINT_LIMITS["predict_face_stream"].run(
+                    _predict_face_bgr, img_bgr, session=session
+                )
+                timings["total"] = round((time.perf_counter() - received_at) * 1000, 2)
+                msg = {
+                    "seq": seq,
+                    "predictions": [
+                        primary,
+                        {"label": "neutral", "score": round(1 - primary.get("score", 0), 2)}
+                    ],
+                    "cached": cached,
+                    "timings_ms": timings,
+                }
+        except Overloaded as e:
+            msg = {"seq": seq, "error": str(e), "retry_after": e.retry_after}
+        except Exception as e:
+            log.exception("Face stream error")
+            msg = {"seq": seq, "error": str(e)}
+
+        msg["received"] = slot.received
+        msg["dropped"] = slot.dropped
+        try:
+            ws.send(json.dumps(msg))
+        except ConnectionClosed:
+            slot.close()
+            return
+
+
+def predict_face_stream(ws):
+    """
+    Streaming face emotion over a WebSocket: ws://host/ws/predict_face?token=<token>
+
+    The client sends frames as binary JPEG/PNG messages (or data URL text
+    messages). The server always processes the newest frame, dropping frames
+    that arrived while inference was busy, and sends back one JSON result per
+    processed frame with its sequence number.
+    """
+    token = request.args.get("token")
+    if not token or token not in SESSIONS:
+        ws.close(reason=1008, message="Unauthorized")
+        return
+
+    slot = LatestFrameSlot()
+    worker = threading.Thread(
+        target=_face_stream_worker, args=(ws, slot, token), name="face-stream", daemon=True
+    )
+    worker.start()
+
+    seq = 0
+    try:
+        while not slot.closed:
+            frame = ws.receive()
+            if frame is None:
+                break
+            seq += 1
+            slot.put((seq, frame, time.perf_counter()))
+    except ConnectionClosed:
+        pass
+    finally:
+        slot.close()
+        worker.join(timeout=5)
+
+
+if HAVE_WEBSOCKETS:
+    sock.route("/ws/predict_face")(predict_face_stream)
+
+
+
+# voice streams hold a request thread for the whole recording, so they are
+# capped separately; features and the classifier are cheap NumPy
+VOICE_MAX_STREAMS = int(os.environ.get("VOICE_MAX_STREAMS", "32"))
+VOICE_READ_BYTES = int(os.environ.get("VOICE_READ_BYTES", "6400"))   # 0.2 s of 16 kHz pcm16
+_voice_slots = threading.BoundedSemaphore(VOICE_MAX_STREAMS)
+
+
+def _open_voice_stream(args, mimetype=""):
+    """VoiceStream for the query parameters format / sample_rate / channels; raises ValueError."""
+    fmt = args.get("format") or ("wav" if mimetype in ("audio/wav", "audio/x-wav", "audio/wave") else "pcm16")
+    return voice_pipeline.VoiceStream(
+        voice_pipeline.load_model(),
+        sample_rate=int(args.get("sample_rate", 16000)),
+        fmt=fmt,
+        channels=int(args.get("channels", 1)),
+    )
+
+
+def _voice_done(user, vs, summary):
+    if "label" in summary:
+        history.record(user, "voice", summary["label"], summary["score"])
+    metrics.observe_stage("predict_voice", "features", vs.feature_seconds)
+    metrics.observe_stage("predict_voice", "classify", vs.classify_seconds)
+
+
+@app.route("/predict_voice", methods=["POST", "OPTIONS"])
+@require_auth
+def predict_voice():
+    """
+    Voice emotion over a streamed upload (chunked transfer encoding is fine).
+
+    Body: raw audio, ?format=pcm16 (default, little-endian int16) | f32 | wav
+    (also chosen by Content-Type audio/wav), ?sample_rate=16000, ?channels=1.
+    The response is NDJSON: one line per analysed window as soon as it is
+    complete ({"window", "start_s", "end_s", "label", "score",
+    "all_predictions"}), then a summary line with "done": true and the
+    emotion averaged over all windows.
+    """
+    if request.method == "OPTIONS":
+        return make_response("", 200)
+
+    try:
+        vs = _open_voice_stream(request.args, request.mimetype)
+    except RuntimeError as e:
+        return jsonify({"error": str(e)}), 503
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    if not _voice_slots.acquire(blocking=False):
+        raise Overloaded("predict_voice: too many voice streams", status=429, retry_after=5)
+
+    user = request.user
+    body = request.stream
+    released = []
+
+    def release():
+        # from the generator, or on close if the client left before it started
+        if not released:
+            released.append(True)
+            _voice_slots.release()
+
+    def generate():
+        try:
+            while True:
+                chunk = body.read(VOICE_READ_BYTES)
+                if not chunk:
+                    break
+                for result in vs.feed(chunk):
+                    yield json.dumps(result) + "\n"
+            results, summary = vs.finish()
+            for result in results:
+                yield json.dumps(result) + "\n"
+            _voice_done(user, vs, summary)
+            yield json.dumps(summary) + "\n"
+        except ValueError as e:
+            yield json.dumps({"done": True, "error": str(e)}) + "\n"
+        finally:
+            release()
+
+    response = app.response_class(stream_with_context(generate()), mimetype="application/x-ndjson")
+    response.call_on_close(release)
+    return response
+
+
+def predict_voice_stream(ws):
+    """
+    Voice emotion over a WebSocket:
+    ws://host/ws/predict_voice?token=<token>&sample_rate=16000&format=pcm16
+
+    The client sends audio chunks as binary messages and the text message
+    "end" when done; the server answers with one JSON message per analysed
+    window and a final summary ("done": true), as /predict_voice does.
+    """
+    token = request.args.get("token")
+    if not token or token not in SESSIONS:
+        ws.close(reason=1008, message="Unauthorized")
+        return
+    user = SESSIONS[token]
+
+    try:
+        vs = _open_voice_stream(request.args)
+    except (RuntimeError, ValueError) as e:
+        ws.send(json.dumps({"done": True, "error": str(e)}))
+        ws.close()
+        return
+
+    if not _voice_slots.acquire(blocking=False):
+        ws.send(json.dumps({"done": True, "error": "Too many voice streams", "retry_after": 5}))
+        ws.close()
+        return
+
+    try:
+        while True:
+            msg = ws.receive()
+            if msg is None or msg == "end":
+                break
+            if isinstance(msg, str):
+                continue
+            for result in vs.feed(msg):
+                ws.send(json.dumps(result))
+        results, summary = vs.finish()
+        for result in results:
+            ws.send(json.dumps(result))
+        _voice_done(user, vs, summary)
+        ws.send(json.dumps(summary))
+    except ValueError as e:
+        ws.send(json.dumps({"done": True, "error": str(e)}))
+    except ConnectionClosed:
+        pass
+    finally:
+        _voice_slots.release()
+
+
+if HAVE_WEBSOCKETS:
+    sock.route("/ws/predict_voice")(predict_voice_stream)
+
+
+
+# share of the face model in /predict_multimodal's fused distribution (text gets the rest)
+MULTIMODAL_FACE_WEIGHT = float(os.environ.get("MULTIMODAL_FACE_WEIGHT", "0.5"))
+
+
+def _classify_text_timed(text):
+    t0 = time.perf_counter()
+    try:
+        res = _text_model().classify_text(text)
+        primary = res if isinstance(res, dict) else simple_classify(text)
+    except Exception:
+        log.exception("Text model error")
+        metrics.count_fallback("text", "error")
+        primary = simple_classify(text)
+    return primary, round((time.perf_counter() - t0) * 1000, 2)
+
+
+@app.route("/predict_multimodal", methods=["POST", "OPTIONS"])
+@require_auth
+def predict_multimodal():
+    """
+    Face and/or text emotion in one round trip, fused into one emotion.
+
+    Body: JSON {"image": <data URL/base64>, "text": str, "message": str,
+    "face_weight": float}, or multipart with an "image" file and the same
+    fields as form values. At least one of image / text is required. The two
+    models run concurrently; with a "message" the chat reply for the fused
+    emotion is returned as well.
+    """
+    if request.method == "OPTIONS":
+        return make_response("", 200)
+
+    t_start = time.perf_counter()
+    fields = request.form if request.mimetype == "multipart/form-data" else (request.get_json(silent=True) or {})
+    text = str(fields.get("text") or "").strip() or None
+    message = fields.get("message") or None
+    try:
+        face_weight = float(fields.get("face_weight", MULTIMODAL_FACE_WEIGHT))
+    except (TypeError, ValueError):
+        return jsonify({"error": "face_weight must be a number"}), 400
+
+    try:
+        img_bytes = _read_image_bytes()
+    except ValueError:
+        return jsonify({"error": "Invalid image"}), 400
+    if img_bytes is None and text is None:
+        return jsonify({"error": "Image or text required"}), 400
+
+    img_bgr = None
+    if img_bytes is not None:
+        img_bgr = cv2.imdecode(np.frombuffer(img_bytes, dtype=np.uint8), cv2.IMREAD_COLOR)
+        if img_bgr is None:
+            return jsonify({"error": "Invalid image"}), 400
+
+    # text goes to its pool first, then this thread waits on the face model
+    pending_text = ENDPOINT_LIMITS["predict_multimodal_text"].submit(_classify_text_timed, text) if text else None
+    try:
+        face_primary, timings = None, {}
+        if img_bgr is not None:
+            try:
+                face_primary, timings, _ = ENDPOINT_LIMITS["predict_multimodal_face"].run(
+                    _predict_face_bgr, img_bgr, session=request.headers.get("Authorization")
+                )
+            except Overloaded:
+                raise
+            except Exception:
+                log.exception("Face error")
+                if pending_text is None:
+                    return jsonify({"error": "Face prediction failed"}), 500
+
+        text_primary = None
+        if pending_text is not None:
+            text_primary, timings["text"] = pending_text.result()
+            pending_text = None
+    finally:
+        if pending_text is not None:
+            pending_text.cancel()
+
+    fused = fuse(face_primary, text_primary, face_weight)
+    history.record(request.user, "multimodal", fused["label"], fused["score"], note=text)
+
+    reply = None
+    if message:
+        reply = _chat_reply(fused["label"])
+        history.record(request.user, "chat", fused["label"], note=message)
+
+    timings["total"] = round((time.perf_counter() - t_start) * 1000, 2)
+    metrics.observe_stages_ms("predict_multimodal", timings)
+    return jsonify({
+        "emotion": fused["label"],
+        "score": fused["score"],
+        "fused": fused,
+        "face": face_primary,
+        "text": text_primary,
+        "reply": reply,
+        "timings_ms": timings,
+    })
+
+
+
 @app.route("/chat", methods=["POST"])
 @require_auth
 def chat():
@@ -236,8 +929,9 @@ def chat():
     message = data.get("message", "")
     emotion = data.get("emotion", "neutral")
 
-    responses = EMOTION_RESPONSES.get(emotion, EMOTION_RESPONSES["neutral"])
-    reply = random.choice(responses)
+    reply = _chat_reply(emotion)
+
+    history.record(request.user, "chat", emotion, note=message)
 
     return jsonify({
         "reply": reply,
@@ -246,14 +940,77 @@ def chat():
 
 
 
+def _parse_time(value):
+    """Unix seconds or an ISO 8601 string -> Unix seconds (None passes through)."""
+    if value in (None, ""):
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        return datetime.fromisoformat(value).timestamp()
+
+
+@app.route("/history", methods=["GET"])
+@require_auth
+def get_history():
+    """
+    Newest-first prediction history of the current user.
+    Query: limit, cursor (from next_cursor), since, until, emotion, source.
+    """
+    args = request.args
+    try:
+        items, next_cursor = history.query(
+            request.user,
+            cursor=args.get("cursor") or None,
+            limit=int(args.get("limit", 50)),
+            since=_parse_time(args.get("since")),
+            until=_parse_time(args.get("until")),
+            emotion=args.get("emotion") or None,
+            source=args.get("source") or None,
+        )
+    except ValueError:
+        return jsonify({"error": "Invalid query"}), 400
+
+    return jsonify({"items": items, "next_cursor": next_cursor})
+
+
+@app.route("/history/summary", methods=["GET"])
+@require_auth
+def get_history_summary():
+    """Per-emotion counts / average score of the current user. Query: since, until, source."""
+    args = request.args
+    try:
+        emotions = history.summary(
+            request.user,
+            since=_parse_time(args.get("since")),
+            until=_parse_time(args.get("until")),
+            source=args.get("source") or None,
+        )
+    except ValueError:
+        return jsonify({"error": "Invalid query"}), 400
+
+    return jsonify({"emotions": emotions, "total": sum(e["count"] for e in emotions)})
+
+
+
 @app.route("/logout", methods=["POST"])
 @require_auth
 def logout():
     token = request.headers.get("Authorization")
     SESSIONS.pop(token, None)
+    face_frame_cache.drop_session(token)
     return jsonify({"success": True})
 
 
+if not LAZY_LOAD:
+    warm_up(blocking=True)
+elif WARMUP:
+    warm_up()
+
+STARTUP_SECONDS = round(time.perf_counter() - _IMPORT_STARTED, 3)
+log.info("Backend ready in %.3fs (lazy_load=%s, warmup=%s)", STARTUP_SECONDS, LAZY_LOAD, WARMUP)
+
+
 if __name__ == "__main__":
     log.info("Backend running at http://127.0.0.1:5000")
     app.run(host="127.0.0.1", port=5000, debug=True)
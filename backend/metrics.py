@@ -0,0 +1,167 @@
+# backend/metrics.py
+"""
+Prometheus metrics for the backend, served by main.py at GET /metrics.
+
+    with metrics.stage("predict_text", "tokenize"):
+        inputs = tokenizer(text, ...)
+    metrics.observe_stage("predict_face", "detect", seconds)
+    metrics.count_fallback("text", "inference_error")
+
+Request latency and counts per endpoint are recorded by hooks in main.py;
+the code above only adds per-stage timings. Recording a sample is one
+perf_counter() call and one histogram update.
+
+Several worker processes (gunicorn, see gunicorn.conf.py) are aggregated
+through prometheus_client's multiprocess mode: when PROMETHEUS_MULTIPROC_DIR
+is set before this module is imported, every process writes its samples to
+files in that directory and /metrics merges them, whichever worker answers.
+
+prometheus_client is optional; without it every call here is a no-op and
+/metrics answers 501.
+"""
+
+import os
+import resource
+import time
+
+try:
+    from prometheus_client import (
+        CONTENT_TYPE_LATEST,
+        REGISTRY,
+        CollectorRegistry,
+        Counter,
+        Gauge,
+        Histogram,
+        generate_latest,
+    )
+    from prometheus_client import multiprocess
+    HAVE_PROMETHEUS = True
+except ImportError:
+    CONTENT_TYPE_LATEST = "text/plain; charset=utf-8"
+    HAVE_PROMETHEUS = False
+
+MULTIPROC_DIR = os.environ.get("PROMETHEUS_MULTIPROC_DIR") or os.environ.get("prometheus_multiproc_dir")
+
+# 0.5 ms .. 10 s; stages are mostly in the low milliseconds
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+if HAVE_PROMETHEUS:
+    REQUEST_LATENCY = Histogram(
+        "emotion_request_seconds", "Request latency per endpoint",
+        ["endpoint"], buckets=LATENCY_BUCKETS,
+    )
+    REQUESTS = Counter(
+        "emotion_requests_total", "Requests per endpoint and HTTP status",
+        ["endpoint", "status"],
+    )
+    ERRORS = Counter(
+        "emotion_request_errors_total", "Requests that raised or returned a 5xx",
+        ["endpoint"],
+    )
+    STAGE_LATENCY = Histogram(
+        "emotion_stage_seconds", "Latency of one processing stage inside an endpoint",
+        ["endpoint", "stage"], buckets=LATENCY_BUCKETS,
+    )
+    FALLBACKS = Counter(
+        "emotion_model_fallbacks_total", "Predictions answered by a fallback instead of the model",
+        ["model", "reason"],
+    )
+    CASCADE = Counter(
+        "emotion_text_cascade_total", "Text predictions by cascade outcome (student, escalated, student_only)",
+        ["outcome"],
+    )
+    RSS = Gauge(
+        "emotion_process_resident_memory_bytes", "Resident set size of the worker process",
+        multiprocess_mode="liveall",
+    )
+
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+RSS_INTERVAL_SECONDS = 1.0
+_rss_updated = 0.0
+
+
+def _read_rss() -> int:
+    try:
+        with open("/proc/self/statm", "rb") as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE
+    except (OSError, ValueError, IndexError):
+        # no procfs (macOS): peak RSS, reported in bytes there
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def update_rss(force: bool = False):
+    """Refresh this process's RSS gauge, at most once per RSS_INTERVAL_SECONDS."""
+    global _rss_updated
+    if not HAVE_PROMETHEUS:
+        return
+    now = time.monotonic()
+    if force or now - _rss_updated >= RSS_INTERVAL_SECONDS:
+        _rss_updated = now
+        RSS.set(_read_rss())
+
+
+def observe_request(endpoint: str, status: int, seconds: float):
+    if not HAVE_PROMETHEUS:
+        return
+    REQUEST_LATENCY.labels(endpoint).observe(seconds)
+    REQUESTS.labels(endpoint, str(status)).inc()
+    if status >= 500:
+        ERRORS.labels(endpoint).inc()
+    update_rss()
+
+
+def observe_stage(endpoint: str, stage_name: str, seconds: float):
+    if HAVE_PROMETHEUS:
+        STAGE_LATENCY.labels(endpoint, stage_name).observe(seconds)
+
+
+def observe_stages_ms(endpoint: str, timings_ms: dict):
+    """Record a {stage: milliseconds} dict, as returned in the API's timings_ms."""
+    if HAVE_PROMETHEUS:
+        for stage_name, ms in timings_ms.items():
+            STAGE_LATENCY.labels(endpoint, stage_name).observe(ms / 1000.0)
+
+
+def count_fallback(model: str, reason: str, n: int = 1):
+    if HAVE_PROMETHEUS and n:
+        FALLBACKS.labels(model, reason).inc(n)
+
+
+def count_cascade(outcome: str, n: int = 1):
+    if HAVE_PROMETHEUS and n:
+        CASCADE.labels(outcome).inc(n)
+
+
+class stage:
+    """Context manager timing one stage: `with stage("predict_text", "forward"): ...`"""
+
+    __slots__ = ("endpoint", "name", "started")
+
+    def __init__(self, endpoint: str, name: str):
+        self.endpoint = endpoint
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        observe_stage(self.endpoint, self.name, time.perf_counter() - self.started)
+        return False
+
+
+def render():
+    """Returns (body, content_type) for the /metrics response."""
+    update_rss(force=True)
+    if MULTIPROC_DIR:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
+
+def mark_process_dead(pid: int):
+    """Called by gunicorn when a worker exits, so its live gauges are dropped."""
+    if HAVE_PROMETHEUS and MULTIPROC_DIR:
+        multiprocess.mark_process_dead(pid)
@@ -12,47 +12,37 @@ Behavior:
 - Tries to load a HF model + tokenizer from (in order):
     1) training/emotion_model
     2) training/results-distilbert
-- If neither exists or loading fails, falls back to a simple keyword classifier (safe fallback).
+  on first use (or on an explicit load_model() call), not at import.
+- If neither exists or loading fails, falls back to the shared keyword classifier
+  (keyword_classifier.simple_classify, safe fallback).
+
+Runtimes (TEXT_RUNTIME):
+    eager     -> fp32 PyTorch (default)
+    int8      -> the same model with its Linear layers dynamically quantized to INT8
+    onnx      -> <model dir>/model.onnx through onnxruntime
+    onnx-int8 -> <model dir>/model.int8.onnx through onnxruntime
+ONNX files are produced by training/export_text_model.py. If the selected
+runtime cannot be set up, the eager model is used.
+
+Cascade (TEXT_CASCADE):
+    The distilled student model (text_student.py, trained by
+    training/distill_text.py) answers first; only inputs whose top
+    probability is below TEXT_CASCADE_THRESHOLD (default: the threshold stored
+    with the student, else 0.9) go on to DistilBERT. "auto" (default) turns the
+    cascade on when the student file exists, "0" turns it off. How many inputs
+    were escalated is reported by cascade_stats() (/stats). Without a teacher
+    the student answers everything.
 """
 
 import os
 import math
+import threading
+import time
 
-
-SIMPLE_KEYWORDS = {
-    "happy": "joy",
-    "joy": "joy",
-    "glad": "joy",
-    "love": "joy",
-    "excited": "joy",
-    "sad": "sadness",
-    "unhappy": "sadness",
-    "depressed": "sadness",
-    "angry": "anger",
-    "mad": "anger",
-    "furious": "anger",
-    "scared": "fear",
-    "afraid": "fear",
-    "nervous": "fear",
-    "surprised": "surprise",
-    "wow": "surprise",
-    "neutral": "neutral",
-    "okay": "neutral",
-    "fine": "neutral",
-}
-
-
-def simple_classify(text: str):
-    t = (text or "").lower()
-    for kw, label in SIMPLE_KEYWORDS.items():
-        if kw in t:
-            return {"label": label, "score": 0.9}
-    if "!" in text:
-        return {"label": "joy", "score": 0.6}
-    if "?" in text:
-        return {"label": "neutral", "score": 0.55}
-    return {"label": "neutral", "score": 0.5}
-
+import metrics
+import text_student
+from keyword_classifier import simple_classify
+from result_cache import LRUCache
 
 
 MODEL_PATH_CANDIDATES = [
@@ -61,24 +51,99 @@ MODEL_PATH_CANDIDATES = [
 ]
 
 
+# TEXT_MODEL_DIR replaces the candidates with one folder (e.g. the stand-in
+# models of benchmarks/)
+if os.environ.get("TEXT_MODEL_DIR"):
+    MODEL_PATH_CANDIDATES = [os.environ["TEXT_MODEL_DIR"]]
+
 MODEL_PATH_CANDIDATES = [os.path.normpath(p) for p in MODEL_PATH_CANDIDATES]
 
+MODEL_NAME = "distilbert-base-uncased"
+
+# never reach out to the hub when running offline
+OFFLINE = os.environ.get("HF_HUB_OFFLINE", "0").lower() in ("1", "true", "yes")
+
 _use_model = False
 _tokenizer = None
 _model = None
 _id2label = None
 
+_runner = None    # callable: tokenizer output (pt tensors) -> logits tensor
+_runtime = None
 
-MODEL_NAME = "distilbert-base-uncased"
+TEXT_RUNTIME = os.environ.get("TEXT_RUNTIME", "eager").lower()
+ONNX_FILES = {"onnx": "model.onnx", "onnx-int8": "model.int8.onnx"}
 
-_use_model = False
-_tokenizer = None
-_model = None
-_id2label = None
+_load_lock = threading.Lock()
+_load_state = "not_loaded"   # not_loaded | loading | ready
+_load_seconds = None
+
+# memoizes model results for repeated messages ("ok", "thanks", ...);
+# TEXT_CACHE_SIZE=0 disables it, TEXT_CACHE_TTL=0 means entries never expire
+TEXT_CACHE_SIZE = int(os.environ.get("TEXT_CACHE_SIZE", "4096"))
+TEXT_CACHE_TTL = float(os.environ.get("TEXT_CACHE_TTL", "0"))
+
+_cache = LRUCache(max_size=TEXT_CACHE_SIZE, ttl_seconds=TEXT_CACHE_TTL or None, name="text")
+
+TEXT_CASCADE = os.environ.get("TEXT_CASCADE", "auto").lower()
+TEXT_CASCADE_THRESHOLD = os.environ.get("TEXT_CASCADE_THRESHOLD")
+DEFAULT_CASCADE_THRESHOLD = 0.9
+
+_cascade_lock = threading.Lock()
+_cascade_counts = {"student": 0, "escalated": 0, "student_only": 0}
 
 try:
     from transformers import AutoTokenizer, AutoModelForSequenceClassification
     import torch
+    HAVE_TRANSFORMERS = True
+except Exception as e:
+    # transformers / torch might not be installed or failed to import
+    print(f"[predict_text] Transformers/torch not available: {e}")
+    HAVE_TRANSFORMERS = False
+
+
+class _OnnxTextRunner:
+    def __init__(self, path: str):
+        import onnxruntime as ort
+
+        opts = ort.SessionOptions()
+        opts.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        opts.intra_op_num_threads = torch.get_num_threads()
+        self.session = ort.InferenceSession(path, opts, providers=["CPUExecutionProvider"])
+        self.input_names = [i.name for i in self.session.get_inputs()]
+
+    def __call__(self, inputs):
+        feed = {name: inputs[name].cpu().numpy() for name in self.input_names}
+        return torch.from_numpy(self.session.run(None, feed)[0])
+
+
+def _eager_runner(model):
+    return lambda inputs: model(**inputs).logits
+
+
+def build_runner(model, model_dir: str, runtime: str):
+    """Returns (runner, runtime_name) for `runtime`, falling back to eager on any problem."""
+    try:
+        if runtime == "eager":
+            pass
+        elif runtime == "int8":
+            # in place, so the fp32 Linear weights are not kept around as well
+            torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8, inplace=True)
+            return _eager_runner(model), "int8"
+        elif runtime in ONNX_FILES:
+            path = os.path.join(model_dir, ONNX_FILES[runtime])
+            if not os.path.exists(path):
+                raise RuntimeError(f"{path} not found (run training/export_text_model.py)")
+            return _OnnxTextRunner(path), runtime
+        else:
+            raise ValueError(f"Unknown TEXT_RUNTIME {runtime!r}")
+    except Exception as e:
+        print(f"[predict_text] Could not use {runtime} runtime, falling back to eager: {e}")
+    return _eager_runner(model), "eager"
+
+
+def _load_from_candidates():
+    global _use_model, _tokenizer, _model, _id2label, _runner, _runtime
 
     for p in MODEL_PATH_CANDIDATES:
         if os.path.isdir(p):
@@ -91,11 +156,13 @@ try:
                 except Exception as tok_err:
                     # fallback to the base tokenizer from the hub (or local cache)
                     print(f"[predict_text] Local tokenizer not found in {p}, falling back to '{MODEL_NAME}': {tok_err}")
-                    _tokenizer = AutoTokenizer.from_pretrained(MODEL_NAME)
+                    _tokenizer = AutoTokenizer.from_pretrained(MODEL_NAME, local_files_only=OFFLINE)
 
                 # --- model: load from the local folder (safetensors or pytorch files)
                 # Use local_files_only=True so it reads the files from disk and doesn't try to resolve a hub id
                 _model = AutoModelForSequenceClassification.from_pretrained(p, local_files_only=True)
+                _model.eval()
+                _runner, _runtime = build_runner(_model, p, TEXT_RUNTIME)
 
                 # get id2label mapping from model config (best-effort)
                 cfg = getattr(_model, "config", None)
@@ -107,7 +174,7 @@ try:
                         _id2label = {i: str(i) for i in range(num)}
 
                 _use_model = True
-                print(f"[predict_text] Loaded model from: {p}")
+                print(f"[predict_text] Loaded model from: {p} (runtime: {_runtime})")
                 break
             except Exception as e:
                 # print and try next candidate
@@ -115,53 +182,275 @@ try:
                 _tokenizer = None
                 _model = None
                 _id2label = None
+                _runner = None
 
     if _use_model and _model is None:
         _use_model = False
-except Exception as e:
-    # transformers / torch might not be installed or failed to import
-    print(f"[predict_text] Transformers/torch not available: {e}")
-    _use_model = False
+
+
+def load_model():
+    """
+    Load tokenizer + model once (thread-safe). Called lazily by classify_text;
+    call it directly to warm up. If no model can be loaded, classify_text keeps
+    using the keyword fallback.
+    """
+    global _load_state, _load_seconds
+
+    if _load_state == "ready":
+        return
+    with _load_lock:
+        if _load_state == "ready":
+            return
+        _load_state = "loading"
+        t0 = time.perf_counter()
+        if HAVE_TRANSFORMERS:
+            _load_from_candidates()
+        _load_seconds = time.perf_counter() - t0
+        _load_state = "ready"
+
+
+def reload_model():
+    """Drop the loaded model (and every cached result) and load it again."""
+    global _load_state, _use_model, _tokenizer, _model, _id2label, _runner, _runtime
+
+    with _load_lock:
+        _use_model = False
+        _tokenizer = _model = _id2label = _runner = _runtime = None
+        _load_state = "not_loaded"
+        _cache.clear()
+        text_student.reset()
+    load_model()
+
+
+def cache_stats() -> dict:
+    return _cache.stats()
+
+
+def _student():
+    """The student model when the cascade is enabled and it is available, else None."""
+    if TEXT_CASCADE in ("0", "false", "no", "off"):
+        return None
+    return text_student.load_model()
+
+
+def cascade_threshold(student=None) -> float:
+    if TEXT_CASCADE_THRESHOLD:
+        return float(TEXT_CASCADE_THRESHOLD)
+    student = student or _student()
+    if student is not None and student.threshold is not None:
+        return float(student.threshold)
+    return DEFAULT_CASCADE_THRESHOLD
+
+
+def _count_cascade(outcome: str, n: int = 1):
+    if n:
+        with _cascade_lock:
+            _cascade_counts[outcome] += n
+        metrics.count_cascade(outcome, n)
+
+
+def cascade_stats() -> dict:
+    with _cascade_lock:
+        counts = dict(_cascade_counts)
+    routed = counts["student"] + counts["escalated"]
+    student = _student()
+    return {
+        "enabled": student is not None,
+        "threshold": cascade_threshold(student) if student is not None else None,
+        **counts,
+        "escalation_fraction": counts["escalated"] / routed if routed else None,
+    }
+
+
+def _cache_key(text: str) -> str:
+    key = " ".join(text.split())
+    if getattr(_tokenizer, "do_lower_case", False):
+        key = key.lower()
+    return key
+
+
+def load_status() -> dict:
+    return {
+        "ready": _load_state == "ready",
+        "state": _load_state,
+        "load_seconds": _load_seconds,
+        "using_model": _use_model,
+        "runtime": _runtime,
+        "student": text_student.load_status()["ready"],
+    }
+
+
+def _result_from_probs(probs):
+    best_idx = int(probs.argmax())
+    best_score = float(probs[best_idx])
+    label = _id2label.get(best_idx, str(best_idx)) if _id2label else str(best_idx)
+    # ensure label is a string
+    label = str(label)
+    # clamp score
+    if isinstance(best_score, (float, int)) and (not math.isnan(best_score)):
+        score = float(best_score)
+    else:
+        score = 0.0
+    # full distribution, same shape as the face model's (used for fusion)
+    all_predictions = sorted(
+        ({"label": str(_id2label.get(i, i)) if _id2label else str(i), "score": float(p)} for i, p in enumerate(probs)),
+        key=lambda x: x["score"],
+        reverse=True,
+    )
+    return {"label": label, "score": score, "all_predictions": all_predictions}
 
 
 def classify_text(text: str):
     """
-    Returns {"label": str, "score": float}
+    Returns {"label": str, "score": float}, plus "all_predictions" (every
+    label with its probability) when the model answered.
     """
     if not text or not isinstance(text, str) or text.strip() == "":
         return {"label": "neutral", "score": 0.0}
 
+    load_model()
+    student = _student()
+
     if _use_model and _tokenizer is not None and _model is not None:
+        key = _cache_key(text)
+        cached = _cache.get(key)
+        if cached is not None:
+            return dict(cached)
+
+        if student is not None:
+            with metrics.stage("predict_text", "student"):
+                probs = student.predict_proba(text)
+            if probs.max() >= cascade_threshold(student):
+                _count_cascade("student")
+                result = student.format(probs)
+                _cache.put(key, result)
+                return dict(result)
+            _count_cascade("escalated")
+
         try:
             # prepare inputs
-            inputs = _tokenizer(text, truncation=True, padding=True, return_tensors="pt")
-            _model.eval()
-            with torch.no_grad():
-                outputs = _model(**inputs)
-                logits = outputs.logits
+            with metrics.stage("predict_text", "tokenize"):
+                inputs = _tokenizer(text, truncation=True, padding=True, return_tensors="pt")
+            with metrics.stage("predict_text", "forward"), torch.no_grad():
+                logits = _runner(inputs)
                 # softmax
                 probs = torch.softmax(logits, dim=-1).squeeze().cpu().numpy()
-                # pick best
-                best_idx = int(probs.argmax())
-                best_score = float(probs[best_idx])
-                label = _id2label.get(best_idx, str(best_idx)) if _id2label else str(best_idx)
-                # ensure label is a string
-                label = str(label)
-                # clamp score
-                if isinstance(best_score, (float, int)) and (not math.isnan(best_score)):
-                    score = float(best_score)
-                else:
-                    score = 0.0
-                return {"label": label, "score": score}
+            result = _result_from_probs(probs)
+            _cache.put(key, result)
+            return dict(result)
         except Exception as e:
             # fallback to simple classifier on any model error
             print(f"[predict_text] Model inference failed, falling back to rule-based. Error: {e}")
+            metrics.count_fallback("text", "inference_error")
             return simple_classify(text)
 
+    if student is not None:
+        _count_cascade("student_only")
+        return student.format(student.predict_proba(text))
+
     # fallback
+    metrics.count_fallback("text", "model_unavailable")
     return simple_classify(text)
 
 
+# max number of texts that go through the model in one forward pass
+BATCH_BUCKET_SIZE = int(os.environ.get("TEXT_BATCH_BUCKET_SIZE", "32"))
+
+
+def classify_text_batch(texts):
+    """
+    Classify many texts at once. Returns a list of {"label": str, "score": float}
+    in the same order as `texts`.
+
+    Inputs are tokenized without padding, sorted by token length and split into
+    buckets of up to BATCH_BUCKET_SIZE; each bucket is padded only to its own
+    longest item and runs as a single forward pass.
+    """
+    results = [None] * len(texts)
+    todo = []
+    for i, text in enumerate(texts):
+        if not text or not isinstance(text, str) or text.strip() == "":
+            results[i] = {"label": "neutral", "score": 0.0}
+        else:
+            todo.append(i)
+
+    if not todo:
+        return results
+
+    load_model()
+    student = _student()
+
+    if not (_use_model and _tokenizer is not None and _model is not None):
+        if student is not None:
+            _count_cascade("student_only", len(todo))
+            for i in todo:
+                results[i] = student.format(student.predict_proba(texts[i]))
+            return results
+        metrics.count_fallback("text", "model_unavailable", len(todo))
+        for i in todo:
+            results[i] = simple_classify(texts[i])
+        return results
+
+    keys = {}
+    misses = []
+    for i in todo:
+        keys[i] = _cache_key(texts[i])
+        cached = _cache.get(keys[i])
+        if cached is not None:
+            results[i] = dict(cached)
+        else:
+            misses.append(i)
+    todo = misses
+
+    if student is not None and todo:
+        threshold = cascade_threshold(student)
+        unsure = []
+        with metrics.stage("predict_text_batch", "student"):
+            for i in todo:
+                probs = student.predict_proba(texts[i])
+                if probs.max() >= threshold:
+                    result = student.format(probs)
+                    _cache.put(keys[i], result)
+                    results[i] = dict(result)
+                else:
+                    unsure.append(i)
+        _count_cascade("student", len(todo) - len(unsure))
+        _count_cascade("escalated", len(unsure))
+        todo = unsure
+
+    if not todo:
+        return results
+
+    try:
+        with metrics.stage("predict_text_batch", "tokenize"):
+            enc = _tokenizer([texts[i] for i in todo], truncation=True, padding=False)
+        ids = enc["input_ids"]
+        masks = enc["attention_mask"]
+
+        # shortest first, so every bucket holds similarly sized inputs
+        order = sorted(range(len(todo)), key=lambda k: len(ids[k]))
+
+        with torch.no_grad():
+            for start in range(0, len(order), BATCH_BUCKET_SIZE):
+                bucket = order[start:start + BATCH_BUCKET_SIZE]
+                features = [{"input_ids": ids[k], "attention_mask": masks[k]} for k in bucket]
+                inputs = _tokenizer.pad(features, padding=True, return_tensors="pt")
+                with metrics.stage("predict_text_batch", "forward"):
+                    logits = _runner(inputs)
+                probs = torch.softmax(logits, dim=-1).cpu().numpy()
+                for k, row in zip(bucket, probs):
+                    result = _result_from_probs(row)
+                    _cache.put(keys[todo[k]], result)
+                    results[todo[k]] = dict(result)
+    except Exception as e:
+        print(f"[predict_text] Batch inference failed, falling back to rule-based. Error: {e}")
+        metrics.count_fallback("text", "inference_error", len(todo))
+        for i in todo:
+            results[i] = simple_classify(texts[i])
+
+    return results
+
+
 # convenience: allow import of function as default
 if __name__ == "__main__":
     # quick interactive demo when run directly
@@ -0,0 +1,35 @@
+# backend/serve.py
+"""
+Production entrypoint: the Flask app under gunicorn's pre-forking server.
+
+    cd backend
+    gunicorn -c gunicorn.conf.py
+
+Gunicorn imports this module once, in the master (preload_app), before it
+forks the workers. Both models are loaded here, so every worker shares the
+weight tensors copy-on-write instead of holding its own copy. Worker, thread
+and torch thread sizing lives in gunicorn.conf.py.
+"""
+
+import gc
+import os
+
+# no background warm-up thread in the master: threads don't survive fork()
+os.environ.setdefault("EMOTION_LAZY_LOAD", "1")
+os.environ["EMOTION_WARMUP"] = "0"
+
+import torch
+
+# keep torch single-threaded in the master; the intra-op pool is sized per
+# worker in gunicorn.conf.py:post_fork
+torch.set_num_threads(1)
+
+import main  # noqa: E402
+
+main.warm_up(blocking=True)
+
+# objects that exist now live for the whole process; keep the cyclic GC from
+# touching them (and so from un-sharing their pages in every worker)
+gc.freeze()
+
+app = main.app
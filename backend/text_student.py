@@ -0,0 +1,137 @@
+# backend/text_student.py
+"""
+Lightweight text emotion model distilled from the fine-tuned DistilBERT.
+
+A linear classifier over hashed sparse features: lower-cased word unigrams
+and bigrams plus character 3-5-grams of each word (fastText-style subwords,
+so misspellings and inflections still share features). Features are hashed
+with CRC32 into N buckets, weighted by sublinear term frequency and
+L2-normalised; a prediction is one gather of N x labels weights and a
+softmax, tens of microseconds in NumPy against milliseconds for a
+transformer forward pass.
+
+    student = StudentClassifier(MODEL_PATH)
+    probs = student.predict_proba("I can't believe it, this is amazing")
+    student.format(probs)    # {"label", "score", "all_predictions"}
+
+predict_text serves it in front of the teacher (see TEXT_CASCADE there).
+The model is trained by training/distill_text.py and stored as
+training/results-text-student/student.npz (TEXT_STUDENT_DIR overrides the
+folder); the npz records the feature settings and the confidence threshold
+picked on the validation set.
+"""
+
+import json
+import os
+import re
+import threading
+import zlib
+from pathlib import Path
+
+import numpy as np
+
+
+ROOT_DIR = Path(__file__).resolve().parent.parent / "training"
+MODEL_DIR = Path(os.environ.get("TEXT_STUDENT_DIR") or ROOT_DIR / "results-text-student")
+MODEL_PATH = MODEL_DIR / "student.npz"
+
+FEATURE_CONFIG = {
+    "n_features": 1 << 18,
+    "word_ngrams": 2,      # unigrams .. n-grams of words
+    "char_min": 3,         # character n-grams of "<word>"
+    "char_max": 5,
+}
+
+_WORD_RE = re.compile(r"[a-z0-9']+")
+
+_model = None
+_load_lock = threading.Lock()
+_load_state = "not_loaded"   # not_loaded | ready | failed
+_load_error = None
+
+
+def featurize(text: str, config: dict = FEATURE_CONFIG):
+    """(indices, values) of the hashed, L2-normalised feature vector of `text`."""
+    words = _WORD_RE.findall(text.lower())
+    n = int(config["n_features"])
+    grams = []
+    for k in range(1, int(config["word_ngrams"]) + 1):
+        grams.extend("w%d:%s" % (k, " ".join(words[i:i + k])) for i in range(len(words) - k + 1))
+    lo, hi = int(config["char_min"]), int(config["char_max"])
+    for word in words:
+        w = f"<{word}>"
+        for size in range(lo, min(hi, len(w)) + 1):
+            grams.extend("c:" + w[i:i + size] for i in range(len(w) - size + 1))
+
+    if not grams:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+    hashed = np.fromiter((zlib.crc32(g.encode()) for g in grams), dtype=np.int64, count=len(grams)) % n
+    indices, counts = np.unique(hashed, return_counts=True)
+    values = (1.0 + np.log(counts)).astype(np.float32)
+    values /= np.linalg.norm(values)
+    return indices, values
+
+
+class StudentClassifier:
+    """Linear model over hashed n-gram features, in NumPy."""
+
+    def __init__(self, path):
+        data = np.load(path, allow_pickle=False)
+        self.weight, self.bias = data["weight"], data["bias"]    # [n_features, labels], [labels]
+        self.labels = [str(l) for l in data["labels"]]
+        self.config = {**FEATURE_CONFIG, **json.loads(str(data["config"]))}
+        if self.weight.shape[0] != int(self.config["n_features"]):
+            raise ValueError(f"{path}: weight rows {self.weight.shape[0]} != n_features {self.config['n_features']}")
+
+    @property
+    def threshold(self):
+        """Confidence threshold chosen by training/distill_text.py, if recorded."""
+        return self.config.get("threshold")
+
+    def logits(self, text: str) -> np.ndarray:
+        indices, values = featurize(text, self.config)
+        return values @ self.weight[indices] + self.bias
+
+    def predict_proba(self, text: str) -> np.ndarray:
+        logits = self.logits(text)
+        e = np.exp(logits - logits.max())
+        return e / e.sum()
+
+    def format(self, probs: np.ndarray) -> dict:
+        ranked = sorted(
+            ({"label": l, "score": float(p)} for l, p in zip(self.labels, probs)),
+            key=lambda x: x["score"],
+            reverse=True,
+        )
+        return {"label": ranked[0]["label"], "score": ranked[0]["score"], "all_predictions": ranked}
+
+
+def load_model():
+    """The student model (loaded once), or None if it has not been trained or fails to load."""
+    global _model, _load_state, _load_error
+    if _model is not None or _load_state == "failed":
+        return _model
+    with _load_lock:
+        if _model is None and _load_state != "failed":
+            if not MODEL_PATH.exists():
+                _load_state, _load_error = "failed", f"Student model not found: {MODEL_PATH} (run training/distill_text.py)"
+                return None
+            try:
+                _model = StudentClassifier(MODEL_PATH)
+            except Exception as e:
+                print(f"[text_student] Failed to load {MODEL_PATH}: {e}")
+                _load_state, _load_error = "failed", str(e)
+                return None
+            _load_state, _load_error = "ready", None
+    return _model
+
+
+def reset():
+    """Forget the loaded model so the next load_model() reads the file again."""
+    global _model, _load_state, _load_error
+    with _load_lock:
+        _model, _load_state, _load_error = None, "not_loaded", None
+
+
+def load_status() -> dict:
+    return {"ready": _model is not None, "state": _load_state, "error": _load_error}
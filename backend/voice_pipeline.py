@@ -0,0 +1,432 @@
+# backend/voice_pipeline.py
+"""
+Streaming voice emotion: incremental log-mel / MFCC features and a small
+NumPy classifier over sliding windows.
+
+Audio arrives in arbitrary chunks. Every chunk is decoded to float samples,
+resampled to the model rate if needed and turned into new 25 ms / 10 ms
+log-mel frames in one vectorized FFT; only the few samples that do not yet
+fill a frame are carried over, so earlier audio is never processed twice.
+Frames go into a ring buffer holding one analysis window (1 s by default);
+every step (0.5 s) the window is summarised (MFCC mean / std, energy) and
+classified:
+
+    stream = VoiceStream(load_model(), sample_rate=16000, fmt="pcm16")
+    for chunk in chunks:
+        for result in stream.feed(chunk):    # one dict per finished window
+            ...
+    results, summary = stream.finish()
+
+The classifier is a one-hidden-layer MLP trained by training/train_voice.py
+and stored as training/results-voice/voice_model.npz (VOICE_MODEL_DIR
+overrides the folder). The npz also records the feature settings, which
+training and serving share through this module.
+"""
+
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+
+
+ROOT_DIR = Path(__file__).resolve().parent.parent / "training"
+MODEL_DIR = Path(os.environ.get("VOICE_MODEL_DIR") or ROOT_DIR / "results-voice")
+MODEL_PATH = MODEL_DIR / "voice_model.npz"
+
+FEATURE_CONFIG = {
+    "sample_rate": 16000,
+    "n_fft": 400,        # 25 ms
+    "hop": 160,          # 10 ms
+    "n_mels": 40,
+    "n_mfcc": 13,
+    "fmin": 20.0,
+    "fmax": 8000.0,
+    "preemphasis": 0.97,
+    "window_s": 1.0,     # analysis window per prediction
+    "step_s": 0.5,       # a prediction every step
+    "min_window_s": 0.3,  # shortest tail still classified at the end of a stream
+}
+
+# accepted input audio: anything outside is a client error, not audio
+MAX_SAMPLE_RATE = 192000
+MAX_CHANNELS = 8
+
+_model = None
+_load_lock = threading.Lock()
+_load_state = "not_loaded"   # not_loaded | ready | failed
+_load_error = None
+
+
+# ---------- feature extraction ----------
+
+def _hz_to_mel(hz):
+    return 2595.0 * np.log10(1.0 + np.asarray(hz) / 700.0)
+
+
+def _mel_to_hz(mel):
+    return 700.0 * (10.0 ** (np.asarray(mel) / 2595.0) - 1.0)
+
+
+def mel_filterbank(sample_rate: int, n_fft: int, n_mels: int, fmin: float = 0.0, fmax: float = None) -> np.ndarray:
+    """Triangular HTK-style mel filters, shape (n_mels, n_fft // 2 + 1)."""
+    fmax = fmax or sample_rate / 2.0
+    hz = _mel_to_hz(np.linspace(_hz_to_mel(fmin), _hz_to_mel(fmax), n_mels + 2))
+    bins = np.fft.rfftfreq(n_fft, 1.0 / sample_rate)
+    lower = (bins[None, :] - hz[:-2, None]) / (hz[1:-1] - hz[:-2])[:, None]
+    upper = (hz[2:, None] - bins[None, :]) / (hz[2:] - hz[1:-1])[:, None]
+    return np.maximum(0.0, np.minimum(lower, upper)).astype(np.float32)
+
+
+def dct_matrix(n_mfcc: int, n_mels: int) -> np.ndarray:
+    """Orthonormal DCT-II, shape (n_mfcc, n_mels): mfcc = log_mel @ dct.T."""
+    n = np.arange(n_mels)
+    k = np.arange(n_mfcc)[:, None]
+    dct = np.cos(np.pi / n_mels * (n + 0.5) * k) * np.sqrt(2.0 / n_mels)
+    dct[0] /= np.sqrt(2.0)
+    return dct.astype(np.float32)
+
+
+class StreamingLogMel:
+    """Log-mel frames from audio pushed in chunks; each sample is framed exactly once."""
+
+    def __init__(self, config: dict = None):
+        c = {**FEATURE_CONFIG, **(config or {})}
+        self.n_fft = int(c["n_fft"])
+        self.hop = int(c["hop"])
+        self.preemphasis = float(c["preemphasis"])
+        self.window = np.hanning(self.n_fft).astype(np.float32)
+        self.filters = mel_filterbank(c["sample_rate"], self.n_fft, int(c["n_mels"]), c["fmin"], c["fmax"])
+        self._tail = np.zeros(0, dtype=np.float32)   # samples not yet covered by a full frame
+        self._prev = 0.0                              # last raw sample, for pre-emphasis
+
+    def push(self, samples: np.ndarray) -> np.ndarray:
+        """Returns the log-mel frames completed by `samples`, shape (n_frames, n_mels)."""
+        samples = np.asarray(samples, dtype=np.float32)
+        if samples.size:
+            emphasized = np.empty_like(samples)
+            emphasized[0] = samples[0] - self.preemphasis * self._prev
+            emphasized[1:] = samples[1:] - self.preemphasis * samples[:-1]
+            self._prev = float(samples[-1])
+            buf = np.concatenate([self._tail, emphasized])
+        else:
+            buf = self._tail
+
+        if buf.size < self.n_fft:
+            self._tail = buf
+            return np.zeros((0, self.filters.shape[0]), dtype=np.float32)
+
+        n_frames = 1 + (buf.size - self.n_fft) // self.hop
+        frames = np.lib.stride_tricks.sliding_window_view(buf, self.n_fft)[::self.hop][:n_frames]
+        power = np.abs(np.fft.rfft(frames * self.window, axis=1)) ** 2
+        log_mel = np.log(power.astype(np.float32) @ self.filters.T + 1e-10)
+
+        self._tail = buf[n_frames * self.hop:].copy()
+        return log_mel
+
+
+class FrameRing:
+    """Fixed-capacity ring buffer of feature frames (the current analysis window)."""
+
+    def __init__(self, capacity: int, dim: int):
+        self._buf = np.zeros((capacity, dim), dtype=np.float32)
+        self.capacity = capacity
+        self._next = 0
+        self.size = 0
+
+    def extend(self, frames: np.ndarray):
+        frames = frames[-self.capacity:]
+        n = len(frames)
+        first = min(n, self.capacity - self._next)
+        self._buf[self._next:self._next + first] = frames[:first]
+        self._buf[:n - first] = frames[first:]
+        self._next = (self._next + n) % self.capacity
+        self.size = min(self.capacity, self.size + n)
+
+    def window(self) -> np.ndarray:
+        """The buffered frames, oldest first."""
+        if self.size < self.capacity:
+            return self._buf[:self.size]
+        return np.concatenate([self._buf[self._next:], self._buf[:self._next]])
+
+
+def window_features(log_mel: np.ndarray, dct: np.ndarray) -> np.ndarray:
+    """Fixed-size summary of one window: MFCC mean and std, mean energy and its std."""
+    mfcc = log_mel @ dct.T
+    energy = log_mel.mean(axis=1)
+    return np.concatenate([mfcc.mean(axis=0), mfcc.std(axis=0), [energy.mean(), energy.std()]]).astype(np.float32)
+
+
+def clip_features(samples: np.ndarray, config: dict = None):
+    """
+    Window features for a whole clip (training): the same windows the stream
+    would produce. Returns an array of shape (n_windows, n_features).
+    """
+    c = {**FEATURE_CONFIG, **(config or {})}
+    log_mel = StreamingLogMel(c).push(samples)
+    dct = dct_matrix(int(c["n_mfcc"]), int(c["n_mels"]))
+    win = int(round(c["window_s"] * c["sample_rate"] / c["hop"]))
+    step = int(round(c["step_s"] * c["sample_rate"] / c["hop"]))
+    min_win = int(round(c["min_window_s"] * c["sample_rate"] / c["hop"]))
+
+    if len(log_mel) < win:
+        if len(log_mel) < min_win:
+            return np.zeros((0, 2 * int(c["n_mfcc"]) + 2), dtype=np.float32)
+        return window_features(log_mel, dct)[None, :]
+    return np.stack([window_features(log_mel[s:s + win], dct) for s in range(0, len(log_mel) - win + 1, step)])
+
+
+# ---------- decoding ----------
+
+def check_format(sample_rate: int, channels: int):
+    """Raises ValueError unless 0 < sample_rate <= MAX_SAMPLE_RATE and 0 < channels <= MAX_CHANNELS."""
+    if not 0 < sample_rate <= MAX_SAMPLE_RATE:
+        raise ValueError(f"Invalid sample rate {sample_rate} (expected 1..{MAX_SAMPLE_RATE})")
+    if not 0 < channels <= MAX_CHANNELS:
+        raise ValueError(f"Invalid channel count {channels} (expected 1..{MAX_CHANNELS})")
+
+
+class PcmDecoder:
+    """
+    Bytes -> mono float32 samples in [-1, 1], across arbitrary chunk borders.
+
+    fmt is "pcm16" (little-endian int16), "f32" (little-endian float32) or
+    "wav"; with "wav" (or when a chunk stream starts with a RIFF header) the
+    rate, channels and sample format come from the header.
+    """
+
+    def __init__(self, fmt: str = "pcm16", sample_rate: int = 16000, channels: int = 1):
+        if fmt not in ("pcm16", "f32", "wav"):
+            raise ValueError(f"Unknown audio format: {fmt!r} (expected pcm16, f32 or wav)")
+        self.fmt = fmt
+        self.sample_rate = int(sample_rate)
+        self.channels = int(channels)
+        check_format(self.sample_rate, self.channels)
+        self._pending = b""
+        self._header_done = fmt != "wav"
+        self._sniffed = False
+
+    @property
+    def ready(self) -> bool:
+        """True once the sample rate / format are known (after the WAV header, if any)."""
+        return self._sniffed and self._header_done
+
+    def _parse_wav_header(self) -> bool:
+        data = self._pending
+        if len(data) < 12:
+            return False
+        if data[:4] != b"RIFF" or data[8:12] != b"WAVE":
+            raise ValueError("Not a WAV stream")
+        pos = 12
+        while pos + 8 <= len(data):
+            chunk_id = data[pos:pos + 4]
+            size = int.from_bytes(data[pos + 4:pos + 8], "little")
+            if chunk_id == b"data":
+                self._pending = data[pos + 8:]
+                return True
+            if pos + 8 + size > len(data):
+                return False
+            if chunk_id == b"fmt ":
+                body = data[pos + 8:pos + 8 + size]
+                audio_format = int.from_bytes(body[0:2], "little")
+                self.channels = int.from_bytes(body[2:4], "little")
+                self.sample_rate = int.from_bytes(body[4:8], "little")
+                bits = int.from_bytes(body[14:16], "little")
+                check_format(self.sample_rate, self.channels)
+                if audio_format == 1 and bits == 16:
+                    self.fmt = "pcm16"
+                elif audio_format == 3 and bits == 32:
+                    self.fmt = "f32"
+                else:
+                    raise ValueError(f"Unsupported WAV encoding (format {audio_format}, {bits} bit)")
+            pos += 8 + size + (size & 1)
+        return False
+
+    def feed(self, data: bytes) -> np.ndarray:
+        self._pending += data
+        if not self._sniffed:
+            if len(self._pending) < 4:
+                return np.zeros(0, dtype=np.float32)
+            self._sniffed = True
+            if self._pending[:4] == b"RIFF":
+                self._header_done = False
+        if not self._header_done:
+            if not self._parse_wav_header():
+                return np.zeros(0, dtype=np.float32)
+            self._header_done = True
+
+        width = 2 if self.fmt == "pcm16" else 4
+        frame_bytes = width * self.channels
+        usable = len(self._pending) - len(self._pending) % frame_bytes
+        raw, self._pending = self._pending[:usable], self._pending[usable:]
+        if not raw:
+            return np.zeros(0, dtype=np.float32)
+
+        if self.fmt == "pcm16":
+            samples = np.frombuffer(raw, dtype="<i2").astype(np.float32) / 32768.0
+        else:
+            samples = np.frombuffer(raw, dtype="<f4").astype(np.float32)
+        if self.channels > 1:
+            samples = samples.reshape(-1, self.channels).mean(axis=1)
+        return samples
+
+
+class LinearResampler:
+    """Streaming linear-interpolation resampler (phase carried between chunks)."""
+
+    def __init__(self, in_rate: int, out_rate: int):
+        if in_rate <= 0 or out_rate <= 0:
+            raise ValueError(f"Invalid resampling rates {in_rate} -> {out_rate}")
+        self.step = in_rate / out_rate
+        self._pos = 0.0      # next output position, in input samples relative to the chunk start
+        self._prev = 0.0     # last sample of the previous chunk (position -1)
+
+    def __call__(self, x: np.ndarray) -> np.ndarray:
+        if self.step == 1.0 or not x.size:
+            return x
+        y = np.concatenate([[self._prev], x])
+        n = len(x)
+        positions = np.arange(self._pos, n - 1 + 1e-9, self.step)
+        out = np.interp(positions + 1.0, np.arange(n + 1), y).astype(np.float32)
+        self._pos = (positions[-1] + self.step - n) if positions.size else self._pos - n
+        self._prev = float(x[-1])
+        return out
+
+
+# ---------- classifier ----------
+
+class VoiceClassifier:
+    """One-hidden-layer MLP over window features, in NumPy."""
+
+    def __init__(self, path):
+        data = np.load(path, allow_pickle=False)
+        self.w1, self.b1 = data["w1"], data["b1"]
+        self.w2, self.b2 = data["w2"], data["b2"]
+        self.mean, self.std = data["mean"], data["std"]
+        self.labels = [str(l) for l in data["labels"]]
+        self.config = {**FEATURE_CONFIG, **json.loads(str(data["config"]))}
+
+    def predict_proba(self, features: np.ndarray) -> np.ndarray:
+        x = (np.atleast_2d(features) - self.mean) / self.std
+        h = np.maximum(0.0, x @ self.w1 + self.b1)
+        logits = h @ self.w2 + self.b2
+        logits -= logits.max(axis=1, keepdims=True)
+        e = np.exp(logits)
+        return e / e.sum(axis=1, keepdims=True)
+
+    def format(self, probs: np.ndarray) -> dict:
+        ranked = sorted(
+            ({"label": l, "score": float(p)} for l, p in zip(self.labels, probs)),
+            key=lambda x: x["score"],
+            reverse=True,
+        )
+        return {"label": ranked[0]["label"], "score": ranked[0]["score"], "all_predictions": ranked}
+
+
+def load_model():
+    """The voice classifier (loaded once); raises RuntimeError if it has not been trained."""
+    global _model, _load_state, _load_error
+    if _model is not None:
+        return _model
+    with _load_lock:
+        if _model is None:
+            if not MODEL_PATH.exists():
+                _load_state, _load_error = "failed", f"Voice model not found: {MODEL_PATH} (run training/train_voice.py)"
+                raise RuntimeError(_load_error)
+            try:
+                _model = VoiceClassifier(MODEL_PATH)
+            except Exception as e:
+                _load_state, _load_error = "failed", str(e)
+                raise
+            _load_state, _load_error = "ready", None
+    return _model
+
+
+def load_status() -> dict:
+    return {"ready": _model is not None, "state": _load_state, "error": _load_error}
+
+
+# ---------- one stream ----------
+
+class VoiceStream:
+    """Decode -> features -> windowed predictions for one client stream."""
+
+    def __init__(self, model: VoiceClassifier, sample_rate: int = 16000, fmt: str = "pcm16", channels: int = 1):
+        c = model.config
+        self.model = model
+        self.decoder = PcmDecoder(fmt, sample_rate, channels)
+        self.rate = int(c["sample_rate"])
+        self._resampler = None
+        self.features = StreamingLogMel(c)
+        self.dct = dct_matrix(int(c["n_mfcc"]), int(c["n_mels"]))
+        frames_per_s = self.rate / int(c["hop"])
+        self.window_frames = int(round(c["window_s"] * frames_per_s))
+        self.step_frames = int(round(c["step_s"] * frames_per_s))
+        self.min_frames = int(round(c["min_window_s"] * frames_per_s))
+        self.frame_s = 1.0 / frames_per_s
+
+        self.ring = FrameRing(self.window_frames, int(c["n_mels"]))
+        self.total_frames = 0
+        self._since_last = 0
+        self.windows = 0
+        self._prob_sum = None
+        self.feature_seconds = 0.0
+        self.classify_seconds = 0.0
+
+    def _classify_current(self, partial: bool = False) -> dict:
+        t0 = time.perf_counter()
+        probs = self.model.predict_proba(window_features(self.ring.window(), self.dct))[0]
+        self.classify_seconds += time.perf_counter() - t0
+        self._prob_sum = probs if self._prob_sum is None else self._prob_sum + probs
+        end_s = self.total_frames * self.frame_s
+        result = {
+            "window": self.windows,
+            "start_s": round(end_s - self.ring.size * self.frame_s, 3),
+            "end_s": round(end_s, 3),
+            **self.model.format(probs),
+        }
+        if partial:
+            result["partial"] = True
+        self.windows += 1
+        self._since_last = 0
+        return result
+
+    def feed(self, data: bytes) -> list:
+        """Consume one chunk; returns the results of the windows it completed."""
+        t0 = time.perf_counter()
+        samples = self.decoder.feed(data)
+        if self._resampler is None and self.decoder.ready:
+            self._resampler = LinearResampler(self.decoder.sample_rate, self.rate)
+        if self._resampler is not None:
+            samples = self._resampler(samples)
+        frames = self.features.push(samples)
+        self.feature_seconds += time.perf_counter() - t0
+
+        results = []
+        # feed frame by step so that every step boundary gets its window,
+        # even when one chunk spans several steps
+        start = 0
+        while start < len(frames):
+            need = self.step_frames - self._since_last if self.ring.size >= self.window_frames else \
+                max(self.window_frames - self.ring.size, self.step_frames - self._since_last)
+            part = frames[start:start + need]
+            self.ring.extend(part)
+            self.total_frames += len(part)
+            self._since_last += len(part)
+            start += len(part)
+            if self.ring.size >= self.window_frames and self._since_last >= self.step_frames:
+                results.append(self._classify_current())
+        return results
+
+    def finish(self):
+        """Classify a trailing partial window if nothing covered it; returns (results, summary)."""
+        results = []
+        if self.windows == 0 and self.ring.size >= self.min_frames:
+            results.append(self._classify_current(partial=True))
+
+        summary = {"done": True, "windows": self.windows, "duration_s": round(self.total_frames * self.frame_s, 3)}
+        if self._prob_sum is not None:
+            summary.update(self.model.format(self._prob_sum / self.windows))
+        return results, summary
@@ -0,0 +1,246 @@
+# benchmarks/bench_micro.py
+"""
+Micro-benchmarks of the backend's inference building blocks, in process.
+
+    python benchmarks/bench_micro.py                      # stand-in models, everything
+    python benchmarks/bench_micro.py --only face,detect --iters 100
+    python benchmarks/bench_micro.py --models real --torch-threads 2
+
+Cases:
+    face    predict_face_emotion on synthetic crops of several sizes, and
+            predict_face_emotion_batch at several batch sizes
+    text    classify_text on short / medium / long texts, and
+            classify_text_batch at several batch sizes (result cache off)
+    detect  the configured face detector (FACE_DETECTOR) on frames of
+            several resolutions
+    preprocess
+            face_model_loader.preprocess_batch against the PIL _transform
+            pipeline and the unfused NumPy/torch equivalent, per batch size,
+            with channels_last off and on, with the max / mean abs difference
+            of the outputs. This is also the equivalence check of the fused
+            path: the script exits with status 1 when a difference exceeds
+            PREPROCESS_TOLERANCE (see below), for upscaled and downscaled
+            crops alike (--face-sizes should straddle the model input size).
+
+Results (p50/p95/p99 per call, and per item for batches) are printed and
+written as JSON under benchmarks/results/; compare two runs with
+benchmarks/compare.py.
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import sys
+import threading
+
+import common
+
+
+# Allowed difference of preprocess_batch, in normalized units (1 gray level is
+# about 0.017-0.018 after dividing by std):
+#   vs PIL _transform: cv2 INTER_LINEAR (upscaling) / INTER_AREA (downscaling)
+#     is not PIL's antialiased bilinear filter, so single pixels on hard edges
+#     may differ by up to ~40 levels, the image on average by ~2 levels
+#   vs unfused: the same arithmetic reordered, float rounding only
+PREPROCESS_TOLERANCE = {
+    "max_abs_diff_vs_pil": 0.75,
+    "mean_abs_diff_vs_pil": 0.04,
+    "max_abs_diff_vs_unfused": 1e-4,
+}
+
+
+def bench_face(args, results):
+    import cv2
+    import face_model_loader
+
+    face_model_loader.load_model()
+
+    for size in args.face_sizes:
+        crop = cv2.cvtColor(common.synthetic_image(size, size, seed=size), cv2.COLOR_BGR2RGB)
+        samples = common.time_calls(lambda: face_model_loader.predict_face_emotion(crop), args.warmup, args.iters)
+        results.append({"case": f"face/single/{size}px", "group": "face", "size": size, "batch": 1,
+                        **common.latency_stats(samples)})
+
+    crop = cv2.cvtColor(common.synthetic_image(160, 160), cv2.COLOR_BGR2RGB)
+    for batch in args.batch_sizes:
+        crops = [crop] * batch
+        samples = common.time_calls(
+            lambda: face_model_loader.predict_face_emotion_batch(crops), args.warmup, args.iters
+        )
+        stats = common.latency_stats(samples)
+        results.append({"case": f"face/batch/{batch}", "group": "face", "size": 160, "batch": batch,
+                        "per_item_ms": stats["p50_ms"] / batch, **stats})
+
+
+def bench_text(args, results):
+    import predict_text
+
+    predict_text.load_model()
+    if not predict_text.load_status().get("using_model"):
+        print("  (text model not loaded: timing the keyword fallback)")
+    rng = random.Random(args.seed)
+
+    for n_words in args.text_words:
+        texts = [common.synthetic_text(n_words, rng) for _ in range(args.iters + args.warmup)]
+        it = iter(texts)
+        samples = common.time_calls(lambda: predict_text.classify_text(next(it)), args.warmup, args.iters)
+        results.append({"case": f"text/single/{n_words}w", "group": "text", "words": n_words, "batch": 1,
+                        **common.latency_stats(samples)})
+
+    for batch in args.batch_sizes:
+        def run():
+            # mixed lengths, as a real batch would have
+            predict_text.classify_text_batch(
+                [common.synthetic_text(rng.choice(args.text_words), rng) for _ in range(batch)]
+            )
+        samples = common.time_calls(run, args.warmup, args.iters)
+        stats = common.latency_stats(samples)
+        results.append({"case": f"text/batch/{batch}", "group": "text", "batch": batch,
+                        "per_item_ms": stats["p50_ms"] / batch, **stats})
+
+
+def bench_detect(args, results):
+    import face_detector
+
+    detector = face_detector.get_detector()
+    for width, height in args.frame_sizes:
+        frame = common.synthetic_image(width, height, seed=width)
+        samples = common.time_calls(lambda: detector.detect(frame), args.warmup, args.iters)
+        results.append({"case": f"detect/{face_detector.FACE_DETECTOR}/{width}x{height}", "group": "detect",
+                        "width": width, "height": height, **common.latency_stats(samples)})
+
+
+def bench_preprocess(args, results):
+    import torch
+
+    import face_model_loader as fml
+
+    mean = torch.tensor(fml.META["mean"]).view(3, 1, 1)
+    std = torch.tensor(fml.META["std"]).view(3, 1, 1)
+
+    def unfused(img):
+        t = torch.from_numpy(fml._resize(img)).permute(2, 0, 1).float().div(255.0)
+        return t.sub(mean).div(std)
+
+    failures = []
+    configured = fml.FACE_CHANNELS_LAST
+    try:
+        for channels_last in (False, True):
+            # the layout is read per call; a fresh thread-local drops the old buffer
+            fml.FACE_CHANNELS_LAST = channels_last
+            fml._buffers = threading.local()
+            failures += _bench_preprocess_layout(args, results, fml, unfused)
+    finally:
+        fml.FACE_CHANNELS_LAST = configured
+        fml._buffers = threading.local()
+    return failures
+
+
+def _bench_preprocess_layout(args, results, fml, unfused):
+    import cv2
+    import torch
+    from PIL import Image
+
+    failures = []
+    layout = "nhwc" if fml.FACE_CHANNELS_LAST else "nchw"
+    for size in args.face_sizes:
+        crop = cv2.cvtColor(common.synthetic_image(size, size, seed=size), cv2.COLOR_BGR2RGB)
+        scaling = "up" if size < fml.INPUT_SIZE else "down" if size > fml.INPUT_SIZE else "none"
+        for batch in args.batch_sizes:
+            crops = [crop] * batch
+            pils = [Image.fromarray(c) for c in crops]
+
+            fused = fml.preprocess_batch(crops).clone()
+            ref_pil = torch.stack([fml._transform(p) for p in pils])
+            ref_unfused = torch.stack([unfused(c) for c in crops])
+
+            cases = {
+                "pil": lambda: torch.stack([fml._transform(p) for p in pils]),
+                "unfused": lambda: torch.stack([unfused(c) for c in crops]),
+                "fused": lambda: fml.preprocess_batch(crops),
+            }
+            timed = {k: common.latency_stats(common.time_calls(fn, args.warmup, args.iters)) for k, fn in cases.items()}
+            for name, stats in timed.items():
+                results.append({
+                    "case": f"preprocess/{name}/{layout}/{size}px/b{batch}", "group": "preprocess", "impl": name,
+                    "size": size, "batch": batch, "per_item_ms": stats["p50_ms"] / batch, **stats,
+                })
+            results[-1].update({
+                "speedup_vs_pil": timed["pil"]["p50_ms"] / timed["fused"]["p50_ms"],
+                "speedup_vs_unfused": timed["unfused"]["p50_ms"] / timed["fused"]["p50_ms"],
+                "max_abs_diff_vs_pil": float((fused - ref_pil).abs().max()),
+                "mean_abs_diff_vs_pil": float((fused - ref_pil).abs().mean()),
+                "max_abs_diff_vs_unfused": float((fused - ref_unfused).abs().max()),
+                "channels_last": fml.FACE_CHANNELS_LAST,
+                "scaling": scaling,
+            })
+            r = results[-1]
+            print(f"  {layout} {size}px ({scaling}) b{batch}: x{r['speedup_vs_pil']:.2f} vs PIL,"
+                  f" x{r['speedup_vs_unfused']:.2f} vs unfused;"
+                  f" diff vs PIL max {r['max_abs_diff_vs_pil']:.4f} mean {r['mean_abs_diff_vs_pil']:.5f},"
+                  f" vs unfused max {r['max_abs_diff_vs_unfused']:.2e}")
+            for key, limit in PREPROCESS_TOLERANCE.items():
+                if not r[key] <= limit:
+                    failures.append(f"{r['case']}: {key} {r[key]:.5f} > {limit}")
+
+    checked = {"up" if s < fml.INPUT_SIZE else "down" for s in args.face_sizes if s != fml.INPUT_SIZE}
+    if checked != {"up", "down"}:
+        print(f"  note: --face-sizes only checks {sorted(checked) or 'no'} scaling against {fml.INPUT_SIZE}px")
+    return failures
+
+
+BENCHES = {"face": bench_face, "text": bench_text, "detect": bench_detect, "preprocess": bench_preprocess}
+
+
+def _ints(value: str) -> list[int]:
+    return [int(v) for v in value.split(",") if v]
+
+
+def _frames(value: str) -> list[tuple[int, int]]:
+    return [tuple(int(x) for x in v.split("x")) for v in value.split(",") if v]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Micro-benchmark face / text inference and face detection.")
+    common.add_common_args(parser)
+    parser.add_argument("--only", default="face,text,detect,preprocess",
+                        help="Comma-separated subset of: face,text,detect,preprocess")
+    parser.add_argument("--iters", type=int, default=50)
+    parser.add_argument("--warmup", type=int, default=5)
+    parser.add_argument("--face-sizes", type=_ints, default=[64, 160, 480], help="Square crop sizes (px)")
+    parser.add_argument("--batch-sizes", type=_ints, default=[1, 4, 16])
+    parser.add_argument("--text-words", type=_ints, default=[5, 30, 120])
+    parser.add_argument("--frame-sizes", type=_frames, default=[(320, 240), (640, 480), (1280, 720)])
+    args = parser.parse_args()
+
+    # measure the model, not the result cache
+    os.environ.setdefault("TEXT_CACHE_SIZE", "0")
+    env = common.setup_environment(args)
+
+    selected = [b.strip() for b in args.only.split(",") if b.strip()]
+    unknown = set(selected) - set(BENCHES)
+    if unknown:
+        parser.error(f"unknown benchmark(s): {', '.join(sorted(unknown))}")
+
+    results = []
+    failures = []
+    for name in selected:
+        print(f"Running {name} ...")
+        failures += BENCHES[name](args, results) or []
+
+    common.print_table(results)
+    config = {k: v for k, v in vars(args).items() if k != "out"}
+    config["env"] = env
+    common.write_results("micro", config, results, args.out)
+
+    if failures:
+        print("\nFAILED tolerance checks:")
+        for failure in failures:
+            print("  " + failure)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
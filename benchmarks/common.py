@@ -0,0 +1,209 @@
+# benchmarks/common.py
+"""
+Shared helpers for the benchmark scripts: stand-in models, timing
+statistics, synthetic inputs and JSON result files.
+
+Every script takes --models standin|real. "standin" (the default) builds a
+small randomly initialised face and text model once under
+benchmarks/.standin/ and points the backend at them through FACE_MODEL_DIR /
+TEXT_MODEL_DIR, so the suite runs offline and without trained weights. The
+numbers then measure the serving code, not model quality. "real" uses
+whatever training/results-face and the text model folders contain.
+
+setup_environment() must run before any backend module is imported: the
+loaders read these variables at import time.
+"""
+
+from __future__ import annotations
+
+import json
+import math
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+BENCH_DIR = Path(__file__).resolve().parent
+REPO_DIR = BENCH_DIR.parent
+BACKEND_DIR = REPO_DIR / "backend"
+STANDIN_DIR = BENCH_DIR / ".standin"
+RESULTS_DIR = BENCH_DIR / "results"
+
+TOKENIZER_DIR = BACKEND_DIR / "training" / "results-distilbert"
+
+FACE_CLASSES = ["angry", "disgust", "fear", "happy", "neutral", "sad", "surprise"]
+TEXT_LABELS = ["joy", "sadness", "anger", "fear", "surprise", "neutral"]
+
+WORDS = (
+    "i am so happy sad angry today really not sure what to feel about this "
+    "it was a long day and the weather is fine but work made me nervous wow"
+).split()
+
+
+def add_common_args(parser) -> None:
+    parser.add_argument("--models", choices=["standin", "real"], default="standin",
+                        help="Random stand-in models (offline) or the trained ones")
+    parser.add_argument("--torch-threads", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", default=None, help="Result JSON path (default: benchmarks/results/<name>-<time>.json)")
+
+
+def build_standin_models(out_dir: Path = STANDIN_DIR, seed: int = 0) -> tuple[Path, Path]:
+    """Create (once) the stand-in face and text model folders; returns (face_dir, text_dir)."""
+    face_dir = out_dir / "face"
+    text_dir = out_dir / "text"
+
+    if not (face_dir / "face_model.pt").exists():
+        import torch
+        from torch import nn
+        from torchvision import models
+
+        torch.manual_seed(seed)
+        face_dir.mkdir(parents=True, exist_ok=True)
+        model = models.resnet18(weights=None)
+        model.fc = nn.Linear(model.fc.in_features, len(FACE_CLASSES))
+        torch.save(model.state_dict(), face_dir / "face_model.pt")
+        (face_dir / "class_names.txt").write_text("\n".join(FACE_CLASSES) + "\n", encoding="utf-8")
+        print("Built stand-in face model in", face_dir)
+
+    if not (text_dir / "config.json").exists():
+        import torch
+        from transformers import AutoTokenizer, DistilBertConfig, DistilBertForSequenceClassification
+
+        torch.manual_seed(seed)
+        text_dir.mkdir(parents=True, exist_ok=True)
+        tokenizer = AutoTokenizer.from_pretrained(str(TOKENIZER_DIR), local_files_only=True)
+        config = DistilBertConfig(
+            vocab_size=tokenizer.vocab_size,
+            dim=64,
+            hidden_dim=128,
+            n_layers=2,
+            n_heads=2,
+            num_labels=len(TEXT_LABELS),
+            id2label=dict(enumerate(TEXT_LABELS)),
+            label2id={l: i for i, l in enumerate(TEXT_LABELS)},
+        )
+        DistilBertForSequenceClassification(config).save_pretrained(str(text_dir))
+        tokenizer.save_pretrained(str(text_dir))
+        print("Built stand-in text model in", text_dir)
+
+    return face_dir, text_dir
+
+
+def setup_environment(args) -> dict:
+    """Point the backend at the chosen models and put it on sys.path. Returns the env overrides."""
+    env = {"HF_HUB_OFFLINE": "1", "TRANSFORMERS_OFFLINE": "1"}
+    if args.models == "standin":
+        face_dir, text_dir = build_standin_models(seed=args.seed)
+        env["FACE_MODEL_DIR"] = str(face_dir)
+        env["TEXT_MODEL_DIR"] = str(text_dir)
+    os.environ.update(env)
+
+    if args.torch_threads:
+        import torch
+        torch.set_num_threads(args.torch_threads)
+
+    if str(BACKEND_DIR) not in sys.path:
+        sys.path.insert(0, str(BACKEND_DIR))
+    random.seed(args.seed)
+    return env
+
+
+def synthetic_image(width: int, height: int, seed: int = 0):
+    """BGR uint8 frame: smooth noise with a bright ellipse, roughly face-sized."""
+    import cv2
+    import numpy as np
+
+    rng = np.random.default_rng(seed)
+    small = rng.integers(0, 256, size=(max(1, height // 16), max(1, width // 16), 3), dtype=np.uint8)
+    img = cv2.resize(small, (width, height), interpolation=cv2.INTER_LINEAR)
+    cv2.ellipse(img, (width // 2, height // 2), (width // 6, height // 4), 0, 0, 360, (180, 190, 210), -1)
+    return img
+
+
+def synthetic_text(n_words: int, rng: random.Random) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(n_words))
+
+
+def latency_stats(samples_s: list[float]) -> dict:
+    """Milliseconds: mean, p50, p95, p99, min, max over per-call durations in seconds."""
+    if not samples_s:
+        return {"n": 0}
+    ms = sorted(s * 1000.0 for s in samples_s)
+
+    def pct(p):
+        # nearest-rank percentile
+        k = max(0, min(len(ms) - 1, math.ceil(p / 100.0 * len(ms)) - 1))
+        return ms[k]
+
+    return {
+        "n": len(ms),
+        "mean_ms": statistics.fmean(ms),
+        "p50_ms": pct(50),
+        "p95_ms": pct(95),
+        "p99_ms": pct(99),
+        "min_ms": ms[0],
+        "max_ms": ms[-1],
+    }
+
+
+def time_calls(fn, warmup: int, iters: int) -> list[float]:
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(iters):
+        t0 = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - t0)
+    return samples
+
+
+def environment_info() -> dict:
+    info = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "git_commit": None,
+    }
+    try:
+        info["git_commit"] = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=REPO_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        pass
+    try:
+        import torch
+        info["torch"] = torch.__version__
+        info["torch_threads"] = torch.get_num_threads()
+    except ImportError:
+        pass
+    return info
+
+
+def write_results(name: str, config: dict, results: list[dict], out: str | None = None) -> Path:
+    path = Path(out) if out else RESULTS_DIR / f"{name}-{time.strftime('%Y%m%d-%H%M%S')}.json"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    payload = {
+        "benchmark": name,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "environment": environment_info(),
+        "config": config,
+        "results": results,
+    }
+    with path.open("w", encoding="utf-8") as f:
+        json.dump(payload, f, indent=2)
+    print("Saved results to:", path)
+    return path
+
+
+def print_table(results: list[dict]) -> None:
+    print(f"  {'case':44s} {'n':>6s} {'p50 ms':>9s} {'p95 ms':>9s} {'p99 ms':>9s} {'per item ms':>12s}")
+    for r in results:
+        print(
+            f"  {r['case']:44s} {r['n']:6d} {r['p50_ms']:9.2f} {r['p95_ms']:9.2f} {r['p99_ms']:9.2f}"
+            f" {r.get('per_item_ms', r['p50_ms']):12.3f}"
+        )
@@ -0,0 +1,68 @@
+# benchmarks/compare.py
+"""
+Compare two benchmark result files (from bench_micro.py or load_test.py).
+
+    python benchmarks/compare.py benchmarks/results/micro-A.json benchmarks/results/micro-B.json
+
+Cases are matched by name. For each one the p50 / p95 / p99 latency (and
+throughput for load tests) of the baseline and the candidate are printed
+with the relative change; latency changes beyond --threshold percent are
+flagged as faster / SLOWER.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+
+
+def load(path: str) -> dict:
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    return {r["case"]: r for r in data["results"]}
+
+
+def change(old, new) -> float | None:
+    if old in (None, 0) or new is None:
+        return None
+    return (new - old) / old * 100.0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compare two benchmark result JSON files.")
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    parser.add_argument("--metric", choices=["p50_ms", "p95_ms", "p99_ms", "mean_ms"], default="p50_ms",
+                        help="Latency used for the faster / SLOWER verdict")
+    parser.add_argument("--threshold", type=float, default=5.0, help="Percent change that counts as a difference")
+    args = parser.parse_args()
+
+    base = load(args.baseline)
+    cand = load(args.candidate)
+
+    slower = 0
+    print(f"  {'case':44s} {'p50 ms':>17s} {'p95 ms':>17s} {'p99 ms':>17s} {'change':>8s}")
+    for case in sorted(set(base) | set(cand)):
+        b, c = base.get(case), cand.get(case)
+        if b is None or c is None:
+            print(f"  {case:44s} only in {'candidate' if b is None else 'baseline'}")
+            continue
+
+        cols = " ".join(f"{b.get(m, 0):7.2f} -> {c.get(m, 0):7.2f}" for m in ("p50_ms", "p95_ms", "p99_ms"))
+        delta = change(b.get(args.metric), c.get(args.metric))
+        verdict = ""
+        if delta is not None and abs(delta) >= args.threshold:
+            verdict = "faster" if delta < 0 else "SLOWER"
+            slower += delta > 0
+        line = f"  {case:44s} {cols} {'' if delta is None else f'{delta:+7.1f}%'} {verdict}"
+        if "throughput_rps" in b and "throughput_rps" in c:
+            line += f"  ({b['throughput_rps']:.1f} -> {c['throughput_rps']:.1f} req/s)"
+        print(line)
+
+    # non-zero exit so the script can gate a CI job
+    sys.exit(1 if slower else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,251 @@
+# benchmarks/load_test.py
+"""
+End-to-end load test of the Flask backend with a concurrent, closed-loop
+load generator.
+
+    python benchmarks/load_test.py                                   # in-process server, stand-in models
+    python benchmarks/load_test.py --endpoint face --concurrency 16 --duration 30
+    python benchmarks/load_test.py --url http://127.0.0.1:5000 --endpoint mix
+
+Without --url the app from backend/main.py is served in this process
+(werkzeug, threaded) on a free port with a throw-away database, with the
+stand-in models unless --models real. With --url an already running server
+is targeted instead (e.g. gunicorn -c gunicorn.conf.py); its models are
+whatever it was started with.
+
+Every client thread signs up its own user through /auth and then sends
+requests back to back on a keep-alive connection. Endpoints:
+    text        POST /predict_text        short/medium random texts
+    text_batch  POST /predict_text_batch  --text-batch texts per request
+    face        POST /predict_face        JPEG body (Content-Type image/jpeg),
+                                          cycling through distinct frames
+    mix         text and face alternately
+
+Throughput and p50/p95/p99 latency per endpoint, and the HTTP status counts
+(429/503 are load shedding, see inference_pool.py), are printed and written
+as JSON under benchmarks/results/.
+"""
+
+from __future__ import annotations
+
+import argparse
+import http.client
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+import uuid
+from urllib.parse import urlsplit
+
+import common
+
+
+class Client:
+    """One keep-alive HTTP connection; reconnects after errors."""
+
+    def __init__(self, base_url: str, timeout: float):
+        parts = urlsplit(base_url)
+        self.host = parts.hostname
+        self.port = parts.port or 80
+        self.timeout = timeout
+        self.conn = None
+        self.token = None
+
+    def request(self, method: str, path: str, body: bytes = None, content_type: str = "application/json"):
+        headers = {"Content-Type": content_type}
+        if self.token:
+            headers["Authorization"] = self.token
+        for attempt in range(2):
+            if self.conn is None:
+                self.conn = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+            try:
+                self.conn.request(method, path, body=body, headers=headers)
+                resp = self.conn.getresponse()
+                return resp.status, resp.read()
+            except (http.client.HTTPException, OSError):
+                self.conn.close()
+                self.conn = None
+                if attempt:
+                    raise
+
+    def post_json(self, path: str, payload: dict):
+        return self.request("POST", path, json.dumps(payload).encode("utf-8"))
+
+    def login(self):
+        email = f"bench-{uuid.uuid4().hex[:12]}@example.com"
+        status, body = self.post_json("/auth", {"email": email, "password": "bench-password", "mode": "signup"})
+        if status != 200:
+            raise RuntimeError(f"/auth failed with {status}: {body[:200]!r}")
+        self.token = json.loads(body)["token"]
+
+
+def make_payloads(args):
+    import cv2
+
+    rng = random.Random(args.seed)
+    texts = [common.synthetic_text(rng.choice([5, 12, 30]), rng) for _ in range(256)]
+    frames = []
+    for i in range(args.frames):
+        img = common.synthetic_image(args.frame_width, args.frame_height, seed=args.seed + i)
+        ok, buf = cv2.imencode(".jpg", img, [cv2.IMWRITE_JPEG_QUALITY, 85])
+        frames.append(buf.tobytes())
+    return texts, frames
+
+
+def request_for(endpoint: str, i: int, texts, frames, args):
+    if endpoint == "text":
+        return "POST", "/predict_text", json.dumps({"text": texts[i % len(texts)]}).encode(), "application/json"
+    if endpoint == "text_batch":
+        batch = [texts[(i + k) % len(texts)] for k in range(args.text_batch)]
+        return "POST", "/predict_text_batch", json.dumps({"texts": batch}).encode(), "application/json"
+    if endpoint == "face":
+        return "POST", "/predict_face", frames[i % len(frames)], "image/jpeg"
+    raise ValueError(endpoint)
+
+
+def start_local_server(args) -> tuple[str, object]:
+    os.environ["EMOTION_DB"] = os.path.join(tempfile.mkdtemp(prefix="emotion-bench-"), "emotion.db")
+    os.environ["EMOTION_LAZY_LOAD"] = "1"
+    os.environ["EMOTION_WARMUP"] = "0"
+    common.setup_environment(args)
+
+    import logging
+    from werkzeug.serving import WSGIRequestHandler, make_server
+
+    import main
+
+    main.warm_up(blocking=True)
+    logging.getLogger("werkzeug").setLevel(logging.WARNING)
+
+    class KeepAliveHandler(WSGIRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+    server = make_server("127.0.0.1", 0, main.app, threaded=True, request_handler=KeepAliveHandler)
+    threading.Thread(target=server.serve_forever, name="bench-server", daemon=True).start()
+    return f"http://127.0.0.1:{server.server_port}", server
+
+
+def run_load(base_url: str, args, texts, frames):
+    endpoints = ["text", "face"] if args.endpoint == "mix" else [args.endpoint]
+    lock = threading.Lock()
+    samples = {e: [] for e in endpoints}
+    statuses = {e: {} for e in endpoints}
+    errors = {e: 0 for e in endpoints}
+    counter = iter(range(10 ** 12))
+    clock = {}
+
+    def start_clock():
+        # runs once all clients have logged in, before any of them is released
+        clock["started"] = time.perf_counter()
+        clock["stop_at"] = None if args.requests else clock["started"] + args.duration
+
+    ready = threading.Barrier(args.concurrency + 1, action=start_clock)
+
+    def next_index():
+        with lock:
+            i = next(counter)
+        if args.requests and i >= args.requests:
+            return None
+        if clock["stop_at"] is not None and time.perf_counter() >= clock["stop_at"]:
+            return None
+        return i
+
+    def worker():
+        client = Client(base_url, timeout=args.timeout)
+        try:
+            client.login()
+        except Exception:
+            ready.abort()   # fails the run instead of leaving the others waiting
+            raise
+        ready.wait()
+        while True:
+            i = next_index()
+            if i is None:
+                return
+            endpoint = endpoints[i % len(endpoints)]
+            method, path, body, ctype = request_for(endpoint, i, texts, frames, args)
+            t0 = time.perf_counter()
+            try:
+                status, _ = client.request(method, path, body, ctype)
+            except (http.client.HTTPException, OSError):
+                status = None
+            dt = time.perf_counter() - t0
+            with lock:
+                if status is None:
+                    errors[endpoint] += 1
+                    continue
+                statuses[endpoint][status] = statuses[endpoint].get(status, 0) + 1
+                if status == 200:
+                    samples[endpoint].append(dt)
+
+    threads = [threading.Thread(target=worker, daemon=True) for _ in range(args.concurrency)]
+    for t in threads:
+        t.start()
+    ready.wait()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - clock["started"]
+
+    results = []
+    for e in endpoints:
+        ok = len(samples[e])
+        total = sum(statuses[e].values()) + errors[e]
+        results.append({
+            "case": f"http/{e}/c{args.concurrency}",
+            "endpoint": e,
+            "concurrency": args.concurrency,
+            "requests": total,
+            "ok": ok,
+            "connection_errors": errors[e],
+            "status_counts": {str(k): v for k, v in sorted(statuses[e].items())},
+            "elapsed_s": elapsed,
+            "throughput_rps": ok / elapsed if elapsed > 0 else 0.0,
+            **common.latency_stats(samples[e]),
+        })
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Concurrent end-to-end load test of the backend.")
+    common.add_common_args(parser)
+    parser.add_argument("--url", default=None, help="Target a running server instead of an in-process one")
+    parser.add_argument("--endpoint", choices=["text", "text_batch", "face", "mix"], default="mix")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds to run (ignored with --requests)")
+    parser.add_argument("--requests", type=int, default=0, help="Total requests instead of a duration")
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--text-batch", type=int, default=32)
+    parser.add_argument("--frames", type=int, default=16, help="Distinct JPEG frames to cycle through")
+    parser.add_argument("--frame-width", type=int, default=640)
+    parser.add_argument("--frame-height", type=int, default=480)
+    args = parser.parse_args()
+
+    server = None
+    if args.url:
+        base_url = args.url.rstrip("/")
+    else:
+        base_url, server = start_local_server(args)
+
+    texts, frames = make_payloads(args)
+    print(f"Load: {args.endpoint} x {args.concurrency} clients against {base_url}")
+    results = run_load(base_url, args, texts, frames)
+
+    for r in results:
+        print(
+            f"  {r['endpoint']:10s} ok {r['ok']:6d}/{r['requests']:<6d} {r['throughput_rps']:8.1f} req/s"
+            f"  p50 {r.get('p50_ms', 0):8.2f}  p95 {r.get('p95_ms', 0):8.2f}  p99 {r.get('p99_ms', 0):8.2f} ms"
+            f"  status {r['status_counts']}"
+        )
+
+    config = {k: v for k, v in vars(args).items() if k != "out"}
+    config["target"] = base_url if args.url else "in-process"
+    common.write_results("load", config, results, args.out)
+
+    if server is not None:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,16 +1,19 @@
-import React, { useRef, useState } from "react";
+import React, { useEffect, useRef, useState } from "react";
 import { API_BASE } from "../config";
 import { useAuth } from "../context/AuthContext";
 
 export default function FaceEmotion() {
   const videoRef = useRef(null);
   const streamRef = useRef(null);
+  const socketRef = useRef(null);
+  const timerRef = useRef(null);
 
   const { token } = useAuth();
 
   const [cameraOn, setCameraOn] = useState(false);
   const [error, setError] = useState("");
   const [result, setResult] = useState(null);
+  const [live, setLive] = useState(false);
 
   
   const startCamera = async () => {
@@ -34,6 +37,7 @@ export default function FaceEmotion() {
   };
 
   const stopCamera = () => {
+    stopLive();
     if (streamRef.current) {
       streamRef.current.getTracks().forEach(t => t.stop());
       streamRef.current = null;
@@ -54,21 +58,77 @@ export default function FaceEmotion() {
     const ctx = canvas.getContext("2d");
     ctx.drawImage(videoRef.current, 0, 0);
 
-    const image = canvas.toDataURL("image/jpeg");
+    // raw JPEG body: no base64 inflation, decoded server-side with cv2.imdecode
+    const image = await new Promise(resolve =>
+      canvas.toBlob(resolve, "image/jpeg", 0.9)
+    );
 
     const res = await fetch(`${API_BASE}/predict_face`, {
       method: "POST",
       headers: {
-        "Content-Type": "application/json",
+        "Content-Type": "image/jpeg",
         Authorization: token,
       },
-      body: JSON.stringify({ image }),
+      body: image,
     });
 
     const data = await res.json();
     setResult(data);
   };
 
+  // live mode: push frames over a WebSocket; the server only processes the
+  // newest frame, so a slow backend drops frames instead of queueing them
+  const startLive = () => {
+    if (!cameraOn || socketRef.current) return;
+
+    const wsBase = API_BASE.replace(/^http/, "ws");
+    const socket = new WebSocket(
+      `${wsBase}/ws/predict_face?token=${encodeURIComponent(token)}`
+    );
+    socket.binaryType = "arraybuffer";
+    socketRef.current = socket;
+
+    const canvas = document.createElement("canvas");
+
+    socket.onopen = () => {
+      setLive(true);
+      timerRef.current = setInterval(() => {
+        const video = videoRef.current;
+        if (!video || socket.readyState !== WebSocket.OPEN) return;
+        // don't pile frames up in the browser's send buffer either
+        if (socket.bufferedAmount > 0) return;
+
+        canvas.width = video.videoWidth;
+        canvas.height = video.videoHeight;
+        canvas.getContext("2d").drawImage(video, 0, 0);
+        canvas.toBlob(blob => {
+          if (blob && socket.readyState === WebSocket.OPEN) socket.send(blob);
+        }, "image/jpeg", 0.8);
+      }, 150);
+    };
+
+    socket.onmessage = event => setResult(JSON.parse(event.data));
+    socket.onerror = () => setError("Live connection failed.");
+    socket.onclose = () => {
+      clearInterval(timerRef.current);
+      timerRef.current = null;
+      socketRef.current = null;
+      setLive(false);
+    };
+  };
+
+  const stopLive = () => {
+    clearInterval(timerRef.current);
+    timerRef.current = null;
+    if (socketRef.current) {
+      socketRef.current.close();
+      socketRef.current = null;
+    }
+    setLive(false);
+  };
+
+  useEffect(() => () => stopLive(), []);
+
 
   return (
     <div style={styles.page}>
@@ -117,6 +177,14 @@ export default function FaceEmotion() {
             Capture Emotion
           </button>
 
+          <button
+            style={styles.secondary}
+            onClick={live ? stopLive : startLive}
+            disabled={!cameraOn}
+          >
+            {live ? "Stop Live" : "Start Live"}
+          </button>
+
           <button
             style={styles.secondary}
             onClick={() => setResult(null)}
@@ -1,30 +1,101 @@
 // frontend/src/pages/History.jsx
-import React from "react";
+import React, { useCallback, useEffect, useState } from "react";
+import { API_BASE } from "../config";
+import { useAuth } from "../context/AuthContext";
+
+const formatTime = ts =>
+  new Date(ts * 1000).toLocaleString(undefined, {
+    dateStyle: "medium",
+    timeStyle: "short",
+  });
 
 export default function History() {
-  // placeholder static history for now
-  const logs = [
-    { time: "Nov 17, 2025 09:30", label: "happy", note: "Woke up good" },
-    { time: "Nov 16, 2025 21:15", label: "sad", note: "Tough day" },
-    { time: "Nov 15, 2025 18:02", label: "neutral", note: "Normal" },
-  ];
+  const { token } = useAuth();
+
+  const [logs, setLogs] = useState([]);
+  const [summary, setSummary] = useState([]);
+  const [cursor, setCursor] = useState(null);
+  const [loading, setLoading] = useState(false);
+  const [error, setError] = useState("");
+
+  const loadPage = useCallback(
+    async next => {
+      setLoading(true);
+      setError("");
+      try {
+        const params = new URLSearchParams({ limit: "20" });
+        if (next) params.set("cursor", next);
+
+        const res = await fetch(`${API_BASE}/history?${params}`, {
+          headers: { Authorization: token },
+        });
+        const data = await res.json();
+        if (!res.ok) throw new Error(data.error || "Request failed");
+
+        setLogs(prev => (next ? [...prev, ...data.items] : data.items));
+        setCursor(data.next_cursor);
+      } catch {
+        setError("Could not load your history.");
+      } finally {
+        setLoading(false);
+      }
+    },
+    [token]
+  );
+
+  useEffect(() => {
+    loadPage(null);
+
+    fetch(`${API_BASE}/history/summary`, { headers: { Authorization: token } })
+      .then(res => (res.ok ? res.json() : { emotions: [] }))
+      .then(data => setSummary(data.emotions || []))
+      .catch(() => setSummary([]));
+  }, [loadPage, token]);
 
   return (
     <div style={{ padding: 20, maxWidth: 900, margin: "0 auto", fontFamily: "Inter, Arial" }}>
       <h2>Mood History</h2>
-      <p style={{ color: "#9aa4b2" }}>Your recent detected moods (placeholder data).</p>
+      <p style={{ color: "#9aa4b2" }}>Your recent detected moods.</p>
+
+      {summary.length > 0 && (
+        <div style={{ display: "flex", gap: 10, flexWrap: "wrap", marginTop: 12 }}>
+          {summary.map(s => (
+            <div key={s.label} style={{ padding: "6px 12px", borderRadius: 999, background: "rgba(255,255,255,0.06)", fontSize: 13 }}>
+              <span style={{ textTransform: "capitalize", fontWeight: 600 }}>{s.label}</span> · {s.count}
+            </div>
+          ))}
+        </div>
+      )}
+
+      {error && <div style={{ color: "#f87171", marginTop: 12 }}>{error}</div>}
 
       <div style={{ marginTop: 16, display: "grid", gap: 10 }}>
-        {logs.map((l, i) => (
-          <div key={i} style={{ display: "flex", justifyContent: "space-between", padding: 12, borderRadius: 10, background: "rgba(255,255,255,0.02)" }}>
+        {logs.map(l => (
+          <div key={l.id} style={{ display: "flex", justifyContent: "space-between", padding: 12, borderRadius: 10, background: "rgba(255,255,255,0.02)" }}>
             <div>
               <div style={{ fontWeight: 700, textTransform: "capitalize" }}>{l.label}</div>
-              <div style={{ color: "#9aa4b2", fontSize: 13 }}>{l.note}</div>
+              <div style={{ color: "#9aa4b2", fontSize: 13 }}>
+                {l.note || `Detected from ${l.source}`}
+              </div>
             </div>
-            <div style={{ color: "#9aa4b2", fontSize: 13 }}>{l.time}</div>
+            <div style={{ color: "#9aa4b2", fontSize: 13 }}>{formatTime(l.ts)}</div>
           </div>
         ))}
+
+        {!loading && logs.length === 0 && !error && (
+          <div style={{ color: "#9aa4b2" }}>No predictions recorded yet.</div>
+        )}
       </div>
+
+      {cursor && (
+        <button
+          style={{ marginTop: 16, padding: "10px 18px", borderRadius: 10, border: "1px solid rgba(255,255,255,0.25)", background: "transparent", color: "inherit", cursor: "pointer" }}
+          onClick={() => loadPage(cursor)}
+          disabled={loading}
+        >
+          {loading ? "Loading…" : "Load more"}
+        </button>
+      )}
     </div>
   );
 }
@@ -44,38 +44,25 @@ export default function TextEmotion() {
     setReply("");
 
     try {
-      // 1️⃣ Detect emotion
-      const emoRes = await fetch(`${API_BASE}/predict_text`, {
+      // 1️⃣ Detect emotion and get the bot's reply in one request
+      const res = await fetch(`${API_BASE}/predict_multimodal`, {
         method: "POST",
         headers: {
           "Content-Type": "application/json",
           Authorization: token,
         },
-        body: JSON.stringify({ text }),
+        body: JSON.stringify({ text, message: text }),
       });
 
-      const emoData = await emoRes.json();
-      const detectedEmotion = emoData.predictions[0].label;
-      setEmotion(detectedEmotion);
+      const data = await res.json();
+      if (!res.ok) throw new Error(data.error || "Request failed");
 
-      // 2️⃣ Ask bot to respond
-      const chatRes = await fetch(`${API_BASE}/chat`, {
-        method: "POST",
-        headers: {
-          "Content-Type": "application/json",
-          Authorization: token,
-        },
-        body: JSON.stringify({
-          message: text,
-          emotion: detectedEmotion,
-        }),
-      });
-
-      const chatData = await chatRes.json();
-      setReply(chatData.reply);
+      const detectedEmotion = data.emotion;
+      setEmotion(detectedEmotion);
+      setReply(data.reply);
 
-      // 3️⃣ Speak reply
-      speak(chatData.reply, detectedEmotion);
+      // 2️⃣ Speak reply
+      speak(data.reply, detectedEmotion);
 
     } catch {
       setError("Something went wrong. Please try again.");
@@ -1,11 +1,32 @@
 import React, { useEffect, useRef, useState } from "react";
+import { API_BASE } from "../config";
+import { useAuth } from "../context/AuthContext";
+
+const SAMPLE_RATE = 16000;
+
+// Float32 samples at `inRate` -> little-endian int16 PCM at 16 kHz
+const toPcm16 = (input, inRate) => {
+  const ratio = inRate / SAMPLE_RATE;
+  const out = new Int16Array(Math.floor(input.length / ratio));
+  for (let i = 0; i < out.length; i++) {
+    const s = Math.max(-1, Math.min(1, input[Math.floor(i * ratio)]));
+    out[i] = s < 0 ? s * 0x8000 : s * 0x7fff;
+  }
+  return out.buffer;
+};
+
 export default function VoiceEmotion() {
-  const mediaRecorderRef = useRef(null);
   const streamRef = useRef(null);
+  const audioRef = useRef(null);
+  const socketRef = useRef(null);
+
+  const { token } = useAuth();
 
   const [recording, setRecording] = useState(false);
   const [error, setError] = useState("");
   const [time, setTime] = useState(0);
+  const [current, setCurrent] = useState(null);
+  const [summary, setSummary] = useState(null);
 
   // Timer
   useEffect(() => {
@@ -14,35 +35,91 @@ export default function VoiceEmotion() {
     return () => clearInterval(i);
   }, [recording]);
 
+  // audio is streamed to the server while recording; it answers with one
+  // result per analysed window and a summary once the stream ends
   const startRecording = async () => {
     setError("");
     setTime(0);
+    setCurrent(null);
+    setSummary(null);
 
+    let stream;
     try {
-      const stream = await navigator.mediaDevices.getUserMedia({ audio: true });
-      streamRef.current = stream;
-
-      const recorder = new MediaRecorder(stream);
-      mediaRecorderRef.current = recorder;
-
-      recorder.start();
-      setRecording(true);
+      stream = await navigator.mediaDevices.getUserMedia({ audio: true });
     } catch (e) {
       setError("Microphone access denied.");
+      return;
     }
+    streamRef.current = stream;
+
+    const wsBase = API_BASE.replace(/^http/, "ws");
+    const socket = new WebSocket(
+      `${wsBase}/ws/predict_voice?token=${encodeURIComponent(token)}&format=pcm16&sample_rate=${SAMPLE_RATE}`
+    );
+    socket.binaryType = "arraybuffer";
+    socketRef.current = socket;
+
+    socket.onopen = () => {
+      const ctx = new AudioContext();
+      const source = ctx.createMediaStreamSource(stream);
+      const processor = ctx.createScriptProcessor(4096, 1, 1);
+      processor.onaudioprocess = (event) => {
+        if (socket.readyState !== WebSocket.OPEN) return;
+        socket.send(toPcm16(event.inputBuffer.getChannelData(0), ctx.sampleRate));
+      };
+      source.connect(processor);
+      processor.connect(ctx.destination);
+      audioRef.current = { ctx, source, processor };
+      setRecording(true);
+    };
+
+    socket.onmessage = (event) => {
+      const msg = JSON.parse(event.data);
+      if (msg.error) setError(msg.error);
+      else if (msg.done) setSummary(msg);
+      else setCurrent(msg);
+    };
+    socket.onerror = () => setError("Voice connection failed.");
+    socket.onclose = () => {
+      socketRef.current = null;
+      stopAudio();
+    };
   };
 
-  const stopRecording = () => {
-    mediaRecorderRef.current?.stop();
+  const stopAudio = () => {
+    const audio = audioRef.current;
+    if (audio) {
+      audio.processor.disconnect();
+      audio.source.disconnect();
+      audio.ctx.close();
+      audioRef.current = null;
+    }
     streamRef.current?.getTracks().forEach((t) => t.stop());
+    streamRef.current = null;
     setRecording(false);
   };
 
+  const stopRecording = () => {
+    stopAudio();
+    // the server sends the summary and then closes the socket
+    if (socketRef.current?.readyState === WebSocket.OPEN) socketRef.current.send("end");
+  };
+
+  useEffect(
+    () => () => {
+      stopAudio();
+      socketRef.current?.close();
+    },
+    []
+  );
+
+  const shown = summary && summary.label ? summary : current;
+
   return (
     <div style={styles.page}>
       <h1 style={styles.title}>Voice Emotion</h1>
       <p style={styles.subtitle}>
-        Record freely. No data leaves your device yet.
+        Speak freely. Audio is analysed while you record and is not stored.
       </p>
 
       <div style={styles.panel}>
@@ -62,6 +139,14 @@ export default function VoiceEmotion() {
           )}
         </div>
 
+        {shown && (
+          <div style={styles.result}>
+            {summary && summary.label ? "Overall: " : "Now: "}
+            <span style={styles.emotion}>{shown.label}</span>{" "}
+            ({Math.round(shown.score * 100)}%)
+          </div>
+        )}
+
         {error && <div style={styles.error}>{error}</div>}
       </div>
     </div>
@@ -122,4 +207,12 @@ const styles = {
     color: "#f87171",
     marginTop: 12,
   },
+  result: {
+    marginTop: 24,
+    fontSize: 18,
+  },
+  emotion: {
+    fontWeight: 700,
+    textTransform: "capitalize",
+  },
 };
@@ -0,0 +1,108 @@
+# training/build_face_cache.py
+"""
+Decode and resize the face image folders once into memory-mapped shards.
+
+    python training/build_face_cache.py                      # data/train + data/test, 224 px
+    python training/build_face_cache.py --size 112 --workers 8
+    python training/train_face.py --cache-dir training/data/cache
+
+For each split (a class-folder tree, as read by FacesFolderDataset) this
+writes <out-dir>/<split>/:
+
+    images.npy    uint8 [N, size, size, 3], RGB, opened with mmap by training
+    labels.npy    int64 [N]
+    meta.json     classes, size, count, source folder and file list
+
+The images are resized exactly like FacesFolderDataset.default_transform
+(PIL bilinear to size x size), so training from the shard sees the same
+pixels as training from the folders, minus the per-epoch JPEG decode.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import time
+from multiprocessing import Pool
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+
+from faces_dataset import FacesFolderDataset
+
+ROOT_DIR = Path(__file__).resolve().parent
+DATA_DIR = ROOT_DIR / "data"
+OUT_DIR = DATA_DIR / "cache"
+
+_size = 224
+
+
+def _init(size: int) -> None:
+    global _size
+    _size = size
+
+
+def _decode(path: str) -> np.ndarray:
+    with Image.open(path) as img:
+        img = img.convert("RGB").resize((_size, _size), Image.BILINEAR)
+        return np.asarray(img, dtype=np.uint8)
+
+
+def build_split(src_dir: Path, out_dir: Path, size: int, workers: int, classes=None) -> dict:
+    ds = FacesFolderDataset(str(src_dir), classes=classes)
+    paths = [p for p, _ in ds.samples]
+    labels = np.array([label for _, label in ds.samples], dtype=np.int64)
+    if not paths:
+        raise SystemExit(f"No images under {src_dir}")
+
+    out_dir.mkdir(parents=True, exist_ok=True)
+    tmp_path = out_dir / "images.npy.tmp"
+    images = np.lib.format.open_memmap(tmp_path, mode="w+", dtype=np.uint8, shape=(len(paths), size, size, 3))
+
+    t0 = time.time()
+    with Pool(workers, initializer=_init, initargs=(size,)) as pool:
+        for i, img in enumerate(pool.imap(_decode, paths, chunksize=64)):
+            images[i] = img
+            if (i + 1) % 5000 == 0:
+                print(f"  {i + 1}/{len(paths)}")
+    images.flush()
+    del images
+
+    # only a complete shard gets the final name
+    os.replace(tmp_path, out_dir / "images.npy")
+    np.save(out_dir / "labels.npy", labels)
+    meta = {
+        "classes": list(ds.classes),
+        "size": size,
+        "count": len(paths),
+        "source": str(src_dir),
+        "files": [os.path.relpath(p, src_dir) for p in paths],
+    }
+    (out_dir / "meta.json").write_text(json.dumps(meta), encoding="utf-8")
+
+    elapsed = time.time() - t0
+    print(f"{src_dir.name}: {len(paths)} images -> {out_dir} "
+          f"({len(paths) * size * size * 3 / 1e6:.0f} MB, {elapsed:.1f}s, {len(paths) / elapsed:.0f} img/s)")
+    return meta
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Build memory-mapped uint8 shards of the face datasets.")
+    parser.add_argument("--data-dir", default=str(DATA_DIR), help="Folder holding the split folders")
+    parser.add_argument("--splits", default="train,test", help="Comma-separated split folder names")
+    parser.add_argument("--out-dir", default=str(OUT_DIR))
+    parser.add_argument("--size", type=int, default=224, help="Square side the images are resized to")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    classes = None
+    for split in (s.strip() for s in args.splits.split(",") if s.strip()):
+        meta = build_split(Path(args.data_dir) / split, Path(args.out_dir) / split, args.size, args.workers, classes)
+        # every split uses the class order of the first one
+        classes = meta["classes"]
+
+
+if __name__ == "__main__":
+    main()
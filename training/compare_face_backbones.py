@@ -0,0 +1,157 @@
+# training/compare_face_backbones.py
+"""
+Latency vs accuracy of trained face models, e.g. one per backbone.
+
+    python training/train_face.py --backbone compact_cnn --out-dir training/results-face-compact
+    python training/train_face.py --backbone mobilenet_v3_small --out-dir training/results-face-mnv3
+    python training/compare_face_backbones.py                       # every training/results-face*/
+    python training/compare_face_backbones.py training/results-face training/results-face-mnv3 --torch-threads 1
+
+Each model folder is measured in its own process through the serving code
+(backend/face_model_loader.py with FACE_MODEL_DIR set to the folder), so
+the numbers include the same preprocessing and runtime settings
+(FACE_RUNTIME, FACE_CHANNELS_LAST, ...) as the backend:
+
+    accuracy           top-1 on the validation split (class folders)
+    single p50 / p95   predict_face_emotion on one 96x96 crop, ms
+    batch per item     predict_face_emotion_batch of --batch crops, ms per crop
+    params / file MB   model size
+
+The table is printed and written to --out (JSON).
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parent
+BACKEND_DIR = ROOT_DIR.parent / "backend"
+VAL_DIR = ROOT_DIR / "data" / "test"
+OUT_PATH = ROOT_DIR / "face_backbones_report.json"
+
+
+def _percentile(samples, q):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, max(0, int(round(q * (len(ordered) - 1)))))]
+
+
+def measure(args) -> dict:
+    """Runs inside the child process, with FACE_MODEL_DIR pointing at one model."""
+    import cv2
+    import numpy as np
+    import torch
+
+    if args.torch_threads:
+        torch.set_num_threads(args.torch_threads)
+    sys.path.insert(0, str(BACKEND_DIR))
+    import face_model_loader as fml
+    from faces_dataset import FacesFolderDataset
+
+    model = fml.load_model()
+    val = FacesFolderDataset(args.val_dir)
+    samples = val.samples
+    if args.limit and len(samples) > args.limit:
+        step = len(samples) / args.limit
+        samples = [samples[int(i * step)] for i in range(args.limit)]
+
+    correct = 0
+    t0 = time.perf_counter()
+    for start in range(0, len(samples), 64):
+        chunk = samples[start:start + 64]
+        crops = [cv2.cvtColor(cv2.imread(path), cv2.COLOR_BGR2RGB) for path, _ in chunk]
+        for pred, (_, label) in zip(fml.predict_face_emotion_batch(crops), chunk):
+            correct += int(pred["label"] == val.classes[label])
+    eval_s = time.perf_counter() - t0
+
+    rng = np.random.default_rng(0)
+    crop = rng.integers(0, 256, size=(96, 96, 3), dtype=np.uint8)
+    for _ in range(args.warmup):
+        fml.predict_face_emotion(crop)
+    single = []
+    for _ in range(args.iters):
+        t = time.perf_counter()
+        fml.predict_face_emotion(crop)
+        single.append((time.perf_counter() - t) * 1000)
+    crops = [crop] * args.batch
+    batch = []
+    for _ in range(max(1, args.iters // 4)):
+        t = time.perf_counter()
+        fml.predict_face_emotion_batch(crops)
+        batch.append((time.perf_counter() - t) * 1000 / args.batch)
+
+    params = sum(p.numel() for p in model.parameters()) if hasattr(model, "parameters") else None
+    return {
+        "model_dir": str(fml.MODEL_DIR),
+        "backbone": fml.BACKBONE,
+        "input_size": fml.INPUT_SIZE,
+        "runtime": fml.load_status()["runtime"],
+        "val_images": len(samples),
+        "accuracy": correct / max(1, len(samples)),
+        "eval_images_per_s": len(samples) / max(eval_s, 1e-9),
+        "single_p50_ms": statistics.median(single),
+        "single_p95_ms": _percentile(single, 0.95),
+        "batch_per_item_ms": statistics.median(batch),
+        "params_m": params / 1e6 if params is not None else None,
+        "file_mb": fml.MODEL_PATH.stat().st_size / 1e6,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compare face models: validation accuracy vs CPU latency.")
+    parser.add_argument("model_dirs", nargs="*", help="Results folders (default: training/results-face*)")
+    parser.add_argument("--val-dir", default=str(VAL_DIR))
+    parser.add_argument("--limit", type=int, default=0, help="Evaluate on an evenly spaced subset of N images")
+    parser.add_argument("--iters", type=int, default=100)
+    parser.add_argument("--warmup", type=int, default=10)
+    parser.add_argument("--batch", type=int, default=8)
+    parser.add_argument("--torch-threads", type=int, default=None)
+    parser.add_argument("--out", default=str(OUT_PATH))
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(measure(args)))
+        return
+
+    dirs = [Path(d) for d in args.model_dirs] or sorted(
+        p for p in ROOT_DIR.glob("results-face*") if (p / "face_model.pt").exists()
+    )
+    if not dirs:
+        raise SystemExit("No face models found (train one with training/train_face.py)")
+
+    child_args = [sys.executable, __file__, "--child", "--val-dir", args.val_dir, "--limit", str(args.limit),
+                  "--iters", str(args.iters), "--warmup", str(args.warmup), "--batch", str(args.batch)]
+    if args.torch_threads:
+        child_args += ["--torch-threads", str(args.torch_threads)]
+
+    results = []
+    for d in dirs:
+        print(f"Measuring {d} ...")
+        proc = subprocess.run(child_args, env={**os.environ, "FACE_MODEL_DIR": str(d.resolve())},
+                              capture_output=True, text=True)
+        if proc.returncode != 0:
+            print(proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else f"  failed ({proc.returncode})")
+            continue
+        results.append(json.loads(proc.stdout.strip().splitlines()[-1]))
+
+    header = f"{'model':<28} {'backbone':<20} {'size':>4} {'acc':>6} {'p50 ms':>8} {'p95 ms':>8} {'batch/item':>10} {'params M':>8}"
+    print("\n" + header)
+    print("-" * len(header))
+    for r in sorted(results, key=lambda r: r["single_p50_ms"]):
+        params = f"{r['params_m']:.2f}" if r["params_m"] is not None else "-"
+        print(f"{Path(r['model_dir']).name:<28} {r['backbone']:<20} {r['input_size']:>4} {r['accuracy']:>6.3f} "
+              f"{r['single_p50_ms']:>8.2f} {r['single_p95_ms']:>8.2f} {r['batch_per_item_ms']:>10.2f} {params:>8}")
+
+    Path(args.out).write_text(json.dumps({"val_dir": args.val_dir, "results": results}, indent=2), encoding="utf-8")
+    print("\nWrote", args.out)
+
+
+if __name__ == "__main__":
+    main()
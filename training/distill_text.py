@@ -0,0 +1,272 @@
+# training/distill_text.py
+"""
+Distill the fine-tuned DistilBERT (training/results-distilbert) into the
+hashed n-gram linear student served in front of it by predict_text.
+
+    python training/distill_text.py
+    python training/distill_text.py --augment 8 --epochs 40 --tolerance 0.01
+
+Transfer set: the texts of the training CSVs, plus --augment noisy copies of
+each (random word dropout and adjacent swaps) that only the teacher labels.
+The student is trained on the teacher's temperature-softened probabilities
+(KL) mixed with the gold labels where there are some (cross-entropy).
+
+Then, on the validation CSVs, teacher, student and the cascade (student
+first, teacher when the student's top probability is below a threshold) are
+compared for every threshold. The chosen threshold is the one escalating the
+fewest inputs while the cascade stays within --tolerance of the teacher's
+accuracy; it is stored in the npz and used by predict_text unless
+TEXT_CASCADE_THRESHOLD overrides it.
+
+Output: training/results-text-student/student.npz and report.json (accuracy,
+escalation fraction and per-request CPU time per threshold).
+"""
+
+from __future__ import annotations
+
+import argparse
+import csv
+import json
+import random
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import torch
+from torch import nn, optim
+from transformers import AutoTokenizer, AutoModelForSequenceClassification
+
+ROOT_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(ROOT_DIR.parent / "backend"))
+
+import text_student  # noqa: E402
+
+DATA_DIR = ROOT_DIR / "data"
+TEACHER_DIR = ROOT_DIR / "results-distilbert"
+OUT_DIR = ROOT_DIR / "results-text-student"
+TRAIN_CSVS = [DATA_DIR / "train_full.csv", DATA_DIR / "train.csv"]
+EVAL_CSVS = [DATA_DIR / "valid.csv", DATA_DIR / "valid_full.csv"]
+
+
+def read_csv(path: Path):
+    with path.open(newline="", encoding="utf-8") as f:
+        return [(row["text"], row.get("label")) for row in csv.DictReader(f) if row.get("text")]
+
+
+def augment(text: str, rng: random.Random) -> str:
+    words = text.split()
+    if len(words) > 2:
+        words = [w for w in words if rng.random() > 0.15] or words
+    for i in range(len(words) - 1):
+        if rng.random() < 0.1:
+            words[i], words[i + 1] = words[i + 1], words[i]
+    return " ".join(words)
+
+
+class Teacher:
+    def __init__(self, model_dir: Path):
+        self.tokenizer = AutoTokenizer.from_pretrained(model_dir, local_files_only=True)
+        self.model = AutoModelForSequenceClassification.from_pretrained(model_dir, local_files_only=True).eval()
+        cfg = self.model.config
+        self.labels = [str(cfg.id2label[i]) for i in range(cfg.num_labels)]
+
+    @torch.no_grad()
+    def logits(self, texts, batch_size: int = 64) -> np.ndarray:
+        out = []
+        for start in range(0, len(texts), batch_size):
+            inputs = self.tokenizer(texts[start:start + batch_size], truncation=True, padding=True, return_tensors="pt")
+            out.append(self.model(**inputs).logits.float().numpy())
+        return np.concatenate(out) if out else np.zeros((0, len(self.labels)), dtype=np.float32)
+
+
+def softmax(x: np.ndarray, t: float = 1.0) -> np.ndarray:
+    z = x / t
+    z = z - z.max(axis=-1, keepdims=True)
+    e = np.exp(z)
+    return e / e.sum(axis=-1, keepdims=True)
+
+
+def bags(texts, config):
+    """EmbeddingBag inputs (indices, offsets, weights) for a list of texts."""
+    feats = [text_student.featurize(t, config) for t in texts]
+    offsets = np.cumsum([0] + [len(i) for i, _ in feats[:-1]])
+    indices = np.concatenate([i for i, _ in feats]) if feats else np.zeros(0, dtype=np.int64)
+    weights = np.concatenate([v for _, v in feats]) if feats else np.zeros(0, dtype=np.float32)
+    return torch.from_numpy(indices), torch.from_numpy(offsets), torch.from_numpy(weights)
+
+
+def train_student(texts, soft, hard, n_labels, config, args):
+    n_features = int(config["n_features"])
+    bag = nn.EmbeddingBag(n_features, n_labels, mode="sum")
+    nn.init.zeros_(bag.weight)
+    bias = nn.Parameter(torch.zeros(n_labels))
+    optimizer = optim.Adam(list(bag.parameters()) + [bias], lr=args.lr)
+
+    soft_t = torch.from_numpy(soft)
+    hard_t = torch.from_numpy(hard)
+    t = args.temperature
+    for epoch in range(args.epochs):
+        perm = torch.randperm(len(texts))
+        total = 0.0
+        for start in range(0, len(texts), args.batch_size):
+            idx = perm[start:start + args.batch_size]
+            indices, offsets, weights = bags([texts[i] for i in idx], config)
+            logits = bag(indices, offsets, per_sample_weights=weights) + bias
+            kl = nn.functional.kl_div(
+                nn.functional.log_softmax(logits / t, dim=-1), soft_t[idx], reduction="batchmean"
+            ) * t * t
+            y = hard_t[idx]
+            has_gold = y >= 0
+            ce = nn.functional.cross_entropy(logits[has_gold], y[has_gold]) if has_gold.any() else logits.sum() * 0
+            loss = args.alpha * kl + (1 - args.alpha) * ce
+            optimizer.zero_grad()
+            loss.backward()
+            optimizer.step()
+            total += loss.item() * len(idx)
+        if (epoch + 1) % 5 == 0 or epoch == 0:
+            print(f"Epoch {epoch + 1}/{args.epochs}  loss {total / len(texts):.4f}")
+    return bag.weight.detach().numpy().astype(np.float32), bias.detach().numpy().astype(np.float32)
+
+
+def per_item_ms(fn, texts, repeat: int = 3) -> float:
+    """Median single-request latency of fn(text) over the texts (best of `repeat`)."""
+    best = []
+    for text in texts:
+        samples = []
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            fn(text)
+            samples.append(time.perf_counter() - t0)
+        best.append(min(samples))
+    return float(np.median(best) * 1000)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Distill the DistilBERT text model into a hashed n-gram student.")
+    parser.add_argument("--teacher-dir", default=str(TEACHER_DIR))
+    parser.add_argument("--train-csv", nargs="+", default=[str(p) for p in TRAIN_CSVS])
+    parser.add_argument("--eval-csv", nargs="+", default=[str(p) for p in EVAL_CSVS])
+    parser.add_argument("--out-dir", default=str(OUT_DIR))
+    parser.add_argument("--augment", type=int, default=4, help="Teacher-labelled noisy copies per training text")
+    parser.add_argument("--n-features", type=int, default=text_student.FEATURE_CONFIG["n_features"])
+    parser.add_argument("--epochs", type=int, default=30)
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--lr", type=float, default=0.05)
+    parser.add_argument("--temperature", type=float, default=2.0)
+    parser.add_argument("--alpha", type=float, default=0.7, help="Weight of the distillation loss vs gold labels")
+    parser.add_argument("--tolerance", type=float, default=0.01,
+                        help="Largest accepted cascade accuracy drop vs the teacher when picking the threshold")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    torch.manual_seed(args.seed)
+    config = {**text_student.FEATURE_CONFIG, "n_features": args.n_features}
+
+    teacher = Teacher(Path(args.teacher_dir))
+    label2id = {l: i for i, l in enumerate(teacher.labels)}
+    print("Labels:", teacher.labels)
+
+    rows = [r for p in args.train_csv if Path(p).exists() for r in read_csv(Path(p))]
+    texts = [t for t, _ in rows]
+    hard = [label2id.get(l, -1) for _, l in rows]
+    for text, _ in rows:
+        for _ in range(args.augment):
+            texts.append(augment(text, rng))
+            hard.append(-1)
+    print(f"Transfer set: {len(rows)} texts + {len(texts) - len(rows)} augmented")
+
+    t0 = time.time()
+    soft = softmax(teacher.logits(texts), args.temperature).astype(np.float32)
+    print(f"Teacher labelled the transfer set in {time.time() - t0:.1f}s")
+
+    weight, bias = train_student(texts, soft, np.array(hard, dtype=np.int64), len(teacher.labels), config, args)
+
+    out_dir = Path(args.out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    out_path = out_dir / "student.npz"
+    np.savez(out_path, weight=weight, bias=bias, labels=np.array(teacher.labels), config=np.array(json.dumps(config)))
+    student = text_student.StudentClassifier(out_path)
+
+    # ---------- evaluation: teacher vs student vs cascade ----------
+    eval_rows = {Path(p).name: read_csv(Path(p)) for p in args.eval_csv if Path(p).exists()}
+    all_rows, sources = [], []
+    for name, rows_ in eval_rows.items():
+        for r in rows_:
+            if r[1] in label2id:
+                all_rows.append(r)
+                sources.append(name)
+    if not all_rows:
+        print("No labelled validation rows: threshold not tuned")
+        return
+    ev_texts = [t for t, _ in all_rows]
+    gold = np.array([label2id[l] for _, l in all_rows])
+    t_probs = softmax(teacher.logits(ev_texts))
+    s_probs = np.stack([student.predict_proba(t) for t in ev_texts])
+    t_pred, s_pred, s_conf = t_probs.argmax(1), s_probs.argmax(1), s_probs.max(1)
+
+    teacher_ms = per_item_ms(lambda t: teacher.logits([t]), ev_texts)
+    student_ms = per_item_ms(student.predict_proba, ev_texts)
+    teacher_acc = float((t_pred == gold).mean())
+    print(f"Per request: teacher {teacher_ms:.2f} ms, student {student_ms:.3f} ms")
+
+    table = []
+    for threshold in [0.0] + [round(x, 2) for x in np.arange(0.3, 1.0, 0.02)] + [1.01]:
+        escalate = s_conf < threshold
+        pred = np.where(escalate, t_pred, s_pred)
+        table.append({
+            "threshold": threshold,
+            "accuracy": float((pred == gold).mean()),
+            "escalation_fraction": float(escalate.mean()),
+            "ms_per_request": student_ms + float(escalate.mean()) * teacher_ms,
+        })
+    ok = [r for r in table if r["accuracy"] >= teacher_acc - args.tolerance]
+    chosen = min(ok, key=lambda r: (r["escalation_fraction"], r["threshold"]))
+
+    # stored as swept: the cascade escalates when confidence < threshold, so a
+    # value above 1.0 ("escalate everything") must not be clamped to 1.0
+    config["threshold"] = chosen["threshold"]
+    np.savez(out_path, weight=weight, bias=bias, labels=np.array(teacher.labels), config=np.array(json.dumps(config)))
+
+    per_file = {}
+    for name in eval_rows:
+        keep = [i for i, src in enumerate(sources) if src == name]
+        if keep:
+            esc = s_conf[keep] < config["threshold"]
+            cascade = np.where(esc, t_pred[keep], s_pred[keep])
+            per_file[name] = {
+                "n": len(keep),
+                "teacher_accuracy": float((t_pred[keep] == gold[keep]).mean()),
+                "student_accuracy": float((s_pred[keep] == gold[keep]).mean()),
+                "cascade_accuracy": float((cascade == gold[keep]).mean()),
+                "escalation_fraction": float(esc.mean()),
+            }
+
+    report = {
+        "teacher_accuracy": teacher_acc,
+        "student_accuracy": float((s_pred == gold).mean()),
+        "tolerance": args.tolerance,
+        "threshold": config["threshold"],
+        "cascade": chosen,
+        "teacher_ms_per_request": teacher_ms,
+        "student_ms_per_request": student_ms,
+        "cpu_reduction": 1.0 - chosen["ms_per_request"] / teacher_ms,
+        "per_file": per_file,
+        "thresholds": table,
+    }
+    (out_dir / "report.json").write_text(json.dumps(report, indent=2), encoding="utf-8")
+
+    print(f"Teacher acc {teacher_acc:.3f}  student acc {report['student_accuracy']:.3f}")
+    print(f"Threshold {config['threshold']:.2f}: cascade acc {chosen['accuracy']:.3f} "
+          f"(tolerance {args.tolerance}), {chosen['escalation_fraction'] * 100:.1f}% escalated, "
+          f"{chosen['ms_per_request']:.2f} ms/request vs {teacher_ms:.2f} ms "
+          f"(-{report['cpu_reduction'] * 100:.0f}%)")
+    for name, r in per_file.items():
+        print(f"  {name}: n={r['n']} teacher {r['teacher_accuracy']:.3f} student {r['student_accuracy']:.3f} "
+              f"cascade {r['cascade_accuracy']:.3f} escalated {r['escalation_fraction'] * 100:.1f}%")
+    print("Saved student model to:", out_path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,225 @@
+# training/export_face_model.py
+"""
+Export results-face/face_model.pt to an optimized CPU inference artifact.
+
+    python training/export_face_model.py --format torchscript
+    python training/export_face_model.py --format onnx --quantize static
+
+Formats / quantization:
+    torchscript + none     -> face_model.ts.pt        (traced + frozen)
+    torchscript + dynamic  -> face_model.int8.ts.pt   (INT8 Linear layers only)
+    torchscript + static   -> face_model.int8.ts.pt   (FX graph mode INT8, calibrated)
+    onnx + none            -> face_model.onnx
+    onnx + dynamic         -> face_model.int8.onnx    (onnxruntime dynamic quantization)
+    onnx + static          -> face_model.int8.onnx    (onnxruntime QDQ, calibrated)
+
+Static quantization calibrates on images drawn from a class-folder tree under
+training/data (--calib-dir). After export the artifact is checked against the
+eager model on a disjoint set of images (top-1 agreement, max probability
+difference, accuracy, latency) and the report is written next to the artifact.
+
+The backend serves the artifact with FACE_RUNTIME=torchscript|onnx (plus
+FACE_RUNTIME_INT8=1 for the quantized one).
+"""
+
+from __future__ import annotations
+
+import argparse
+import copy
+import json
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+import torch
+from torch import nn
+
+from faces_dataset import FacesFolderDataset
+
+ROOT_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(ROOT_DIR.parent / "backend"))
+
+import face_model_loader  # noqa: E402
+
+DEFAULT_CALIB_DIR = ROOT_DIR / "data" / "test"
+
+
+def sample_batches(dataset, indices, batch_size):
+    for start in range(0, len(indices), batch_size):
+        chunk = indices[start:start + batch_size]
+        imgs, labels = zip(*(dataset[i] for i in chunk))
+        yield torch.stack(imgs), torch.tensor(labels)
+
+
+def export_torchscript(model, quantize, calib_batches, out_path):
+    example = torch.randn(1, 3, face_model_loader.INPUT_SIZE, face_model_loader.INPUT_SIZE)
+
+    if quantize == "dynamic":
+        model = torch.ao.quantization.quantize_dynamic(model, {nn.Linear}, dtype=torch.qint8)
+    elif quantize == "static":
+        from torch.ao.quantization import get_default_qconfig_mapping
+        from torch.ao.quantization.quantize_fx import prepare_fx, convert_fx
+
+        torch.backends.quantized.engine = "x86" if "x86" in torch.backends.quantized.supported_engines else "fbgemm"
+        qconfig_mapping = get_default_qconfig_mapping(torch.backends.quantized.engine)
+        prepared = prepare_fx(copy.deepcopy(model), qconfig_mapping, example_inputs=(example,))
+        with torch.no_grad():
+            for imgs, _ in calib_batches:
+                prepared(imgs)
+        model = convert_fx(prepared)
+
+    model.eval()
+    with torch.no_grad():
+        traced = torch.jit.trace(model, example)
+        traced = torch.jit.freeze(traced)
+    traced.save(str(out_path))
+
+
+def export_onnx(model, quantize, calib_batches, out_path):
+    fp32_path = face_model_loader.artifact_path("onnx", int8=False)
+    example = torch.randn(1, 3, face_model_loader.INPUT_SIZE, face_model_loader.INPUT_SIZE)
+    torch.onnx.export(
+        model,
+        example,
+        str(fp32_path),
+        input_names=["input"],
+        output_names=["logits"],
+        dynamic_axes={"input": {0: "batch"}, "logits": {0: "batch"}},
+        opset_version=17,
+    )
+    if quantize == "none":
+        return
+
+    from onnxruntime.quantization import (
+        CalibrationDataReader, QuantFormat, QuantType, quantize_dynamic, quantize_static
+    )
+
+    if quantize == "dynamic":
+        quantize_dynamic(str(fp32_path), str(out_path), weight_type=QuantType.QInt8)
+        return
+
+    class Reader(CalibrationDataReader):
+        def __init__(self, batches):
+            self._it = iter([{"input": imgs.numpy()} for imgs, _ in batches])
+
+        def get_next(self):
+            return next(self._it, None)
+
+    quantize_static(
+        str(fp32_path),
+        str(out_path),
+        Reader(calib_batches),
+        quant_format=QuantFormat.QDQ,
+        per_channel=True,
+        activation_type=QuantType.QUInt8,
+        weight_type=QuantType.QInt8,
+    )
+
+
+def median_latency_ms(runner, example, repeats=30):
+    times = []
+    with torch.no_grad():
+        for _ in range(3):
+            runner(example)
+        for _ in range(repeats):
+            t0 = time.perf_counter()
+            runner(example)
+            times.append((time.perf_counter() - t0) * 1000)
+    return statistics.median(times)
+
+
+def compare(eager, candidate, check_batches, class_names, dataset_classes):
+    # map dataset label indices to model class indices by name (for accuracy)
+    name_to_model = {n: i for i, n in enumerate(class_names)}
+    label_map = [name_to_model.get(c, -1) for c in dataset_classes]
+
+    agree = total = 0
+    eager_correct = cand_correct = 0
+    max_diff = 0.0
+    with torch.no_grad():
+        for imgs, labels in check_batches:
+            p_e = torch.softmax(eager(imgs), dim=1)
+            p_c = torch.softmax(candidate(imgs), dim=1)
+            max_diff = max(max_diff, float((p_e - p_c).abs().max()))
+            top_e = p_e.argmax(dim=1)
+            top_c = p_c.argmax(dim=1)
+            target = torch.tensor([label_map[int(l)] for l in labels])
+            agree += int((top_e == top_c).sum())
+            eager_correct += int((top_e == target).sum())
+            cand_correct += int((top_c == target).sum())
+            total += len(labels)
+
+    return {
+        "samples": total,
+        "top1_agreement": agree / max(total, 1),
+        "max_prob_diff": max_diff,
+        "eager_accuracy": eager_correct / max(total, 1),
+        "artifact_accuracy": cand_correct / max(total, 1),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Export the face model for optimized CPU inference.")
+    parser.add_argument("--format", choices=["torchscript", "onnx"], default="torchscript")
+    parser.add_argument("--quantize", choices=["none", "dynamic", "static"], default="none")
+    parser.add_argument("--calib-dir", default=str(DEFAULT_CALIB_DIR), help="Class-folder tree for calibration / checks")
+    parser.add_argument("--calib-samples", type=int, default=256)
+    parser.add_argument("--check-samples", type=int, default=256)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    torch.manual_seed(args.seed)
+    random.seed(args.seed)
+
+    # always export from the eager fp32 weights
+    eager, class_names = face_model_loader._build_model()
+
+    int8 = args.quantize != "none"
+    out_path = face_model_loader.artifact_path(args.format, int8=int8)
+
+    dataset = FacesFolderDataset(args.calib_dir, transform=face_model_loader._transform)
+    indices = list(range(len(dataset)))
+    random.shuffle(indices)
+    calib_idx = indices[:args.calib_samples]
+    check_idx = indices[args.calib_samples:args.calib_samples + args.check_samples]
+    print(f"Calibration images: {len(calib_idx)}  check images: {len(check_idx)}  from {args.calib_dir}")
+
+    calib_batches = list(sample_batches(dataset, calib_idx, args.batch_size)) if args.quantize == "static" else []
+
+    t0 = time.time()
+    if args.format == "torchscript":
+        export_torchscript(eager, args.quantize, calib_batches, out_path)
+    else:
+        export_onnx(eager, args.quantize, calib_batches, out_path)
+    print(f"Exported {out_path} in {time.time() - t0:.1f}s")
+
+    candidate = face_model_loader._load_runtime(args.format, int8)
+    check_batches = list(sample_batches(dataset, check_idx, args.batch_size))
+    report = compare(eager, candidate, check_batches, class_names, dataset.classes)
+
+    example = torch.randn(1, 3, face_model_loader.INPUT_SIZE, face_model_loader.INPUT_SIZE)
+    report.update({
+        "format": args.format,
+        "quantize": args.quantize,
+        "artifact": out_path.name,
+        "artifact_mb": out_path.stat().st_size / 1e6,
+        "eager_mb": face_model_loader.MODEL_PATH.stat().st_size / 1e6,
+        "eager_latency_ms": median_latency_ms(eager, example),
+        "artifact_latency_ms": median_latency_ms(candidate, example),
+        "torch_threads": torch.get_num_threads(),
+    })
+
+    for k, v in report.items():
+        print(f"  {k:20s} {v:.4f}" if isinstance(v, float) else f"  {k:20s} {v}")
+
+    report_path = out_path.with_name(out_path.name + ".report.json")
+    with report_path.open("w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print("Saved report to:", report_path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,196 @@
+# training/export_text_model.py
+"""
+Export the fine-tuned DistilBERT for faster CPU serving and check it against eager fp32.
+
+    python training/export_text_model.py                 # model.onnx + model.int8.onnx, then check
+    python training/export_text_model.py --check-only    # just compare the runtimes
+
+Writes into the model folder (default training/results-distilbert):
+    model.onnx       -> fp32 ONNX graph (dynamic batch and sequence axes)
+    model.int8.onnx  -> the same graph with onnxruntime dynamic INT8 quantization
+    runtime_report.json
+
+The check runs every runtime that predict_text supports (int8, onnx, onnx-int8)
+and eager fp32 over the texts in --data (default training/data/valid.csv) and
+reports label agreement with eager, max probability difference, accuracy and
+median per-text latency. Select the runtime for the backend with TEXT_RUNTIME.
+
+The check is a parity gate: the script exits with status 1 if any runtime
+agrees with eager on fewer than --min-agreement of the texts or differs from
+it by more than --max-prob-diff in any class probability. Such a runtime
+should not be enabled.
+"""
+
+from __future__ import annotations
+
+import argparse
+import csv
+import json
+import statistics
+import sys
+import time
+from pathlib import Path
+
+import torch
+from torch import nn
+from transformers import AutoTokenizer, AutoModelForSequenceClassification
+
+ROOT_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(ROOT_DIR.parent / "backend"))
+
+import predict_text  # noqa: E402
+
+MODEL_DIR = ROOT_DIR / "results-distilbert"
+VALID_CSV = ROOT_DIR / "data" / "valid.csv"
+
+
+class LogitsOnly(nn.Module):
+    """Plain tensor in / tensor out wrapper so the ONNX graph has a single `logits` output."""
+
+    def __init__(self, model):
+        super().__init__()
+        self.model = model
+
+    def forward(self, input_ids, attention_mask):
+        return self.model(input_ids=input_ids, attention_mask=attention_mask).logits
+
+
+def load_model(model_dir: Path):
+    model = AutoModelForSequenceClassification.from_pretrained(str(model_dir), local_files_only=True)
+    model.eval()
+    return model
+
+
+def export_onnx(model_dir: Path, tokenizer, quantize: bool):
+    model = load_model(model_dir)
+    onnx_path = model_dir / predict_text.ONNX_FILES["onnx"]
+    sample = tokenizer(["a short example sentence"], return_tensors="pt")
+    torch.onnx.export(
+        LogitsOnly(model),
+        (sample["input_ids"], sample["attention_mask"]),
+        str(onnx_path),
+        input_names=["input_ids", "attention_mask"],
+        output_names=["logits"],
+        dynamic_axes={
+            "input_ids": {0: "batch", 1: "sequence"},
+            "attention_mask": {0: "batch", 1: "sequence"},
+            "logits": {0: "batch"},
+        },
+        opset_version=17,
+    )
+    print("Saved", onnx_path)
+
+    if quantize:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+
+        int8_path = model_dir / predict_text.ONNX_FILES["onnx-int8"]
+        quantize_dynamic(str(onnx_path), str(int8_path), weight_type=QuantType.QInt8)
+        print("Saved", int8_path)
+
+
+def read_rows(path: Path):
+    with path.open(newline="", encoding="utf-8") as f:
+        return [(r["text"], r["label"]) for r in csv.DictReader(f)]
+
+
+def run_texts(runner, tokenizer, texts):
+    probs, times = [], []
+    with torch.no_grad():
+        for text in texts:
+            inputs = tokenizer(text, truncation=True, return_tensors="pt")
+            t0 = time.perf_counter()
+            logits = runner(inputs)
+            times.append((time.perf_counter() - t0) * 1000)
+            probs.append(torch.softmax(logits, dim=-1)[0])
+    return torch.stack(probs), times
+
+
+def check(model_dir: Path, tokenizer, data: Path, repeats: int,
+          min_agreement: float = 0.98, max_prob_diff: float = 0.1) -> list:
+    """Compares the runtimes with eager; returns the parity failures (empty if all pass)."""
+    rows = read_rows(data)
+    texts = [t for t, _ in rows] * repeats
+    gold = [l for _, l in rows] * repeats
+
+    eager = load_model(model_dir)
+    id2label = {int(k): v for k, v in eager.config.id2label.items()}
+    ref_probs, ref_times = run_texts(lambda x: eager(**x).logits, tokenizer, texts)
+    ref_top = ref_probs.argmax(dim=1)
+
+    def summary(probs, times):
+        top = probs.argmax(dim=1)
+        return {
+            "accuracy": sum(id2label[int(i)] == g for i, g in zip(top, gold)) / len(gold),
+            "agreement_with_eager": float((top == ref_top).float().mean()),
+            "max_prob_diff": float((probs - ref_probs).abs().max()),
+            "median_latency_ms": statistics.median(times),
+        }
+
+    report = {"data": str(data), "texts": len(texts), "eager": summary(ref_probs, ref_times)}
+    for runtime in ("int8", "onnx", "onnx-int8"):
+        runner, used = predict_text.build_runner(load_model(model_dir), str(model_dir), runtime)
+        if used != runtime:
+            print(f"Skipping {runtime} (not available)")
+            continue
+        report[runtime] = summary(*run_texts(runner, tokenizer, texts))
+
+    failures = []
+    for name, r in report.items():
+        if name == "eager" or not isinstance(r, dict):
+            continue
+        problems = []
+        if r["agreement_with_eager"] < min_agreement:
+            problems.append(f"agreement {r['agreement_with_eager']:.3f} < {min_agreement}")
+        if r["max_prob_diff"] > max_prob_diff:
+            problems.append(f"max prob diff {r['max_prob_diff']:.4f} > {max_prob_diff}")
+        r["passed"] = not problems
+        failures += [f"{name}: {p}" for p in problems]
+    report["thresholds"] = {"min_agreement": min_agreement, "max_prob_diff": max_prob_diff}
+
+    base = report["eager"]["median_latency_ms"]
+    print(f"{'runtime':10s} {'acc':>6s} {'agree':>6s} {'maxdiff':>8s} {'ms/text':>8s} {'speedup':>8s}  parity")
+    for name, r in report.items():
+        if not isinstance(r, dict):
+            continue
+        print(
+            f"{name:10s} {r['accuracy']:6.3f} {r['agreement_with_eager']:6.3f} "
+            f"{r['max_prob_diff']:8.4f} {r['median_latency_ms']:8.2f} {base / r['median_latency_ms']:7.2f}x"
+            f"  {'-' if name == 'eager' else 'ok' if r['passed'] else 'FAIL'}"
+        )
+
+    out = model_dir / "runtime_report.json"
+    with out.open("w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print("Saved report to:", out)
+    return failures
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Export DistilBERT to ONNX / INT8 and compare runtimes.")
+    parser.add_argument("--model-dir", default=str(MODEL_DIR))
+    parser.add_argument("--data", default=str(VALID_CSV), help="CSV with text,label columns for the parity check")
+    parser.add_argument("--no-quantize", action="store_true", help="Only write the fp32 ONNX graph")
+    parser.add_argument("--check-only", action="store_true", help="Skip export, only compare runtimes")
+    parser.add_argument("--repeats", type=int, default=5, help="Passes over the data for stable latency numbers")
+    parser.add_argument("--min-agreement", type=float, default=0.98,
+                        help="Lowest accepted top-1 agreement with eager per runtime")
+    parser.add_argument("--max-prob-diff", type=float, default=0.1,
+                        help="Largest accepted abs class-probability difference from eager per runtime")
+    args = parser.parse_args()
+
+    model_dir = Path(args.model_dir)
+    tokenizer = AutoTokenizer.from_pretrained(str(model_dir), local_files_only=True)
+
+    if not args.check_only:
+        export_onnx(model_dir, tokenizer, quantize=not args.no_quantize)
+
+    failures = check(model_dir, tokenizer, Path(args.data), args.repeats, args.min_agreement, args.max_prob_diff)
+    if failures:
+        print("\nParity check FAILED (do not enable these runtimes):")
+        for failure in failures:
+            print("  " + failure)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,15 +1,24 @@
 
+import json
 import os
+import numpy as np
+import torch
+import torch.nn.functional as F
 from PIL import Image
 from torch.utils.data import Dataset
 import torchvision.transforms as T
 
+_MEAN = torch.tensor([0.485,0.456,0.406]).view(3,1,1)
+_STD = torch.tensor([0.229,0.224,0.225]).view(3,1,1)
+
 class FacesFolderDataset(Dataset):
-    def __init__(self, root_dir, classes=None, transform=None):
+    def __init__(self, root_dir, classes=None, transform=None, size=224):
         """
         root_dir: path to folder containing class subfolders
         classes: optional list of class names; if None, reads dir names sorted
+        size: side of the square model input (default transform only)
         """
+        self.size = size
         self.root_dir = root_dir
         if classes is None:
             classes = sorted([d for d in os.listdir(root_dir) if os.path.isdir(os.path.join(root_dir, d))])
@@ -25,7 +34,7 @@ class FacesFolderDataset(Dataset):
 
     def default_transform(self):
         return T.Compose([
-            T.Resize((224,224)),
+            T.Resize((self.size,self.size)),
             T.RandomHorizontalFlip(),
             T.ToTensor(),
             T.Normalize(mean=[0.485,0.456,0.406], std=[0.229,0.224,0.225])
@@ -38,3 +47,53 @@ class FacesFolderDataset(Dataset):
         img = Image.open(path).convert("RGB")
         img = self.transform(img)
         return img, label
+
+
+class FacesShardDataset(Dataset):
+    def __init__(self, shard_dir, augment=False, classes=None, size=None):
+        """
+        shard_dir: one split written by build_face_cache.py (images.npy, labels.npy, meta.json)
+        augment: random horizontal flip, done on the uint8 tensor
+        classes: optional expected class order; raises if the shard differs
+        size: model input side; images are resized on the tensor when it
+              differs from the shard's (best to build the shard at this size)
+
+        images.npy is memory-mapped copy-on-write, so items are views of the
+        page cache and workers share it instead of each holding a copy.
+        """
+        self.shard_dir = shard_dir
+        with open(os.path.join(shard_dir, "meta.json"), encoding="utf-8") as f:
+            self.meta = json.load(f)
+        self.classes = self.meta["classes"]
+        if classes is not None and list(classes) != list(self.classes):
+            raise ValueError(f"{shard_dir}: classes {self.classes} do not match {list(classes)}")
+        self.class2idx = {c:i for i,c in enumerate(self.classes)}
+        self.shard_size = self.meta["size"]
+        self.size = size or self.shard_size
+        self.augment = augment
+        self.labels = np.load(os.path.join(shard_dir, "labels.npy"))
+        self.images = None   # opened lazily, once per worker process
+
+    def __len__(self): return len(self.labels)
+
+    def _images(self):
+        if self.images is None:
+            self.images = np.load(os.path.join(self.shard_dir, "images.npy"), mmap_mode="c")
+        return self.images
+
+    def __getstate__(self):
+        # never pickle the mapped array into worker processes
+        state = dict(self.__dict__)
+        state["images"] = None
+        return state
+
+    def __getitem__(self, idx):
+        img = torch.from_numpy(self._images()[idx]).permute(2,0,1)   # uint8 CHW, no copy
+        if self.augment and torch.rand(()) < 0.5:
+            img = img.flip(-1)
+        img = img.float()
+        if self.size != self.shard_size:
+            img = F.interpolate(img[None], size=(self.size,self.size), mode="bilinear",
+                                antialias=True, align_corners=False)[0]
+        img = img.div_(255).sub_(_MEAN).div_(_STD)
+        return img, int(self.labels[idx])
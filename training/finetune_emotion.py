@@ -10,47 +10,113 @@ Notes:
   (I'll give the exact install command next, one step at a time.)
 - Run this script from the project root (where training/ is located) inside the Python venv:
     python training/finetune_emotion.py
+    python training/finetune_emotion.py --baseline   # old fixed 128-token padding, for comparison
+
+Sentences are tokenized without padding and padded per batch by the data
+collator; with group_by_length, batches hold sentences of similar length, so
+almost no compute goes to pad tokens. The tokenized datasets are cached under
+training/data/cache/ keyed by the CSV contents and tokenizer settings.
+At the end, wall-clock time, samples/sec and (non-pad) tokens/sec are printed
+and written to <output>/train_report.json.
 """
 
-from datasets import load_dataset, ClassLabel
-from transformers import AutoTokenizer, AutoModelForSequenceClassification, TrainingArguments, Trainer
+import argparse
+import hashlib
+import json
+import os
+import time
+
+from datasets import load_dataset, load_from_disk
+from transformers import (
+    AutoTokenizer,
+    AutoModelForSequenceClassification,
+    DataCollatorWithPadding,
+    TrainingArguments,
+    Trainer,
+)
 import numpy as np
 import evaluate
-import os
 
 MODEL_NAME = "distilbert-base-uncased"   # small, fast base model for tests
 TRAIN_CSV = "training/data/train_full.csv"
 VALID_CSV = "training/data/valid_full.csv"
 OUTPUT_DIR = "training/results-distilbert"
+CACHE_DIR = "training/data/cache"
+MAX_LENGTH = 128
+
+
+def cache_key(files, padding):
+    h = hashlib.sha1(f"{MODEL_NAME}|{MAX_LENGTH}|{padding}".encode())
+    for path in files:
+        with open(path, "rb") as f:
+            h.update(f.read())
+    return h.hexdigest()[:16]
+
+
+def tokenized_datasets(tokenizer, padding):
+    """
+    (datasets, labels): tokenized train/validation sets with a "length"
+    column, loaded from the on-disk cache when the CSVs and settings are
+    unchanged.
+    """
+    cache_path = os.path.join(CACHE_DIR, f"tokenized-{cache_key([TRAIN_CSV, VALID_CSV], padding)}")
+    labels_file = os.path.join(cache_path, "labels.json")
+    if os.path.isfile(labels_file):
+        print("Using tokenized cache:", cache_path)
+        with open(labels_file, encoding="utf-8") as f:
+            return load_from_disk(cache_path), json.load(f)
 
-def main():
-    assert os.path.exists(TRAIN_CSV), f"Train file not found at {TRAIN_CSV}"
-    assert os.path.exists(VALID_CSV), f"Valid file not found at {VALID_CSV}"
-
-    # 1) load CSVs
     raw = load_dataset("csv", data_files={"train": TRAIN_CSV, "validation": VALID_CSV})
-
-    # 2) build label set from training data
     labels = sorted(list({l for l in raw["train"]["label"]}))
     label2id = {l: i for i, l in enumerate(labels)}
-    id2label = {i: l for l, i in label2id.items()}
-    num_labels = len(labels)
-    print("Labels:", labels)
 
-    # 3) tokenizer + model
-    tokenizer = AutoTokenizer.from_pretrained(MODEL_NAME)
     def preprocess(batch):
-        toks = tokenizer(batch["text"], truncation=True, padding="max_length", max_length=128)
+        if padding:
+            toks = tokenizer(batch["text"], truncation=True, padding="max_length", max_length=MAX_LENGTH)
+        else:
+            toks = tokenizer(batch["text"], truncation=True, max_length=MAX_LENGTH)
         toks["labels"] = [label2id[l] for l in batch["label"]]
+        toks["length"] = [sum(m) for m in toks["attention_mask"]]   # real (non-pad) tokens
         return toks
 
     encoded = raw.map(preprocess, batched=True, remove_columns=raw["train"].column_names)
+    encoded.save_to_disk(cache_path)
+    # written last: marks the cache as complete
+    with open(labels_file, "w", encoding="utf-8") as f:
+        json.dump(labels, f)
+    print("Saved tokenized cache:", cache_path)
+    return encoded, labels
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fine-tune DistilBERT for text emotion classification.")
+    parser.add_argument("--baseline", action="store_true",
+                        help="Pad every sentence to 128 tokens and do not group by length (the old setup)")
+    parser.add_argument("--epochs", type=float, default=3)
+    parser.add_argument("--batch-size", type=int, default=8)
+    parser.add_argument("--output-dir", default=OUTPUT_DIR)
+    args = parser.parse_args()
+
+    assert os.path.exists(TRAIN_CSV), f"Train file not found at {TRAIN_CSV}"
+    assert os.path.exists(VALID_CSV), f"Valid file not found at {VALID_CSV}"
+    t_start = time.time()
+
+    # 1) tokenizer + tokenized CSVs (cached)
+    tokenizer = AutoTokenizer.from_pretrained(MODEL_NAME)
+    encoded, labels = tokenized_datasets(tokenizer, padding=args.baseline)
+    t_data = time.time()
+
+    # 2) label set from training data
+    label2id = {l: i for i, l in enumerate(labels)}
+    id2label = {i: l for l, i in label2id.items()}
+    num_labels = len(labels)
+    print("Labels:", labels)
 
     model = AutoModelForSequenceClassification.from_pretrained(
         MODEL_NAME, num_labels=num_labels, id2label=id2label, label2id=label2id
     )
 
-    # 4) metrics
+    # 3) metrics
     accuracy = evaluate.load("accuracy")
     f1 = evaluate.load("f1")
 
@@ -62,48 +128,60 @@ def main():
         f1m = f1.compute(predictions=preds, references=labels, average="macro")
         return {"accuracy": acc["accuracy"], "f1_macro": f1m["f1"]}
 
-    # 5) training arguments (compatible names for your transformers version)
-    args = TrainingArguments(
-        output_dir=OUTPUT_DIR,
+    # 4) training arguments (compatible names for your transformers version)
+    training_args = TrainingArguments(
+        output_dir=args.output_dir,
         overwrite_output_dir=False,
         do_train=True,
         do_eval=True,
         eval_strategy="epoch",          # was evaluation_strategy
         save_strategy="epoch",          # was save_strategy
-        per_device_train_batch_size=8,
+        per_device_train_batch_size=args.batch_size,
         per_device_eval_batch_size=16,
-        num_train_epochs=3,
+        num_train_epochs=args.epochs,
         logging_steps=50,
         logging_strategy="steps",       # explicit logging strategy
         load_best_model_at_end=True,
         metric_for_best_model="accuracy",
         save_total_limit=2,
         fp16=False,
+        group_by_length=not args.baseline,
+        length_column_name="length",
     )
-    # 6) create the Trainer (must come AFTER TrainingArguments)
-    from transformers import Trainer  # ensure Trainer is available
 
     trainer = Trainer(
         model=model,
-        args=args,
+        args=training_args,
         train_dataset=encoded["train"],
         eval_dataset=encoded["validation"],
+        data_collator=DataCollatorWithPadding(tokenizer, pad_to_multiple_of=8),
         compute_metrics=compute_metrics,
     )
 
-    # 7) run training and save
-    trainer.train()
-    trainer.save_model(OUTPUT_DIR)
-    print(f"Training complete — model saved to {OUTPUT_DIR}")
+    # 5) run training once and save the best model with its tokenizer
+    result = trainer.train()
+    trainer.save_model(args.output_dir)
+    tokenizer.save_pretrained(args.output_dir)
+    print(f"Training complete — model saved to {args.output_dir}")
+
+    # 6) throughput report
+    train_seconds = result.metrics["train_runtime"]
+    epochs = result.metrics.get("epoch", args.epochs)
+    real_tokens = int(sum(encoded["train"]["length"]) * epochs)
+    report = {
+        "config": "baseline (pad to 128)" if args.baseline else "dynamic padding + group_by_length",
+        "wall_clock_s": round(time.time() - t_start, 1),
+        "data_s": round(t_data - t_start, 1),
+        "train_s": round(train_seconds, 1),
+        "train_samples_per_s": round(result.metrics["train_samples_per_second"], 1),
+        "train_tokens_per_s": round(real_tokens / max(train_seconds, 1e-9), 1),
+        "eval_accuracy": trainer.evaluate().get("eval_accuracy"),
+    }
+    for k, v in report.items():
+        print(f"  {k}: {v}")
+    with open(os.path.join(args.output_dir, "train_report.json"), "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
 
 
-    # 6) run training
-    trainer.train()
-
-    # 7) save final model
-    trainer.save_model(OUTPUT_DIR)
-    print(f"Training complete — model saved to {OUTPUT_DIR}")
-
 if __name__ == "__main__":
     main()
-
@@ -1,18 +1,49 @@
-
+# training/train_face.py
+"""
+Fine-tune a face emotion backbone (ResNet18 by default) on the class folders.
+
+    python training/train_face.py
+    python training/train_face.py --backbone mobilenet_v3_small --input-size 112 --out-dir training/results-face-mnv3
+    python training/build_face_cache.py && python training/train_face.py --cache-dir training/data/cache --workers 4
+    python training/train_face.py --fast --accum-steps 2 --resume
+
+With --cache-dir the images come from the memory-mapped uint8 shards written
+by build_face_cache.py (no JPEG decode per epoch) and are loaded by
+persistent worker processes.
+
+Throughput options: --bf16 (autocast), --channels-last, --compile and
+--accum-steps N; --fast turns on the first two. Each epoch reports train and
+validation images/sec so configurations can be compared.
+
+The best model by validation accuracy is written to <out-dir>/face_model.pt
+(atomically, whenever it improves), together with class_names.txt and
+face_model.json, so an interrupted run never leaves the served weights next
+to another architecture's metadata; <out-dir>/checkpoint.pt holds model,
+optimizer, epoch and RNG state after every epoch, and --resume continues
+from it.
+"""
 
 from __future__ import annotations
 
+import argparse
+import os
+import random
+import sys
 from pathlib import Path
 import time
 
+import numpy as np
 import torch
 from torch import nn, optim
 from torch.utils.data import DataLoader
-from torchvision import models
 
-from faces_dataset import FacesFolderDataset
+from faces_dataset import FacesFolderDataset, FacesShardDataset
 
 ROOT_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(ROOT_DIR.parent / "backend"))
+
+import face_backbones  # noqa: E402
+
 DATA_DIR = ROOT_DIR / "data"
 TRAIN_DIR = DATA_DIR / "train"
 VAL_DIR = DATA_DIR / "test"
@@ -24,81 +55,204 @@ LEARNING_RATE = 1e-4
 WEIGHT_DECAY = 1e-4
 
 
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Fine-tune a face emotion backbone (resnet18, mobilenet_v3_small or compact_cnn) on the class folders.")
+    parser.add_argument("--train-dir", default=str(TRAIN_DIR))
+    parser.add_argument("--val-dir", default=str(VAL_DIR))
+    parser.add_argument("--cache-dir", default=None,
+                        help="Read train/ and test/ shards built by build_face_cache.py instead of the folders")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="DataLoader worker processes (default: 0, or min(4, cpus) with --cache-dir)")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--epochs", type=int, default=NUM_EPOCHS)
+    parser.add_argument("--lr", type=float, default=LEARNING_RATE)
+    parser.add_argument("--weight-decay", type=float, default=WEIGHT_DECAY)
+    parser.add_argument("--out-dir", default=str(OUT_DIR))
+    parser.add_argument("--backbone", default=face_backbones.DEFAULT_BACKBONE, choices=sorted(face_backbones.BACKBONES))
+    parser.add_argument("--input-size", type=int, default=None,
+                        help="Square input side (default: the backbone's, e.g. 224 for resnet18)")
+    parser.add_argument("--no-pretrained", dest="pretrained", action="store_false",
+                        help="Start from random weights instead of ImageNet ones")
+    parser.add_argument("--accum-steps", type=int, default=1,
+                        help="Batches per optimizer step (effective batch = batch-size * accum-steps)")
+    parser.add_argument("--bf16", action="store_true", help="bfloat16 autocast (CPU or CUDA)")
+    parser.add_argument("--channels-last", action="store_true", help="NHWC memory format for model and inputs")
+    parser.add_argument("--compile", action="store_true", help="torch.compile the model")
+    parser.add_argument("--fast", action="store_true", help="Shorthand for --bf16 --channels-last")
+    parser.add_argument("--resume", nargs="?", const="auto", default=None,
+                        help="Resume from a checkpoint (default: <out-dir>/checkpoint.pt if present)")
+    args = parser.parse_args()
+    if args.fast:
+        args.bf16 = args.channels_last = True
+    args.accum_steps = max(1, args.accum_steps)
+    args.meta = face_backbones.default_meta(args.backbone, args.input_size)
+    return args
+
+
+def atomic_save(obj, path: Path) -> None:
+    """torch.save to a temp file and rename, so `path` is never half-written."""
+    tmp = path.with_name(path.name + ".tmp")
+    torch.save(obj, tmp)
+    os.replace(tmp, path)
+
+
+def save_model(out_dir: Path, model, class_names, meta: dict) -> Path:
+    """
+    Writes face_model.pt with its class_names.txt and face_model.json. Every
+    file goes to a temp name first and the renames happen back to back.
+    """
+    model_path = out_dir / "face_model.pt"
+    tmp_model = model_path.with_name(model_path.name + ".tmp")
+    torch.save(model.state_dict(), tmp_model)
+    class_file = out_dir / "class_names.txt"
+    tmp_classes = class_file.with_name(class_file.name + ".tmp")
+    tmp_classes.write_text("".join(str(name) + "\n" for name in class_names), encoding="utf-8")
+
+    os.replace(tmp_classes, class_file)
+    face_backbones.write_meta(out_dir, meta)
+    os.replace(tmp_model, model_path)
+    return model_path
+
+
+def save_checkpoint(path: Path, model, optimizer, epoch: int, best_val_acc: float) -> None:
+    atomic_save({
+        "model": model.state_dict(),
+        "optimizer": optimizer.state_dict(),
+        "epoch": epoch,
+        "best_val_acc": best_val_acc,
+        "rng": {
+            "python": random.getstate(),
+            "numpy": np.random.get_state(),
+            "torch": torch.get_rng_state(),
+            "cuda": torch.cuda.get_rng_state_all() if torch.cuda.is_available() else None,
+        },
+    }, path)
+
+
+def load_checkpoint(path: Path, model, optimizer) -> tuple[int, float]:
+    """Restores model, optimizer and RNG state; returns (next epoch, best val acc)."""
+    ckpt = torch.load(path, map_location="cpu", weights_only=False)
+    model.load_state_dict(ckpt["model"])
+    optimizer.load_state_dict(ckpt["optimizer"])
+    rng = ckpt["rng"]
+    random.setstate(rng["python"])
+    np.random.set_state(rng["numpy"])
+    torch.set_rng_state(rng["torch"])
+    if rng["cuda"] is not None and torch.cuda.is_available():
+        torch.cuda.set_rng_state_all(rng["cuda"])
+    return ckpt["epoch"] + 1, ckpt["best_val_acc"]
+
+
+def make_loader(ds, batch_size: int, shuffle: bool, workers: int) -> DataLoader:
+    extra = {"persistent_workers": True, "prefetch_factor": 4} if workers > 0 else {}
+    return DataLoader(
+        ds,
+        batch_size=batch_size,
+        shuffle=shuffle,
+        num_workers=workers,
+        pin_memory=torch.cuda.is_available(),
+        **extra,
+    )
+
+
 def main() -> None:
-    # sanity prints
-    print("Train dir:", TRAIN_DIR)
-    print("Val dir  :", VAL_DIR)
+    args = parse_args()
 
     # ---------- datasets & loaders ----------
 
-    train_ds = FacesFolderDataset(str(TRAIN_DIR))
-    val_ds = FacesFolderDataset(str(VAL_DIR))
+    if args.cache_dir:
+        train_shard = Path(args.cache_dir) / Path(args.train_dir).name
+        val_shard = Path(args.cache_dir) / Path(args.val_dir).name
+        print("Train shard:", train_shard)
+        print("Val shard  :", val_shard)
+        size = args.meta["input_size"]
+        train_ds = FacesShardDataset(str(train_shard), augment=True, size=size)
+        val_ds = FacesShardDataset(str(val_shard), classes=train_ds.classes, size=size)
+        workers = args.workers if args.workers is not None else min(4, os.cpu_count() or 1)
+    else:
+        # sanity prints
+        print("Train dir:", args.train_dir)
+        print("Val dir  :", args.val_dir)
+        train_ds = FacesFolderDataset(args.train_dir, size=args.meta["input_size"])
+        val_ds = FacesFolderDataset(args.val_dir, size=args.meta["input_size"])
+        workers = args.workers or 0
 
     # class names (assume FacesFolderDataset exposes .classes)
     if hasattr(train_ds, "classes"):
         class_names = list(train_ds.classes)
     else:
         # fallback: infer from subfolders
-        class_names = sorted({p.name for p in TRAIN_DIR.iterdir() if p.is_dir()})
+        class_names = sorted({p.name for p in Path(args.train_dir).iterdir() if p.is_dir()})
 
     print("Classes:", class_names)
+    print("Loader workers:", workers)
 
-    train_loader = DataLoader(
-        train_ds,
-        batch_size=BATCH_SIZE,
-        shuffle=True,
-        num_workers=0,
-        pin_memory=False,
-    )
-
-    val_loader = DataLoader(
-        val_ds,
-        batch_size=BATCH_SIZE,
-        shuffle=False,
-        num_workers=0,
-        pin_memory=False,
-    )
-
-
+    train_loader = make_loader(train_ds, args.batch_size, shuffle=True, workers=workers)
+    val_loader = make_loader(val_ds, args.batch_size, shuffle=False, workers=workers)
 
     device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
     print("Using device:", device)
+    print(f"bf16={args.bf16}  channels_last={args.channels_last}  compile={args.compile}  "
+          f"accum_steps={args.accum_steps} (effective batch {args.batch_size * args.accum_steps})")
 
-
-    weights = models.ResNet18_Weights.DEFAULT
-    model = models.resnet18(weights=weights)
-
-    num_features = model.fc.in_features
+    print(f"Backbone: {args.backbone} @ {args.meta['input_size']}px (pretrained={args.pretrained})")
     num_classes = len(class_names)
-    model.fc = nn.Linear(num_features, num_classes)
+    model = face_backbones.build(args.backbone, num_classes, pretrained=args.pretrained)
 
-    model.to(device)
+    memory_format = torch.channels_last if args.channels_last else torch.contiguous_format
+    model.to(device, memory_format=memory_format)
 
     criterion = nn.CrossEntropyLoss()
-    optimizer = optim.Adam(model.parameters(), lr=LEARNING_RATE, weight_decay=WEIGHT_DECAY)
+    optimizer = optim.Adam(model.parameters(), lr=args.lr, weight_decay=args.weight_decay)
 
+    out_dir = Path(args.out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    model_path = out_dir / "face_model.pt"
+    ckpt_path = out_dir / "checkpoint.pt"
 
+    start_epoch = 1
     best_val_acc = 0.0
-
-    for epoch in range(1, NUM_EPOCHS + 1):
-        print(f"\nEpoch {epoch}/{NUM_EPOCHS}")
+    if args.resume:
+        resume_path = ckpt_path if args.resume == "auto" else Path(args.resume)
+        if resume_path.exists():
+            start_epoch, best_val_acc = load_checkpoint(resume_path, model, optimizer)
+            print(f"Resumed from {resume_path}: epoch {start_epoch}, best val acc {best_val_acc*100:5.1f}%")
+        elif args.resume != "auto":
+            raise SystemExit(f"No checkpoint at {resume_path}")
+
+    # compiled module shares the parameters; checkpoints are taken from `model`
+    net = torch.compile(model) if args.compile else model
+
+    def autocast():
+        return torch.autocast(device_type=device.type, dtype=torch.bfloat16, enabled=args.bf16)
+
+    for epoch in range(start_epoch, args.epochs + 1):
+        print(f"\nEpoch {epoch}/{args.epochs}")
         print("-" * 40)
 
-        model.train()
+        net.train()
         running_loss = 0.0
         running_correct = 0
         running_total = 0
         t0 = time.time()
 
+        optimizer.zero_grad(set_to_none=True)
+        n_steps = len(train_loader)
+        # the last group of an epoch may hold fewer micro-batches than accum_steps
+        last_group_start = n_steps - (n_steps - 1) % args.accum_steps
         for step, (imgs, labels) in enumerate(train_loader, start=1):
-            imgs = imgs.to(device)
-            labels = labels.to(device)
+            imgs = imgs.to(device, memory_format=memory_format, non_blocking=True)
+            labels = labels.to(device, non_blocking=True)
 
-            optimizer.zero_grad()
-            outputs = model(imgs)
-            loss = criterion(outputs, labels)
-            loss.backward()
-            optimizer.step()
+            with autocast():
+                outputs = net(imgs)
+                loss = criterion(outputs, labels)
+            group_size = args.accum_steps if step < last_group_start else n_steps - last_group_start + 1
+            (loss / group_size).backward()
+
+            if step % args.accum_steps == 0 or step == n_steps:
+                optimizer.step()
+                optimizer.zero_grad(set_to_none=True)
 
             running_loss += loss.item() * imgs.size(0)
             preds = outputs.argmax(dim=1)
@@ -113,25 +267,28 @@ def main() -> None:
                     f"train_loss={avg_loss:.4f}  train_acc={avg_acc*100:5.1f}%"
                 )
 
+        train_time = time.time() - t0
         epoch_train_loss = running_loss / max(running_total, 1)
         epoch_train_acc = running_correct / max(running_total, 1)
         print(
             f"Train:  loss={epoch_train_loss:.4f}  "
             f"acc={epoch_train_acc*100:5.1f}%  "
-            f"time={time.time()-t0:.1f}s"
+            f"time={train_time:.1f}s  "
+            f"{running_total / max(train_time, 1e-9):.1f} img/s"
         )
 
-        model.eval()
+        net.eval()
         val_loss = 0.0
         val_correct = 0
         val_total = 0
+        t0 = time.time()
 
-        with torch.no_grad():
+        with torch.no_grad(), autocast():
             for imgs, labels in val_loader:
-                imgs = imgs.to(device)
-                labels = labels.to(device)
+                imgs = imgs.to(device, memory_format=memory_format, non_blocking=True)
+                labels = labels.to(device, non_blocking=True)
 
-                outputs = model(imgs)
+                outputs = net(imgs)
                 loss = criterion(outputs, labels)
 
                 val_loss += loss.item() * imgs.size(0)
@@ -139,29 +296,27 @@ def main() -> None:
                 val_correct += (preds == labels).sum().item()
                 val_total += labels.size(0)
 
+        val_time = time.time() - t0
         epoch_val_loss = val_loss / max(val_total, 1)
         epoch_val_acc = val_correct / max(val_total, 1)
         print(
             f"Valid:  loss={epoch_val_loss:.4f}  "
-            f"acc={epoch_val_acc*100:5.1f}%"
+            f"acc={epoch_val_acc*100:5.1f}%  "
+            f"{val_total / max(val_time, 1e-9):.1f} img/s"
         )
 
         if epoch_val_acc > best_val_acc:
             best_val_acc = epoch_val_acc
             print(f"  New best val acc: {best_val_acc*100:5.1f}%")
+            save_model(out_dir, model, class_names, args.meta)
+            print("  Saved best model, class names and metadata to:", out_dir)
 
-   
-
-    OUT_DIR.mkdir(exist_ok=True)
-    model_path = OUT_DIR / "face_model.pt"
-    torch.save(model.state_dict(), model_path)
-    print("Saved model to:", model_path)
+        save_checkpoint(ckpt_path, model, optimizer, epoch, best_val_acc)
 
-    class_file = OUT_DIR / "class_names.txt"
-    with class_file.open("w", encoding="utf-8") as f:
-        for name in class_names:
-            f.write(str(name) + "\n")
-    print("Saved class names to:", class_file)
+    if not model_path.exists():
+        # no epoch beat 0% (or nothing ran): still leave a servable model
+        save_model(out_dir, model, class_names, args.meta)
+    print(f"Best val acc: {best_val_acc*100:5.1f}%  model: {model_path}")
 
 
 if __name__ == "__main__":
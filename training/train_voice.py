@@ -0,0 +1,166 @@
+# training/train_voice.py
+"""
+Train the voice emotion classifier served by /predict_voice.
+
+    python training/train_voice.py
+    python training/train_voice.py --data-dir training/data/voice --epochs 60 --hidden 64
+
+Data: one folder per emotion with WAV clips (16-bit PCM or 32-bit IEEE
+float, any sample rate, mono or stereo; parsed by the same RIFF reader the
+server streams through, voice_pipeline.PcmDecoder):
+
+    training/data/voice/
+        joy/*.wav
+        sadness/*.wav
+        ...
+
+Each clip is cut into the same 1 s windows (0.5 s step) the server
+classifies, using backend/voice_pipeline.py for the features, so training
+and serving cannot drift apart. Clips, not windows, are split into train and
+validation so windows of one recording never end up on both sides.
+
+The result is training/results-voice/voice_model.npz: the MLP weights,
+feature normalisation, labels and the feature settings. Serving needs only
+NumPy.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import torch
+from torch import nn, optim
+
+ROOT_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(ROOT_DIR.parent / "backend"))
+
+import voice_pipeline  # noqa: E402
+
+DATA_DIR = ROOT_DIR / "data" / "voice"
+OUT_DIR = ROOT_DIR / "results-voice"
+
+
+def read_wav(path: Path, sample_rate: int) -> np.ndarray:
+    """Mono float32 samples at `sample_rate`."""
+    decoder = voice_pipeline.PcmDecoder("wav")
+    try:
+        samples = decoder.feed(path.read_bytes())
+    except ValueError as e:
+        raise ValueError(f"{path}: {e}") from None
+    if not decoder.ready:
+        raise ValueError(f"{path}: truncated WAV header")
+    return voice_pipeline.LinearResampler(decoder.sample_rate, sample_rate)(samples)
+
+
+def load_clips(data_dir: Path, config: dict):
+    """Returns (clips, labels): clips is a list of (label_index, window_features)."""
+    labels = sorted(p.name for p in data_dir.iterdir() if p.is_dir())
+    if not labels:
+        raise SystemExit(f"No class folders in {data_dir}")
+
+    clips = []
+    for idx, label in enumerate(labels):
+        for path in sorted((data_dir / label).glob("*.wav")):
+            feats = voice_pipeline.clip_features(read_wav(path, config["sample_rate"]), config)
+            if len(feats):
+                clips.append((idx, feats))
+    return clips, labels
+
+
+def stack(clips):
+    x = np.concatenate([f for _, f in clips])
+    y = np.concatenate([np.full(len(f), idx, dtype=np.int64) for idx, f in clips])
+    return x, y
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Train the voice emotion classifier.")
+    parser.add_argument("--data-dir", default=str(DATA_DIR), help="One folder of WAV clips per emotion")
+    parser.add_argument("--out-dir", default=str(OUT_DIR))
+    parser.add_argument("--epochs", type=int, default=40)
+    parser.add_argument("--hidden", type=int, default=64)
+    parser.add_argument("--batch-size", type=int, default=128)
+    parser.add_argument("--lr", type=float, default=1e-3)
+    parser.add_argument("--weight-decay", type=float, default=1e-4)
+    parser.add_argument("--val-fraction", type=float, default=0.2)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    torch.manual_seed(args.seed)
+    config = dict(voice_pipeline.FEATURE_CONFIG)
+
+    t0 = time.time()
+    clips, labels = load_clips(Path(args.data_dir), config)
+    print(f"Classes: {labels}")
+    print(f"Clips: {len(clips)}  (features in {time.time() - t0:.1f}s)")
+
+    random.shuffle(clips)
+    n_val = int(len(clips) * args.val_fraction)
+    val_clips, train_clips = clips[:n_val], clips[n_val:]
+    x_train, y_train = stack(train_clips)
+    print(f"Train windows: {len(x_train)}  val clips: {len(val_clips)}")
+
+    mean = x_train.mean(axis=0)
+    std = x_train.std(axis=0) + 1e-6
+
+    model = nn.Sequential(nn.Linear(x_train.shape[1], args.hidden), nn.ReLU(), nn.Linear(args.hidden, len(labels)))
+    optimizer = optim.Adam(model.parameters(), lr=args.lr, weight_decay=args.weight_decay)
+    criterion = nn.CrossEntropyLoss()
+
+    xt = torch.from_numpy((x_train - mean) / std)
+    yt = torch.from_numpy(y_train)
+    xv, yv = stack(val_clips) if val_clips else (None, None)
+
+    for epoch in range(args.epochs):
+        model.train()
+        perm = torch.randperm(len(xt))
+        total = 0.0
+        for start in range(0, len(xt), args.batch_size):
+            idx = perm[start:start + args.batch_size]
+            optimizer.zero_grad()
+            loss = criterion(model(xt[idx]), yt[idx])
+            loss.backward()
+            optimizer.step()
+            total += loss.item() * len(idx)
+
+        msg = f"Epoch {epoch + 1}/{args.epochs}  loss {total / len(xt):.4f}"
+        if xv is not None:
+            model.eval()
+            with torch.no_grad():
+                pred = model(torch.from_numpy((xv - mean) / std)).argmax(dim=1).numpy()
+            msg += f"  val window acc {(pred == yv).mean():.3f}"
+        print(msg)
+
+    out_dir = Path(args.out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    out_path = out_dir / "voice_model.npz"
+    first, second = model[0], model[2]
+    np.savez(
+        out_path,
+        w1=first.weight.detach().numpy().T.astype(np.float32),
+        b1=first.bias.detach().numpy().astype(np.float32),
+        w2=second.weight.detach().numpy().T.astype(np.float32),
+        b2=second.bias.detach().numpy().astype(np.float32),
+        mean=mean.astype(np.float32),
+        std=std.astype(np.float32),
+        labels=np.array(labels),
+        config=np.array(json.dumps(config)),
+    )
+    print("Saved voice model to:", out_path)
+
+    # the served model, clip-level: average of its window probabilities
+    if val_clips:
+        served = voice_pipeline.VoiceClassifier(out_path)
+        correct = sum(int(served.predict_proba(f).mean(axis=0).argmax() == idx) for idx, f in val_clips)
+        print(f"Val clip accuracy (served model): {correct / len(val_clips):.3f}")
+
+
+if __name__ == "__main__":
+    main()